@@ -1,54 +1,75 @@
-from data.data_fetcher import fetch_stock_data, fetch_fundamentals
-from indicators.technical import calculate_moving_averages, calculate_rsi, calculate_volume_ratio, calculate_vix
+import threading
+
+from data.data_fetcher import fetch_fundamentals
 from indicators.fundamental import calculate_revenue_growth, calculate_fcf_growth
 from scoring.scorer import (
     score_peg_ratio, score_operating_margin, score_free_cash_flow,
-    score_revenue_growth, score_fcf_growth, score_debt_to_equity,
-    score_trend, score_rsi, score_volume, score_vix
+    score_revenue_growth, score_fcf_growth, score_debt_to_equity
 )
+from scoring.relative import get_relative_scorer
+from analysis.pipeline import AnalysisPipeline, source_nodes
 from utils.helpers import get_recommendation
 
+# Every indicator scores 0-5 points
+MAX_INDICATOR_SCORE = 5
+
+# Order of the indicators in the scores dictionary
+FUNDAMENTAL_INDICATORS = [
+    '1. PEG Ratio', '2. Operating Margin', '3. Free Cash Flow',
+    '4. Revenue Growth', '5. FCF Growth', '6. Debt-to-Equity',
+]
+TECHNICAL_INDICATORS = [
+    '7. Trend (MA50/200)', '8. Momentum (RSI)', '9. Volume', '10. VIX Filter',
+]
+
+# Expensive downloads skipped when a ticker is pruned before the fundamental stage
+# (the pipeline's fundamentals and quarterly statements nodes)
+FUNDAMENTAL_FETCHES = len(source_nodes('fundamental_scores'))
 
-def analyze_stock(ticker):
+
+def score_technical_stage(price_data, vix, ticker=None):
     """
-    Complete analysis of a stock
-    
+    Score the cheap technical indicators from price history
+
+    Args:
+        price_data: DataFrame of daily OHLCV bars
+        vix: Current VIX value
+        ticker: Stock symbol (lets the indicator store reuse earlier results)
+
     Returns:
-        Dictionary with scores and recommendation
+        Dictionary with the latest indicator values and a 'scores' dict
     """
-    
-    print(f"\n{'='*60}")
-    print(f"Analyzing: {ticker}")
-    print(f"{'='*60}\n")
-    
-    # Fetch data
-    price_data = fetch_stock_data(ticker)
-    fundamentals = fetch_fundamentals(ticker)
-    
-    if price_data.empty:
-        print(f"Error: Could not fetch data for {ticker}")
-        return None
-    
-    # Get latest values
-    current_price = price_data['Close'].iloc[-1]
-    
-    # Calculate technical indicators
-    ma50, ma200 = calculate_moving_averages(price_data['Close'])
-    rsi = calculate_rsi(price_data['Close'])
-    volume_ratio = calculate_volume_ratio(price_data['Volume'])
-    vix = calculate_vix()
-    
-    # Get latest technical values
-    latest_ma50 = ma50.iloc[-1]
-    latest_ma200 = ma200.iloc[-1]
-    latest_rsi = rsi.iloc[-1]
-    latest_volume_ratio = volume_ratio.iloc[-1]
-    
+    # The pipeline's technical branch, fed the given prices and VIX
+    pipeline = AnalysisPipeline()
+    pipeline.put(ticker, 'vix', vix)
+    pipeline.put(ticker, 'prices', price_data)
+    technicals = pipeline.get(ticker, 'technicals')
+    return dict(technicals, vix=vix, scores=pipeline.get(ticker, 'technical_scores'))
+
+
+def score_fundamental_stage(ticker, fundamentals=None, revenue_growth=None, fcf_growth=None):
+    """
+    Score the fundamental indicators (the expensive downloads)
+
+    Args:
+        ticker: Stock symbol
+        fundamentals: Already fetched fundamentals (fetched here if None)
+        revenue_growth, fcf_growth: Already computed growth percentages (computed here if None)
+
+    Returns:
+        Dictionary of the six fundamental scores (PEG, operating margin and
+        debt-to-equity scored against sector peers when set_relative_scorer()
+        is active)
+    """
+    if fundamentals is None:
+        fundamentals = fetch_fundamentals(ticker)
+
     # Calculate growth metrics
-    revenue_growth = calculate_revenue_growth(ticker)
-    fcf_growth = calculate_fcf_growth(ticker)
-    
-    # Calculate scores for all 10 indicators
+    if revenue_growth is None:
+        revenue_growth = calculate_revenue_growth(ticker)
+    if fcf_growth is None:
+        fcf_growth = calculate_fcf_growth(ticker)
+
     scores = {
         '1. PEG Ratio': score_peg_ratio(fundamentals.get('peg_ratio', 0)),
         '2. Operating Margin': score_operating_margin(fundamentals.get('operating_margin', 0)),
@@ -59,41 +80,171 @@ def analyze_stock(ticker):
         '4. Revenue Growth': score_revenue_growth(revenue_growth),
         '5. FCF Growth': score_fcf_growth(fcf_growth),
         '6. Debt-to-Equity': score_debt_to_equity(fundamentals.get('debt_to_equity', 0)),
-        '7. Trend (MA50/200)': score_trend(current_price, latest_ma50, latest_ma200),
-        '8. Momentum (RSI)': score_rsi(latest_rsi),
-        '9. Volume': score_volume(latest_volume_ratio),
-        '10. VIX Filter': score_vix(vix),
     }
-    
+
+    # Sector-relative mode replaces the absolute PEG, margin and leverage scores
+    relative = get_relative_scorer()
+    if relative is not None:
+        scores.update(relative.score(fundamentals))
+    return scores
+
+
+def build_analysis(ticker, technicals, fundamental_scores):
+    """
+    Combine both stages into the final analysis
+
+    Returns:
+        Dictionary with scores and recommendation
+    """
+    scores = {}
+    for indicator in FUNDAMENTAL_INDICATORS:
+        scores[indicator] = fundamental_scores[indicator]
+    for indicator in TECHNICAL_INDICATORS:
+        scores[indicator] = technicals['scores'][indicator]
+
     # Calculate total score
     total_score = sum(scores.values())
     percentage = (total_score / 50) * 100
     recommendation = get_recommendation(total_score)
-    
-    # Print results
-    print(f"Current Price: ${current_price:.2f}")
-    print(f"50-day MA: ${latest_ma50:.2f}")
-    print(f"200-day MA: ${latest_ma200:.2f}")
-    print(f"RSI: {latest_rsi:.2f}")
-    print(f"Volume Ratio: {latest_volume_ratio:.2f}x")
-    print(f"VIX: {vix:.2f}\n")
-    
-    print("INDICATOR SCORES (0-5 each):")
-    print("-" * 40)
-    for indicator, score in scores.items():
-        print(f"{indicator:.<35} {score:>4.1f}")
-    
-    print("-" * 40)
-    print(f"{'TOTAL SCORE':.<35} {total_score:>4.1f}/50")
-    print(f"{'PERCENTAGE':.<35} {percentage:>4.1f}%")
-    print(f"\nRECOMMENDATION: {recommendation}")
-    print(f"{'='*60}\n")
-    
+
     return {
         'ticker': ticker,
-        'current_price': current_price,
+        'current_price': technicals['current_price'],
         'scores': scores,
         'total_score': total_score,
         'percentage': percentage,
         'recommendation': recommendation,
-    }
\ No newline at end of file
+    }
+
+
+def print_analysis(technicals, analysis):
+    """
+    Print the indicator values and scores of an analysis
+
+    Args:
+        technicals: Latest indicator values (with the VIX)
+        analysis: Dictionary returned by build_analysis()
+    """
+    print(f"Current Price: ${technicals['current_price']:.2f}")
+    print(f"50-day MA: ${technicals['ma50']:.2f}")
+    print(f"200-day MA: ${technicals['ma200']:.2f}")
+    print(f"RSI: {technicals['rsi']:.2f}")
+    print(f"Volume Ratio: {technicals['volume_ratio']:.2f}x")
+    print(f"VIX: {technicals['vix']:.2f}\n")
+
+    print("INDICATOR SCORES (0-5 each):")
+    print("-" * 40)
+    for indicator, score in analysis['scores'].items():
+        print(f"{indicator:.<35} {score:>4.1f}")
+
+    print("-" * 40)
+    print(f"{'TOTAL SCORE':.<35} {analysis['total_score']:>4.1f}/50")
+    print(f"{'PERCENTAGE':.<35} {analysis['percentage']:>4.1f}%")
+    print(f"\nRECOMMENDATION: {analysis['recommendation']}")
+    print(f"{'='*60}\n")
+
+
+def _report(ticker, pipeline):
+    """Run (or reuse) the pipeline's analysis of a ticker and print it"""
+    outputs = pipeline.get(ticker, ['technicals', 'regime', 'analysis'])
+    # Printed here, not in the memoized node, so every call shows the report
+    print_analysis(dict(outputs['technicals'], vix=outputs['regime']['vix']), outputs['analysis'])
+    return outputs['analysis']
+
+
+def analyze_stock(ticker, vix=None, pipeline=None):
+    """
+    Complete analysis of a stock
+
+    Args:
+        ticker: Stock symbol
+        vix: Current VIX value (fetched if None)
+        pipeline: AnalysisPipeline to share memoized inputs (the VIX, price
+            histories) across calls; a new one is used if None
+
+    Returns:
+        Dictionary with scores and recommendation
+    """
+    print(f"\n{'='*60}")
+    print(f"Analyzing: {ticker}")
+    print(f"{'='*60}\n")
+
+    if pipeline is None:
+        pipeline = AnalysisPipeline(vix=vix)
+
+    if pipeline.get(ticker, 'prices').empty:
+        print(f"Error: Could not fetch data for {ticker}")
+        return None
+
+    return _report(ticker, pipeline)
+
+
+class ScreeningStats:
+    """Thread-safe counters for a staged screening run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.screened = 0
+        self.pruned = 0
+        self.fetches_avoided = 0
+
+    def record(self, pruned):
+        with self._lock:
+            self.screened += 1
+            if pruned:
+                self.pruned += 1
+                self.fetches_avoided += FUNDAMENTAL_FETCHES
+
+    def as_dict(self):
+        return {
+            'screened': self.screened,
+            'pruned': self.pruned,
+            'fetches_avoided': self.fetches_avoided,
+        }
+
+
+def screen_stock(ticker, min_score, vix=None, stats=None, pipeline=None):
+    """
+    Staged analysis that skips fundamentals for tickers that cannot qualify
+
+    The technical indicators are scored first. If that score plus the maximum
+    the six fundamental indicators could still add is below min_score, the
+    ticker is dropped without downloading fundamentals or quarterly
+    statements. Tickers that survive get exactly the analyze_stock() result.
+
+    Args:
+        ticker: Stock symbol
+        min_score: Total score the ticker needs to reach
+        vix: Current VIX value (fetched if None; pass it in when screening many tickers)
+        stats: Optional ScreeningStats to record pruning in
+        pipeline: AnalysisPipeline to share memoized inputs across calls (a
+            new one is used if None)
+
+    Returns:
+        Analysis dictionary, or None if the ticker was pruned or has no data
+    """
+    if pipeline is None:
+        pipeline = AnalysisPipeline(vix=vix)
+
+    if pipeline.get(ticker, 'prices').empty:
+        print(f"Error: Could not fetch data for {ticker}")
+        return None
+
+    # Only the technical branch of the pipeline runs here
+    technical_scores = pipeline.get(ticker, 'technical_scores')
+    best_possible = sum(technical_scores.values()) + MAX_INDICATOR_SCORE * len(FUNDAMENTAL_INDICATORS)
+
+    if best_possible < min_score:
+        print(f"Skipping {ticker}: best possible score {best_possible}/50 is below {min_score}")
+        if stats is not None:
+            stats.record(pruned=True)
+        return None
+
+    if stats is not None:
+        stats.record(pruned=False)
+
+    print(f"\n{'='*60}")
+    print(f"Analyzing: {ticker}")
+    print(f"{'='*60}\n")
+
+    return _report(ticker, pipeline)
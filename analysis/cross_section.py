@@ -0,0 +1,215 @@
+"""
+Cross-sectional ranking of a ticker universe
+
+analyze_stock() scores one ticker as of today. This module scores every
+ticker on every day and compares them with each other: given a score panel
+(dates x tickers) it computes per-day ranks, percentiles and top-K membership
+with whole-panel NumPy/pandas operations, no per-day Python loop.
+
+Top-K selection finds each day's K-th best score with np.partition (linear in
+the number of tickers) instead of sorting the day. Ties at the K-th score go
+to the tickers in earlier columns, so order the panel's columns (e.g.
+alphabetically, or by liquidity) to control who wins a tie.
+
+Only the technical factors have a daily history (fundamentals are a snapshot
+of today), so technical_score_panel() applies the trend, RSI and volume rules
+of scoring.scorer to every day. The VIX score is the same for every ticker on
+a given day and cannot change a ranking, so it is left out.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data.data_fetcher import fetch_stock_data, get_panel, _period_days
+from indicators.technical import calculate_moving_averages, calculate_rsi, calculate_volume_ratio
+from config import SCORE_RANGES, MA_SHORT_PERIOD, MA_LONG_PERIOD, RSI_PERIOD, VOLUME_PERIOD, DEFAULT_INTERVAL
+
+
+def load_price_panels(tickers, period="10y", interval=DEFAULT_INTERVAL, workers=8):
+    """
+    Download price histories and align them into panels
+
+    Args:
+        tickers: List of stock symbols
+        period: History to download (yfinance period string)
+        interval: Bar size
+        workers: Download threads
+
+    Returns:
+        Tuple of (close, volume) DataFrames, dates x tickers (NaN where a
+        ticker has no bar); tickers without data are left out. When a price
+        panel is active (data.data_fetcher.set_panel) the tickers it holds are
+        read from it as whole columns instead of one history at a time.
+    """
+    tickers = list(tickers)
+    panel = get_panel()
+    if panel is not None and panel.interval == interval and any(ticker in panel for ticker in tickers):
+        close, volume = _panel_slices(panel, tickers, period)
+        rest = [ticker for ticker in tickers if ticker not in panel]
+        if not rest:
+            return close, volume
+        rest_close, rest_volume = load_price_panels(rest, period, interval, workers)
+        return close.join(rest_close, how='outer'), volume.join(rest_volume, how='outer')
+
+    def load(ticker):
+        return ticker, fetch_stock_data(ticker, period=period, interval=interval)
+
+    closes, volumes = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for ticker, history in executor.map(load, tickers):
+            if history.empty:
+                print(f"Error: No data available for {ticker}")
+                continue
+            closes[ticker] = history['Close']
+            volumes[ticker] = history['Volume']
+
+    return pd.DataFrame(closes).sort_index(), pd.DataFrame(volumes).sort_index()
+
+
+def _panel_slices(panel, tickers, period):
+    """Close and volume panels of the tickers a PricePanel holds, trimmed to period"""
+    held = [ticker for ticker in tickers if ticker in panel]
+    # Every ticker, in the panel's order, is a view of the mapped arrays; a subset is a copy
+    subset = None if held == panel.tickers else held
+    days = _period_days(period)
+    start = None if days == float("inf") else panel.dates[-1] - pd.Timedelta(days=days)
+    close = panel.panel('Close', start=start, tickers=subset)
+    volume = panel.panel('Volume', start=start, tickers=subset)
+    # Drop calendar rows where none of these tickers traded
+    traded = close.notna().any(axis=1).to_numpy()
+    if not traded.all():
+        close, volume = close[traded], volume[traded]
+    return close, volume
+
+
+def technical_score_panel(close, volume, ma_short_period=MA_SHORT_PERIOD, ma_long_period=MA_LONG_PERIOD,
+                          rsi_period=RSI_PERIOD, volume_period=VOLUME_PERIOD):
+    """
+    Technical score of every ticker on every day
+
+    Applies score_trend, score_rsi and score_volume from scoring.scorer to
+    the whole panel at once (missing indicators get the same neutral points).
+
+    Args:
+        close: DataFrame of closing prices, dates x tickers
+        volume: DataFrame of volumes with the same shape
+        ma_short_period, ma_long_period, rsi_period, volume_period: Indicator windows
+
+    Returns:
+        DataFrame of points (3-15), NaN where a ticker has no close that day
+    """
+    ma50, ma200 = calculate_moving_averages(close, ma_short_period, ma_long_period)
+    rsi = calculate_rsi(close, rsi_period).to_numpy()
+    volume_ratio = calculate_volume_ratio(volume, volume_period).to_numpy()
+    price, ma50, ma200 = close.to_numpy(), ma50.to_numpy(), ma200.to_numpy()
+
+    with np.errstate(invalid='ignore'):
+        trend = np.select([np.isnan(price) | np.isnan(ma50) | np.isnan(ma200),
+                           (price > ma200) & (price > ma50),
+                           (price > ma50) & (price > ma200 * 0.98),
+                           price > ma50, price > ma200],
+                          [2, 5, 4, 3, 2], 1)
+        r = SCORE_RANGES['rsi']
+        momentum = np.select([np.isnan(rsi), rsi < r[0], rsi < r[1], rsi < r[2]], [2, 4, 5, 3], 1)
+        r = SCORE_RANGES['volume_ratio']
+        volume_points = np.select([np.isnan(volume_ratio), volume_ratio > r[1], volume_ratio > r[0],
+                                   volume_ratio > 0.8],
+                                  [2, 5, 3, 2], 1)
+
+    scores = (trend + momentum + volume_points).astype(float)
+    scores[np.isnan(price)] = np.nan
+    return pd.DataFrame(scores, index=close.index, columns=close.columns)
+
+
+def rank_panel(scores):
+    """
+    Rank the tickers on every day
+
+    Args:
+        scores: DataFrame, dates x tickers (higher is better, NaN is skipped)
+
+    Returns:
+        Tuple of (ranks, percentiles) DataFrames. Rank 1 is the day's best
+        score (ties share the best rank); the percentile is the share of the
+        day's tickers scoring at or below the ticker (0-100].
+    """
+    ranks = scores.rank(axis=1, method='min', ascending=False)
+    percentiles = scores.rank(axis=1, method='max', pct=True) * 100
+    return ranks, percentiles
+
+
+def _selection_keys(scores):
+    """Score matrix with missing values pushed below every real score"""
+    values = scores.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    return np.where(valid, values, -np.inf), valid
+
+
+def top_k_mask(scores, k):
+    """
+    Top-K membership of every day
+
+    Args:
+        scores: DataFrame, dates x tickers (higher is better, NaN is never selected)
+        k: Names to select per day
+
+    Returns:
+        Boolean DataFrame with exactly min(k, tickers with a score) True per day
+    """
+    keys, valid = _selection_keys(scores)
+    k = min(k, keys.shape[1])
+    if k <= 0:
+        return pd.DataFrame(False, index=scores.index, columns=scores.columns)
+
+    # K-th best score of each day without sorting the day
+    kth = -np.partition(-keys, k - 1, axis=1)[:, k - 1:k]
+    above = keys > kth
+    # Fill the remaining places with tied tickers, earliest columns first
+    ties = (keys == kth) & valid
+    needed = k - above.sum(axis=1, keepdims=True)
+    mask = (above & valid) | (ties & (np.cumsum(ties, axis=1) <= needed))
+    return pd.DataFrame(mask, index=scores.index, columns=scores.columns)
+
+
+def top_k_table(scores, k):
+    """
+    The K best tickers of every day, best first
+
+    Args:
+        scores: DataFrame, dates x tickers
+        k: Names per day
+
+    Returns:
+        DataFrame, dates x 1..k, of ticker symbols (None where a day has
+        fewer than k scored tickers)
+    """
+    mask = top_k_mask(scores, k).to_numpy()
+    keys, _ = _selection_keys(scores)
+    k = min(k, keys.shape[1])
+    chosen = np.where(mask, keys, -np.inf)
+
+    # Only the k selected columns of each day are sorted
+    members = np.argpartition(-chosen, k - 1, axis=1)[:, :k] if k < keys.shape[1] else \
+        np.tile(np.arange(keys.shape[1]), (len(keys), 1))
+    member_keys = np.take_along_axis(chosen, members, axis=1)
+    order = np.lexsort((members, -member_keys), axis=1)
+    members = np.take_along_axis(members, order, axis=1)
+    selected = np.take_along_axis(mask, members, axis=1)
+
+    symbols = np.asarray(scores.columns, dtype=object)[members]
+    symbols[~selected] = None
+    # object dtype keeps the None (pandas would infer a string dtype and turn it into NaN)
+    return pd.DataFrame(symbols, index=scores.index, columns=range(1, k + 1), dtype=object)
+
+
+def cross_section(scores, k=20):
+    """
+    Ranks, percentiles and top-K membership of a score panel
+
+    Returns:
+        Dictionary with 'ranks', 'percentiles' and 'top_k' DataFrames
+    """
+    ranks, percentiles = rank_panel(scores)
+    return {'ranks': ranks, 'percentiles': percentiles, 'top_k': top_k_mask(scores, k)}
@@ -0,0 +1,285 @@
+"""
+Lazy analysis pipeline
+
+analyze_stock() used to run every step for every call: download prices,
+fundamentals and quarterly statements, compute all indicators, fetch the
+VIX, then score. A caller that only wants the RSI, or only the technical
+scores, paid for all of it. AnalysisPipeline describes the analysis as a
+graph of named nodes instead:
+
+    prices -> ma_short, ma_long, rsi, volume_ratio -> technicals -> technical_scores
+    fundamentals ---------------------------------------------> fundamental_scores
+    statements -> revenue_growth, fcf_growth ----------------/
+    vix -> regime -> technical_scores
+    technicals, technical_scores, fundamental_scores -> analysis
+
+Callers ask for the outputs they need (pipeline.get('AAPL', 'rsi')) and only
+those nodes and their upstream dependencies run. Every result is memoized,
+per ticker for ticker nodes and once per pipeline for market-wide nodes (the
+VIX and the regime), so one pipeline shared across tickers and calls fetches
+the VIX once and never computes a node twice. Threads asking for the same
+node at once wait for a single computation.
+
+Memoized values live as long as the pipeline; call forget(ticker) once a
+ticker is done to release its price history. Failures are not memoized.
+"""
+
+import inspect
+import threading
+
+from data.data_fetcher import fetch_stock_data, fetch_fundamentals, fetch_quarterly_financials
+from indicators.technical import calculate_vix
+from indicators.indicator_store import compute_indicator
+from indicators.fundamental import calculate_revenue_growth, calculate_fcf_growth
+from scoring.scorer import score_trend, score_rsi, score_volume, score_vix
+from config import MA_SHORT_PERIOD, MA_LONG_PERIOD, RSI_PERIOD, VOLUME_PERIOD, SCORE_RANGES
+
+# Node name -> dict(func, deps, per_ticker); deps are the names of func's arguments
+NODES = {}
+
+# Regime labels for the SCORE_RANGES['vix'] bands
+REGIME_LEVELS = ['calm', 'normal', 'elevated', 'stressed']
+
+
+def node(name, per_ticker=True):
+    """
+    Register a function as a pipeline node
+
+    The function's arguments name the nodes it depends on; per-ticker nodes
+    also take the ticker as their first argument.
+    """
+    def register(func):
+        deps = list(inspect.signature(func).parameters)
+        if per_ticker:
+            deps = deps[1:]
+        NODES[name] = {'func': func, 'deps': deps, 'per_ticker': per_ticker}
+        return func
+    return register
+
+
+@node('prices')
+def _prices(ticker):
+    return fetch_stock_data(ticker)
+
+
+@node('fundamentals')
+def _fundamentals(ticker):
+    return fetch_fundamentals(ticker)
+
+
+@node('statements')
+def _statements(ticker):
+    return fetch_quarterly_financials(ticker)
+
+
+@node('ma_short')
+def _ma_short(ticker, prices):
+    return compute_indicator(prices['Close'], 'ma', MA_SHORT_PERIOD, ticker)
+
+
+@node('ma_long')
+def _ma_long(ticker, prices):
+    return compute_indicator(prices['Close'], 'ma', MA_LONG_PERIOD, ticker)
+
+
+@node('rsi')
+def _rsi(ticker, prices):
+    return compute_indicator(prices['Close'], 'rsi', RSI_PERIOD, ticker)
+
+
+@node('volume_ratio')
+def _volume_ratio(ticker, prices):
+    return compute_indicator(prices['Volume'], 'volume_ratio', VOLUME_PERIOD, ticker)
+
+
+@node('technicals')
+def _technicals(ticker, prices, ma_short, ma_long, rsi, volume_ratio):
+    return {
+        'current_price': prices['Close'].iloc[-1],
+        'ma50': ma_short.iloc[-1],
+        'ma200': ma_long.iloc[-1],
+        'rsi': rsi.iloc[-1],
+        'volume_ratio': volume_ratio.iloc[-1],
+    }
+
+
+@node('vix', per_ticker=False)
+def _vix():
+    return calculate_vix()
+
+
+@node('regime', per_ticker=False)
+def _regime(vix):
+    level = None
+    if vix is not None:
+        level = REGIME_LEVELS[sum(vix >= cutoff for cutoff in SCORE_RANGES['vix'])]
+    return {'vix': vix, 'level': level, 'score': score_vix(vix)}
+
+
+@node('technical_scores')
+def _technical_scores(ticker, technicals, regime):
+    return {
+        '7. Trend (MA50/200)': score_trend(technicals['current_price'], technicals['ma50'], technicals['ma200']),
+        '8. Momentum (RSI)': score_rsi(technicals['rsi']),
+        '9. Volume': score_volume(technicals['volume_ratio']),
+        '10. VIX Filter': regime['score'],
+    }
+
+
+@node('revenue_growth')
+def _revenue_growth(ticker, statements):
+    return calculate_revenue_growth(ticker, statements)
+
+
+@node('fcf_growth')
+def _fcf_growth(ticker, statements):
+    return calculate_fcf_growth(ticker, statements)
+
+
+@node('fundamental_scores')
+def _fundamental_scores(ticker, fundamentals, revenue_growth, fcf_growth):
+    # Imported here: analyzer imports this module for analyze_stock()
+    from analysis.analyzer import score_fundamental_stage
+    return score_fundamental_stage(ticker, fundamentals, revenue_growth, fcf_growth)
+
+
+@node('analysis')
+def _analysis(ticker, technicals, regime, technical_scores, fundamental_scores):
+    from analysis.analyzer import build_analysis
+    return build_analysis(ticker, dict(technicals, vix=regime['vix'], scores=technical_scores), fundamental_scores)
+
+
+def source_nodes(outputs):
+    """
+    Nodes without dependencies (the downloads) that outputs are computed from
+
+    Args:
+        outputs: Node name, or list of node names
+
+    Returns:
+        Sorted list of node names
+    """
+    sources, stack = set(), [outputs] if isinstance(outputs, str) else list(outputs)
+    while stack:
+        name = stack.pop()
+        deps = NODES[name]['deps']
+        if not deps:
+            sources.add(name)
+        stack.extend(deps)
+    return sorted(sources)
+
+
+class AnalysisPipeline:
+    def __init__(self, vix=None):
+        """
+        Create an empty pipeline (nothing runs until an output is requested)
+
+        Args:
+            vix: Current VIX value to use instead of fetching it
+        """
+        self._values = {}           # (node, ticker or None) -> value
+        self._lock = threading.Lock()
+        self._pending = {}          # key -> Event for computations in progress
+        self.runs = {name: 0 for name in NODES}
+        self.hits = {name: 0 for name in NODES}
+        if vix is not None:
+            self._values[('vix', None)] = vix
+
+    @staticmethod
+    def _key(name, ticker):
+        if name not in NODES:
+            raise KeyError(f"Unknown pipeline node '{name}' (one of {', '.join(NODES)})")
+        return (name, ticker if NODES[name]['per_ticker'] else None)
+
+    def put(self, ticker, name, value):
+        """
+        Set a node's value instead of computing it (e.g. price history already in hand)
+
+        Args:
+            ticker: Stock symbol (ignored by market-wide nodes)
+            name: Node name
+            value: Value the node's dependents will see
+        """
+        with self._lock:
+            self._values[self._key(name, ticker)] = value
+
+    def get(self, ticker, outputs):
+        """
+        Compute outputs for a ticker, running only the nodes they need
+
+        Args:
+            ticker: Stock symbol (ignored by market-wide nodes)
+            outputs: Node name, or list of node names
+
+        Returns:
+            The node's value for a name, or a dictionary of name -> value for a list
+        """
+        if isinstance(outputs, str):
+            return self._get(outputs, ticker)
+        return {name: self._get(name, ticker) for name in outputs}
+
+    def _get(self, name, ticker):
+        key = self._key(name, ticker)
+        while True:
+            with self._lock:
+                if key in self._values:
+                    self.hits[name] += 1
+                    return self._values[key]
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    break
+            # Another thread is computing this node; wait and look again
+            event.wait()
+
+        try:
+            spec = NODES[name]
+            inputs = {dep: self._get(dep, ticker) for dep in spec['deps']}
+            value = spec['func'](ticker, **inputs) if spec['per_ticker'] else spec['func'](**inputs)
+            with self._lock:
+                self._values[key] = value
+                self.runs[name] += 1
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+    def plan(self, outputs, ticker=None):
+        """
+        Nodes that requesting outputs would run, dependencies first
+
+        Args:
+            outputs: Node name, or list of node names
+            ticker: Stock symbol (nodes already computed for it are left out)
+
+        Returns:
+            List of node names
+        """
+        order = []
+
+        def visit(name):
+            if name in order or self._key(name, ticker) in self._values:
+                return
+            for dep in NODES[name]['deps']:
+                visit(dep)
+            order.append(name)
+
+        for name in [outputs] if isinstance(outputs, str) else outputs:
+            visit(name)
+        return order
+
+    def forget(self, ticker):
+        """Drop the memoized values of one ticker (market-wide nodes are kept)"""
+        with self._lock:
+            for key in [key for key in self._values if key[1] == ticker]:
+                del self._values[key]
+
+    def stats(self):
+        """
+        Returns:
+            Dictionary with the runs and memoized hits of each node that was requested
+        """
+        with self._lock:
+            return {name: {'runs': self.runs[name], 'hits': self.hits[name]}
+                    for name in NODES if self.runs[name] or self.hits[name]}
@@ -0,0 +1,359 @@
+"""
+What-if analysis of scoring thresholds
+
+Tuning SCORE_RANGES or RECOMMENDATION_THRESHOLDS in config.py used to mean
+editing the file and re-running analyze_stock() over the universe, which
+downloads everything again. This module separates the two steps:
+
+1. capture_factors() downloads the raw inputs of the ten indicators once
+   (PEG, operating margin, FCF and revenue, growth rates, D/E, price and
+   moving averages, RSI, volume ratio, VIX) into a factor matrix with one row
+   per ticker. save_factors()/load_factors() keep it on disk.
+2. what_if() re-scores that matrix under any number of alternative threshold
+   configurations without network access. Every scoring rule of
+   scoring.scorer is expressed with np.select on a (configurations x tickers)
+   grid, so all configurations are scored in one vectorized pass.
+
+The report shows, per configuration, how many tickers land in each
+recommendation level, how many change level compared with the baseline
+(config.py), and how far the ranking moves (Spearman correlation and top-K
+overlap).
+"""
+
+import copy
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analysis.analyzer import FUNDAMENTAL_INDICATORS, TECHNICAL_INDICATORS, score_technical_stage
+from data.data_fetcher import fetch_stock_data, fetch_fundamentals
+from indicators.fundamental import calculate_revenue_growth, calculate_fcf_growth
+from indicators.technical import calculate_vix
+from config import SCORE_RANGES, RECOMMENDATION_THRESHOLDS
+
+FACTOR_COLUMNS = [
+    'peg_ratio', 'operating_margin', 'free_cash_flow', 'revenue', 'revenue_growth',
+    'fcf_growth', 'debt_to_equity', 'price', 'ma50', 'ma200', 'rsi', 'volume_ratio', 'vix',
+]
+
+# Recommendation levels from best to worst (as returned by get_recommendation)
+RECOMMENDATION_LEVELS = ['STRONG BUY', 'BUY', 'HOLD', 'WEAK SELL', 'AVOID']
+_LEVEL_KEYS = ['strong_buy', 'buy', 'hold', 'weak_sell']
+
+
+def _number(value):
+    """Raw factor value as float; missing values (None) become NaN"""
+    return np.nan if value is None else float(value)
+
+
+def capture_ticker_factors(ticker, vix):
+    """
+    Download the raw scoring inputs for one ticker
+
+    Args:
+        ticker: Stock symbol
+        vix: Current VIX value
+
+    Returns:
+        Dictionary of FACTOR_COLUMNS values, or None if there is no price data
+    """
+    price_data = fetch_stock_data(ticker)
+    if price_data.empty:
+        print(f"Error: Could not fetch data for {ticker}")
+        return None
+
+    technicals = score_technical_stage(price_data, vix, ticker)
+    fundamentals = fetch_fundamentals(ticker)
+
+    # Same lookups and defaults as score_fundamental_stage
+    return {
+        'peg_ratio': _number(fundamentals.get('peg_ratio', 0)),
+        'operating_margin': _number(fundamentals.get('operating_margin', 0)),
+        'free_cash_flow': _number(fundamentals.get('free_cash_flow', 0)),
+        'revenue': _number(fundamentals.get('revenue', 0)),
+        'revenue_growth': _number(calculate_revenue_growth(ticker)),
+        'fcf_growth': _number(calculate_fcf_growth(ticker)),
+        'debt_to_equity': _number(fundamentals.get('debt_to_equity', 0)),
+        'price': _number(technicals['current_price']),
+        'ma50': _number(technicals['ma50']),
+        'ma200': _number(technicals['ma200']),
+        'rsi': _number(technicals['rsi']),
+        'volume_ratio': _number(technicals['volume_ratio']),
+        'vix': _number(vix),
+    }
+
+
+def capture_factors(tickers, vix=None, workers=4):
+    """
+    Build the raw factor matrix for a universe (the only step that downloads)
+
+    Args:
+        tickers: Stock symbols
+        vix: Current VIX value (fetched once if None)
+        workers: Download threads
+
+    Returns:
+        DataFrame indexed by ticker with FACTOR_COLUMNS
+    """
+    tickers = list(tickers)
+    if vix is None:
+        vix = calculate_vix()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        rows = list(executor.map(lambda t: capture_ticker_factors(t, vix), tickers))
+
+    factors = {t: row for t, row in zip(tickers, rows) if row is not None}
+    return pd.DataFrame.from_dict(factors, orient='index', columns=FACTOR_COLUMNS)
+
+
+def save_factors(factors, path):
+    """Write a factor matrix to disk"""
+    factors.to_pickle(path)
+
+
+def load_factors(path):
+    """Read a factor matrix written by save_factors()"""
+    return pd.read_pickle(path)
+
+
+def make_configs(score_range_options=None, threshold_options=None):
+    """
+    Every combination of alternative score ranges and recommendation thresholds
+
+    Args:
+        score_range_options: Dict of SCORE_RANGES key -> list of candidate range lists,
+            e.g. {'rsi': [[35, 55, 70], [30, 50, 70]]}
+        threshold_options: Dict of RECOMMENDATION_THRESHOLDS key -> list of candidate cutoffs,
+            e.g. {'buy': [26, 28, 30]}
+
+    Returns:
+        List of configs, each {'score_ranges': {...}, 'thresholds': {...}} filled
+        in with the config.py values for everything not varied
+    """
+    score_range_options = score_range_options or {}
+    threshold_options = threshold_options or {}
+    range_keys = list(score_range_options)
+    threshold_keys = list(threshold_options)
+
+    configs = []
+    for values in itertools.product(*score_range_options.values(), *threshold_options.values()):
+        score_ranges = copy.deepcopy(SCORE_RANGES)
+        thresholds = dict(RECOMMENDATION_THRESHOLDS)
+        for key, value in zip(range_keys, values[:len(range_keys)]):
+            score_ranges[key] = list(value)
+        for key, value in zip(threshold_keys, values[len(range_keys):]):
+            thresholds[key] = value
+        configs.append({'score_ranges': score_ranges, 'thresholds': thresholds})
+    return configs
+
+
+def _ranges(configs, key):
+    """(configs x 1) column arrays of one SCORE_RANGES entry, one per boundary"""
+    table = np.array([c['score_ranges'][key] for c in configs], dtype=float)
+    return [table[:, i:i + 1] for i in range(table.shape[1])]
+
+
+def score_factors(factors, configs):
+    """
+    Score a factor matrix under many configurations at once
+
+    Follows the rules of scoring.scorer exactly; missing factor values get the
+    same neutral scores as None does there.
+
+    Args:
+        factors: DataFrame from capture_factors()
+        configs: List of configs (see make_configs)
+
+    Returns:
+        Dictionary of indicator name -> (configs x tickers) array of points
+    """
+    f = {c: factors[c].to_numpy(dtype=float)[None, :] for c in FACTOR_COLUMNS}
+    missing = {c: np.isnan(v) for c, v in f.items()}
+    shape = (len(configs), len(factors))
+
+    def select(conditions, choices, default):
+        conditions = [np.broadcast_to(c, shape) for c in conditions]
+        return np.select(conditions, choices, default).astype(np.int8)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        peg = f['peg_ratio']
+        r = _ranges(configs, 'peg_ratio')
+        peg_points = select([missing['peg_ratio'] | (peg <= 0), peg <= r[0], peg <= r[1], peg <= r[2]],
+                            [2, 5, 4, 3], 1)
+
+        margin = f['operating_margin']
+        r = _ranges(configs, 'operating_margin')
+        margin_points = select([missing['operating_margin'] | (margin < 0), margin > r[1], margin > r[0]],
+                               [1, 5, 3], 1)
+
+        revenue = f['revenue']
+        fcf_margin = f['free_cash_flow'] / revenue
+        r = _ranges(configs, 'fcf_margin')
+        fcf_points = select([missing['free_cash_flow'] | missing['revenue'] | (revenue == 0),
+                             fcf_margin < 0, fcf_margin > r[1], fcf_margin > r[0], fcf_margin > 0],
+                            [2, 1, 5, 3, 2], 1)
+
+        growth = f['revenue_growth']
+        r = _ranges(configs, 'revenue_growth')
+        revenue_points = select([missing['revenue_growth'], growth < 0, growth > r[1], growth > r[0], growth > 0],
+                                [2, 1, 5, 3, 2], 1)
+
+        growth = f['fcf_growth']
+        r = _ranges(configs, 'fcf_growth')
+        fcf_growth_points = select([missing['fcf_growth'], growth < 0, growth > r[1], growth > r[0]],
+                                   [2, 1, 5, 3], 1)
+
+        de = f['debt_to_equity']
+        r = _ranges(configs, 'debt_to_equity')
+        de_points = select([missing['debt_to_equity'] | (de < 0), de < r[0], de < r[1], de < r[2]],
+                           [2, 5, 4, 3], 1)
+
+        # The trend rule has no configurable ranges
+        price, ma50, ma200 = f['price'], f['ma50'], f['ma200']
+        trend_points = select([missing['price'] | missing['ma50'] | missing['ma200'],
+                               (price > ma200) & (price > ma50),
+                               (price > ma50) & (price > ma200 * 0.98),
+                               price > ma50, price > ma200],
+                              [2, 5, 4, 3, 2], 1)
+
+        rsi = f['rsi']
+        r = _ranges(configs, 'rsi')
+        rsi_points = select([missing['rsi'], rsi < r[0], rsi < r[1], rsi < r[2]], [2, 4, 5, 3], 1)
+
+        volume = f['volume_ratio']
+        r = _ranges(configs, 'volume_ratio')
+        volume_points = select([missing['volume_ratio'], volume > r[1], volume > r[0], volume > 0.8],
+                               [2, 5, 3, 2], 1)
+
+        vix = f['vix']
+        r = _ranges(configs, 'vix')
+        vix_points = select([missing['vix'], vix < r[0], vix < r[1], vix < r[2]], [3, 5, 4, 2], 1)
+
+    points = [peg_points, margin_points, fcf_points, revenue_points, fcf_growth_points, de_points,
+              trend_points, rsi_points, volume_points, vix_points]
+    return dict(zip(FUNDAMENTAL_INDICATORS + TECHNICAL_INDICATORS, points))
+
+
+def recommend(total_scores, configs):
+    """
+    Recommendation level index (0 = STRONG BUY ... 4 = AVOID) for every total score
+
+    Args:
+        total_scores: (configs x tickers) array
+        configs: List of configs supplying the thresholds
+
+    Returns:
+        int8 array of indexes into RECOMMENDATION_LEVELS
+    """
+    thresholds = np.array([[c['thresholds'][k] for k in _LEVEL_KEYS] for c in configs], dtype=float)
+    conditions = [total_scores >= thresholds[:, i:i + 1] for i in range(len(_LEVEL_KEYS))]
+    return np.select(conditions, list(range(len(_LEVEL_KEYS))), len(_LEVEL_KEYS)).astype(np.int8)
+
+
+def _row_ranks(values):
+    """Average ranks of each row (highest score = rank 1)"""
+    return pd.DataFrame(-values).rank(axis=1, method='average').to_numpy()
+
+
+def _row_correlation(a, b):
+    """Pearson correlation of each row of a with the single row b"""
+    a = a - a.mean(axis=1, keepdims=True)
+    b = b - b.mean()
+    denominator = np.sqrt((a ** 2).sum(axis=1) * (b ** 2).sum())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, (a * b).sum(axis=1) / denominator, np.nan)
+
+
+def what_if(factors, configs, top_k=10):
+    """
+    Re-score a factor matrix under alternative configurations and compare with config.py
+
+    Args:
+        factors: DataFrame from capture_factors()
+        configs: List of configs (see make_configs)
+        top_k: Size of the top list used for the overlap statistic
+
+    Returns:
+        Dictionary with
+        - 'summary': DataFrame, one row per config: counts per recommendation level,
+          tickers whose level changed, mean score, Spearman rank correlation and
+          top-K overlap with the baseline
+        - 'total_scores': DataFrame of total scores (configs x tickers)
+        - 'recommendations': DataFrame of recommendation levels (configs x tickers)
+        - 'baseline': Series of baseline recommendations per ticker
+    """
+    baseline_config = {'score_ranges': SCORE_RANGES, 'thresholds': RECOMMENDATION_THRESHOLDS}
+    all_configs = [baseline_config] + list(configs)
+
+    points = score_factors(factors, all_configs)
+    totals = np.sum(list(points.values()), axis=0, dtype=np.int16)
+    levels = recommend(totals, all_configs)
+
+    base_totals, totals = totals[0], totals[1:]
+    base_levels, levels = levels[0], levels[1:]
+
+    counts = np.stack([(levels == i).sum(axis=1) for i in range(len(RECOMMENDATION_LEVELS))], axis=1)
+    summary = pd.DataFrame(counts, columns=RECOMMENDATION_LEVELS)
+    summary['changed'] = (levels != base_levels).sum(axis=1)
+    summary['upgraded'] = (levels < base_levels).sum(axis=1)
+    summary['downgraded'] = (levels > base_levels).sum(axis=1)
+    summary['mean_score'] = totals.mean(axis=1)
+
+    ranks = _row_ranks(totals.astype(float))
+    base_ranks = _row_ranks(base_totals[None, :].astype(float))[0]
+    summary['rank_correlation'] = _row_correlation(ranks, base_ranks)
+
+    k = min(top_k, len(factors))
+    if k > 0:
+        base_top = np.argsort(-base_totals, kind='stable')[:k]
+        top = np.argsort(-totals, axis=1, kind='stable')[:, :k]
+        summary[f'top{top_k}_overlap'] = np.isin(top, base_top).sum(axis=1) / k
+
+    # Columns describing what each configuration changed
+    for name, values in _describe_configs(configs).items():
+        summary.insert(0, name, values)
+
+    names = np.array(RECOMMENDATION_LEVELS, dtype=object)
+    return {
+        'summary': summary,
+        'total_scores': pd.DataFrame(totals, columns=factors.index),
+        'recommendations': pd.DataFrame(names[levels], columns=factors.index),
+        'baseline': pd.Series(names[base_levels], index=factors.index, name='baseline'),
+    }
+
+
+def _describe_configs(configs):
+    """Columns for the settings that differ from config.py in at least one config"""
+    columns = {}
+    for key, base in RECOMMENDATION_THRESHOLDS.items():
+        values = [c['thresholds'][key] for c in configs]
+        if any(v != base for v in values):
+            columns[key] = values
+    for key, base in SCORE_RANGES.items():
+        values = [c['score_ranges'][key] for c in configs]
+        if any(list(v) != list(base) for v in values):
+            columns[key] = [str(list(v)) for v in values]
+    # summary.insert(0, ...) reverses the order, so reverse here to keep config order
+    return dict(reversed(list(columns.items())))
+
+
+def print_what_if_summary(result, limit=20, sort_by='changed'):
+    """
+    Print the configurations that move recommendations the most
+
+    Args:
+        result: Dictionary from what_if()
+        limit: Rows to print
+        sort_by: Summary column to sort by (descending)
+    """
+    baseline = result['baseline'].value_counts().reindex(RECOMMENDATION_LEVELS, fill_value=0)
+    print("\n" + "="*80)
+    print(f"WHAT-IF ANALYSIS ({len(result['summary'])} configurations, {len(result['baseline'])} tickers)")
+    print("="*80)
+    print("Baseline (config.py): " + ", ".join(f"{level} {count}" for level, count in baseline.items()))
+    print("-"*80)
+    with pd.option_context('display.width', 200, 'display.max_columns', 50):
+        print(result['summary'].sort_values(sort_by, ascending=False).head(limit).to_string())
+    print("="*80 + "\n")
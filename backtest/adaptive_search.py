@@ -0,0 +1,384 @@
+"""
+Adaptive parameter search with early pruning
+
+A full grid over the risk knobs and indicator periods backtests every
+combination on the whole history, although most of them are clearly bad
+after the first year. Successive halving spends that compute on the
+promising ones instead:
+
+1. Every configuration is simulated on a short prefix of the history
+   (min_bars bars from start_date).
+2. Configurations are ranked, and only the best 1/eta survive. A
+   configuration whose Sharpe ratio and max drawdown are both beaten by
+   another one (it is dominated) ranks below every configuration that is not.
+3. The survivors get a prefix eta times longer, and so on until the last
+   rung, where the remaining few run on the full history.
+
+Hyperband (method='hyperband') splits the grid at random between several
+such brackets, in Hyperband's proportions. The largest share starts on the
+shortest prefix as above, and smaller shares start on longer prefixes, down
+to a few configurations that run on the full history at once. Those later
+brackets guard against settings that only pay off late.
+
+Signals are computed once per indicator setting over the backtest window,
+exactly as Backtester.run() computes them. The indicators only look back, so
+the signals of a prefix equal those of a run that ends there, and the
+full-history metrics of a configuration are those of
+Backtester(**params).run() over the same dates. All risk settings that share
+an indicator setting are simulated together by simulate_batch(). Progress is
+saved after every rung when state_path is given. A run that is interrupted
+picks up at the next rung, as long as the grid, the search settings and the
+price history are unchanged.
+
+Compute is counted in bar evaluations (configurations x bars simulated). The
+result reports it against the full grid on the full history.
+"""
+
+import math
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from backtest.backtester import Backtester
+from backtest.batch_simulator import simulate_batch
+from backtest.result_store import hash_price_data
+from backtest.walk_forward import RISK_PARAMS, expand_grid, index_timestamp
+from data.bars import BarData
+from data.data_fetcher import fetch_stock_data
+from config import DEFAULT_INTERVAL, PERIODS_PER_YEAR
+
+# Bump when the saved state changes
+SEARCH_STATE_VERSION = 2
+
+# Configurations compared at once when counting dominations (bounds memory at chunk x configs)
+DOMINANCE_CHUNK = 1024
+
+# Bars the shortest prefix holds after the longest indicator warm-up in the grid,
+# so every configuration has had time to trade before it can be pruned
+MIN_SIGNAL_BARS = 63
+
+
+def dominated_counts(sharpe, drawdown):
+    """
+    How many configurations beat each one on both Sharpe ratio and drawdown
+
+    A configuration dominates another when its Sharpe ratio is at least as high
+    and its max drawdown at least as low, and it is strictly better on one.
+
+    Args:
+        sharpe: Array of Sharpe ratios
+        drawdown: Array of max drawdowns (same length)
+
+    Returns:
+        int array; 0 for configurations on the Pareto front
+    """
+    sharpe = np.nan_to_num(np.asarray(sharpe, dtype=float), nan=-np.inf)
+    drawdown = np.nan_to_num(np.asarray(drawdown, dtype=float), nan=np.inf)
+    counts = np.empty(len(sharpe), dtype=int)
+    for start in range(0, len(sharpe), DOMINANCE_CHUNK):
+        s = sharpe[start:start + DOMINANCE_CHUNK, None]
+        d = drawdown[start:start + DOMINANCE_CHUNK, None]
+        at_least = (sharpe >= s) & (drawdown <= d)
+        strictly = (sharpe > s) | (drawdown < d)
+        counts[start:start + DOMINANCE_CHUNK] = (at_least & strictly).sum(axis=1)
+    return counts
+
+
+def rank_configs(metrics, objective):
+    """
+    Order configurations best first: undominated ones, then by the objective
+
+    Args:
+        metrics: Dictionary of arrays from simulate_batch()
+        objective: Metric to maximize ('max_drawdown' is minimized)
+
+    Returns:
+        Array of positions into the metric arrays
+    """
+    values = np.asarray(metrics[objective], dtype=float)
+    if objective == 'max_drawdown':
+        values = -values
+    values = np.nan_to_num(values, nan=-np.inf)
+    dominated = dominated_counts(metrics['sharpe_ratio'], metrics['max_drawdown'])
+    # lexsort sorts by the last key first
+    return np.lexsort((-values, dominated))
+
+
+def make_brackets(n_configs, full_bars, min_bars, eta, method, seed=0):
+    """
+    Lay out the brackets of a search
+
+    Args:
+        n_configs: Configurations in the grid
+        full_bars: Bars of the full history
+        min_bars: Bars of the shortest prefix
+        eta: Keep 1/eta of the configurations per rung, multiply the prefix by eta
+        method: 'halving' (one bracket with the whole grid) or 'hyperband'
+        seed: Random seed for Hyperband's split of the grid
+
+    Returns:
+        List of brackets, each {'configs': indices, 'rungs': prefix lengths in bars}
+    """
+    max_rungs = max(0, int(math.floor(math.log(max(full_bars / min_bars, 1), eta) + 1e-9)))
+
+    def rungs(s):
+        return [min(full_bars, int(round(full_bars / eta ** (s - k)))) for k in range(s + 1)]
+
+    if method == 'halving':
+        return [{'configs': np.arange(n_configs), 'rungs': rungs(max_rungs)}]
+    if method != 'hyperband':
+        raise ValueError(f"Unknown method '{method}'. Choose 'halving' or 'hyperband'")
+
+    # A finite grid is split between the brackets (each configuration runs in one of them)
+    # in proportion to Hyperband's bracket sizes, (s_max + 1) / (s + 1) * eta^s
+    weights = np.array([(max_rungs + 1) / (s + 1) * eta ** s for s in range(max_rungs, -1, -1)])
+    bounds = np.round(np.cumsum(weights) / weights.sum() * n_configs).astype(int)
+    shuffled = np.random.default_rng(seed).permutation(n_configs)
+    brackets = []
+    for s, start, end in zip(range(max_rungs, -1, -1), np.r_[0, bounds[:-1]], bounds):
+        if end > start:
+            brackets.append({'configs': np.sort(shuffled[start:end]), 'rungs': rungs(s)})
+    return brackets
+
+
+class _SearchSpace:
+    """Signal codes per indicator setting and the risk parameters of every configuration"""
+
+    def __init__(self, ticker, price_data, start_date, end_date, param_grid, interval):
+        indicator_settings, risk_settings = expand_grid(param_grid)
+        self.configs = [dict(indicator, **risk) for indicator in indicator_settings for risk in risk_settings]
+        self.indicator = np.repeat(np.arange(len(indicator_settings)), len(risk_settings))
+        self.risk = {p: np.array([c[p] for c in self.configs], dtype=np.float64) for p in RISK_PARAMS}
+
+        # The bars Backtester.run() would simulate (no earlier history to warm up on)
+        index = price_data.index
+        first = int(index.searchsorted(index_timestamp(start_date, index)))
+        last = int(index.searchsorted(index_timestamp(end_date, index), side='right'))
+        bars = BarData.from_frame(price_data.iloc[first:last])
+        self.bars = bars
+
+        self.signals = []
+        self.warmup = 0     # Longest indicator warm-up of the grid, in bars
+        for setting in indicator_settings:
+            backtester = Backtester(ticker, start_date, end_date, interval=interval, **setting)
+            self.signals.append(backtester.generate_signal_codes(bars))
+            self.warmup = max(self.warmup, backtester.warmup_bars())
+
+    @property
+    def full_bars(self):
+        return len(self.bars)
+
+    def window(self, indicator, length):
+        """BarData view of the first `length` bars from start_date"""
+        bars = self.bars
+        return BarData(bars.timestamps[:length], bars.close[:length], bars.volume[:length],
+                       tz=bars.tz, signals=self.signals[indicator][:length])
+
+    def evaluate(self, configs, length, initial_capital, periods_per_year, backend):
+        """
+        Simulate configurations on a prefix, one simulate_batch() per indicator setting
+
+        Returns:
+            Dictionary of metric arrays aligned with configs
+        """
+        configs = np.asarray(configs)
+        metrics = {}
+        for indicator in np.unique(self.indicator[configs]):
+            members = np.flatnonzero(self.indicator[configs] == indicator)
+            chosen = configs[members]
+            result = simulate_batch(self.window(indicator, length),
+                                    *(self.risk[p][chosen] for p in RISK_PARAMS),
+                                    initial_capital=initial_capital, periods_per_year=periods_per_year,
+                                    backend=backend)
+            for name, values in result.items():
+                if name not in metrics:
+                    metrics[name] = np.empty(len(configs), dtype=np.asarray(values).dtype)
+                metrics[name][members] = values
+        return metrics
+
+
+def _load_state(path, key):
+    """Saved search state for the same search, or None"""
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading search state {path}: {e}")
+        return None
+    if state.get('version') != SEARCH_STATE_VERSION or state.get('key') != key:
+        print(f"Search state in {path} is for a different search or price history; starting over")
+        return None
+    return state
+
+
+def _save_state(path, state):
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write to a temp file first so a crash never leaves a partial state file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def adaptive_search(ticker, start_date, end_date, param_grid=None, method='halving', eta=3, min_bars=126,
+                    objective='sharpe_ratio', initial_capital=10000, interval=DEFAULT_INTERVAL,
+                    state_path=None, price_data=None, backend='auto', seed=0, verbose=True):
+    """
+    Search a parameter grid by successive halving (or Hyperband) over history prefixes
+
+    Args:
+        ticker: Stock symbol
+        start_date, end_date: Backtest period (the prefixes start at start_date)
+        param_grid: Dict of parameter -> list of values (see walk_forward.DEFAULT_PARAM_GRID)
+        method: 'halving' or 'hyperband'
+        eta: Keep 1/eta of the configurations per rung; prefixes grow by eta
+        min_bars: Bars in the shortest prefix (default 126, about six months); raised to the
+            grid's longest indicator warm-up plus MIN_SIGNAL_BARS when shorter
+        objective: Metric from simulate_batch() to maximize ('max_drawdown' is minimized)
+        initial_capital: Starting investment
+        interval: Bar size
+        state_path: Optional file to save progress to after every rung and resume from
+        price_data: Optional pre-fetched price history (fetched if None)
+        backend: simulate_batch() backend ('numba', 'numpy' or 'auto')
+        seed: Random seed for Hyperband's split of the grid
+        verbose: Print a summary
+
+    Returns:
+        Dictionary with the best parameters and their full-history metrics, a
+        leaderboard of every configuration that reached the full history, the
+        rungs, and the compute spent compared with the full grid
+    """
+    if price_data is None:
+        price_data = fetch_stock_data(ticker, period="10y", interval=interval)
+    if price_data.empty:
+        print(f"Error: No data available for {ticker}")
+        return None
+
+    space = _SearchSpace(ticker, price_data, start_date, end_date, param_grid, interval)
+    full_bars = space.full_bars
+    if full_bars < min_bars:
+        print(f"Error: {start_date} to {end_date} holds {full_bars} bars, fewer than min_bars={min_bars}")
+        return None
+    # A prefix shorter than the warm-up leaves the long-window settings without a single signal,
+    # and they would tie (and be pruned at random) instead of being compared
+    needed = min(full_bars, space.warmup + MIN_SIGNAL_BARS)
+    if min_bars < needed:
+        if verbose:
+            print(f"Raising min_bars from {min_bars} to {needed} (indicator warm-up of {space.warmup} bars "
+                  f"+ {MIN_SIGNAL_BARS})")
+        min_bars = needed
+    periods_per_year = PERIODS_PER_YEAR[interval]
+
+    key = {
+        'ticker': ticker, 'start_date': str(start_date), 'end_date': str(end_date), 'interval': interval,
+        'configs': space.configs, 'method': method, 'eta': eta, 'min_bars': min_bars, 'objective': objective,
+        'initial_capital': float(initial_capital), 'seed': seed,
+        'data_hash': hash_price_data(price_data[['Close', 'Volume']]),
+    }
+    state = _load_state(state_path, key)
+    if state is None:
+        brackets = make_brackets(len(space.configs), full_bars, min_bars, eta, method, seed)
+        state = {
+            'version': SEARCH_STATE_VERSION,
+            'key': key,
+            'brackets': [{'alive': b['configs'], 'rungs': b['rungs'], 'next_rung': 0} for b in brackets],
+            'rung_log': [],
+            'finalists': {},       # config index -> full-history metrics
+            'bar_evaluations': 0,
+        }
+    elif verbose:
+        done = sum(b['next_rung'] for b in state['brackets'])
+        print(f"Resuming search for {ticker} after {done} completed rungs")
+
+    for number, bracket in enumerate(state['brackets']):
+        while bracket['next_rung'] < len(bracket['rungs']):
+            rung = bracket['next_rung']
+            length = bracket['rungs'][rung]
+            alive = np.asarray(bracket['alive'])
+            metrics = space.evaluate(alive, length, initial_capital, periods_per_year, backend)
+            state['bar_evaluations'] += len(alive) * length
+
+            final = rung == len(bracket['rungs']) - 1
+            if final:
+                for position, config in enumerate(alive):
+                    state['finalists'][int(config)] = {name: values[position].item()
+                                                       for name, values in metrics.items()}
+                kept = alive
+            else:
+                order = rank_configs(metrics, objective)
+                kept = np.sort(alive[order[:max(1, len(alive) // eta)]])
+
+            state['rung_log'].append({
+                'bracket': number, 'rung': rung, 'bars': length, 'configs': len(alive), 'kept': len(kept),
+                'best': float(np.nanmax(metrics[objective])) if objective != 'max_drawdown'
+                else float(np.nanmin(metrics[objective])),
+            })
+            bracket['alive'] = kept
+            bracket['next_rung'] = rung + 1
+            _save_state(state_path, state)
+
+    result = _search_result(ticker, space, state, objective, full_bars, method)
+    if verbose:
+        print_search_summary(result)
+    return result
+
+
+def _search_result(ticker, space, state, objective, full_bars, method):
+    """Build the result dictionary from a finished search state"""
+    rows = []
+    for config, metrics in state['finalists'].items():
+        rows.append(dict(space.configs[config], config=config,
+                         **{k: v for k, v in metrics.items() if k not in RISK_PARAMS}))
+    leaderboard = pd.DataFrame(rows).set_index('config')
+    leaderboard = leaderboard.sort_values(objective, ascending=(objective == 'max_drawdown'), kind='stable')
+
+    best = leaderboard.index[0]
+    full_grid = len(space.configs) * full_bars
+    spent = state['bar_evaluations']
+    return {
+        'ticker': ticker,
+        'method': method,
+        'objective': objective,
+        'best_params': dict(space.configs[best]),
+        'best_metrics': {k: v for k, v in state['finalists'][best].items() if k not in RISK_PARAMS},
+        'leaderboard': leaderboard,
+        'rungs': pd.DataFrame(state['rung_log']),
+        'compute': {
+            'configs': len(space.configs),
+            'full_history_runs': len(state['finalists']),
+            'bar_evaluations': spent,
+            'full_grid_bar_evaluations': full_grid,
+            'saved_pct': (1 - spent / full_grid) * 100 if full_grid else 0.0,
+        },
+    }
+
+
+def print_search_summary(result):
+    """Print the rungs, the best configuration and the compute saved"""
+    compute = result['compute']
+    print("\n" + "=" * 70)
+    print(f"ADAPTIVE SEARCH ({result['method']}): {result['ticker']}")
+    print("=" * 70)
+    print(f"{'Bracket':>7} {'Rung':>5} {'Bars':>7} {'Configs':>8} {'Kept':>6} {'Best ' + result['objective']:>20}")
+    for row in result['rungs'].itertuples():
+        print(f"{row.bracket:>7} {row.rung:>5} {row.bars:>7} {row.configs:>8} {row.kept:>6} {row.best:>20.3f}")
+
+    print(f"\nBest parameters: {result['best_params']}")
+    metrics = result['best_metrics']
+    print(f"Sharpe Ratio:            {metrics['sharpe_ratio']:.3f}")
+    print(f"Total Return:            {metrics['total_return']:.2f}%")
+    print(f"Max Drawdown:            {metrics['max_drawdown']:.2f}%")
+    print(f"\nConfigurations:          {compute['configs']} ({compute['full_history_runs']} ran on the full history)")
+    print(f"Bar evaluations:         {compute['bar_evaluations']:,} vs {compute['full_grid_bar_evaluations']:,} "
+          f"for the full grid ({compute['saved_pct']:.1f}% saved)")
+    print("=" * 70)
@@ -2,13 +2,69 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from data.data_fetcher import fetch_stock_data
-from indicators.technical import calculate_moving_averages, calculate_rsi, calculate_volume_ratio, calculate_vix
-from config import RECOMMENDATION_THRESHOLDS
+from data.bars import BarData, BUY, HOLD, SELL, encode_signals, decode_signals
+from indicators.technical import calculate_vix
+from indicators.indicator_store import compute_indicators
+from indicators.timeframes import TIMEFRAME_RULES, higher_timeframe_indicators, timeframe_warmup_bars
+from backtest.result_store import backtest_inputs, make_run_key
+from config import (
+    RECOMMENDATION_THRESHOLDS, MA_SHORT_PERIOD, MA_LONG_PERIOD, RSI_PERIOD, VOLUME_PERIOD,
+    DEFAULT_INTERVAL, PERIODS_PER_YEAR
+)
+
+
+def compute_signal_codes(close, ma50, ma200, rsi, volume_ratio):
+    """
+    Turn indicator series into BUY/HOLD/SELL signal codes (1/0/-1)
+
+    Scoring (max 6 points):
+    - Trend: price above both MAs = 3, above MA50 = 2, above MA200 = 1
+    - RSI: between 30 and 70 = 2, below 30 = 1
+    - Volume: ratio above 1.0 = 1
+    Score >= 5 is BUY, >= 3 is HOLD, otherwise SELL. Days before the long
+    MA is available are HOLD.
+
+    Args:
+        close, ma50, ma200, rsi, volume_ratio: Aligned arrays or Series
+
+    Returns:
+        int8 NumPy array of signal codes (see data.bars)
+    """
+    close = np.asarray(close, dtype=float)
+    ma50 = np.asarray(ma50, dtype=float)
+    ma200 = np.asarray(ma200, dtype=float)
+    rsi = np.asarray(rsi, dtype=float)
+    volume_ratio = np.asarray(volume_ratio, dtype=float)
+
+    # Comparisons against NaN are False, so missing RSI/volume values score 0
+    trend_points = np.where((close > ma50) & (close > ma200), 3,
+                            np.where(close > ma50, 2,
+                                     np.where(close > ma200, 1, 0)))
+    rsi_points = np.where((rsi > 30) & (rsi < 70), 2, np.where(rsi < 30, 1, 0))
+    volume_points = np.where(volume_ratio > 1.0, 1, 0)
+    score = trend_points + rsi_points + volume_points
+
+    signals = np.where(score >= 5, BUY, np.where(score >= 3, HOLD, SELL)).astype(np.int8)
+    signals[np.isnan(ma200)] = HOLD
+    return signals
+
+
+def compute_signals(close, ma50, ma200, rsi, volume_ratio):
+    """
+    Turn indicator series into 'BUY'/'HOLD'/'SELL' strings (see compute_signal_codes)
+
+    Returns:
+        NumPy array of signal strings
+    """
+    return decode_signals(compute_signal_codes(close, ma50, ma200, rsi, volume_ratio))
 
 
 class Backtester:
     def __init__(self, ticker, start_date, end_date, initial_capital=10000,
-                 stop_loss_pct=0.07, max_position_pct=1.0, daily_loss_limit_pct=0.10):
+                 stop_loss_pct=0.07, max_position_pct=1.0, daily_loss_limit_pct=0.10,
+                 ma_short_period=MA_SHORT_PERIOD, ma_long_period=MA_LONG_PERIOD,
+                 rsi_period=RSI_PERIOD, volume_period=VOLUME_PERIOD, result_store=None,
+                 interval=DEFAULT_INTERVAL, price_dtype=np.float64, confirm_timeframes=None):
         """
         Initialize backtester with risk management controls
 
@@ -20,6 +76,13 @@ class Backtester:
             stop_loss_pct: Maximum loss per trade before auto-exit (default 7%)
             max_position_pct: Maximum % of capital to invest per trade (default 100%)
             daily_loss_limit_pct: Circuit breaker - stop trading if daily loss exceeds this (default 10%)
+            ma_short_period, ma_long_period, rsi_period, volume_period: Indicator windows (default from config.py)
+            result_store: Optional ResultStore; unchanged runs are loaded from it instead of re-simulated
+            interval: Bar size ("1d", "1h", "5m", "1m", ...); sets how Sharpe/Sortino are annualized
+            price_dtype: Storage dtype for prices in run() (np.float32 halves memory
+                at the cost of float32 rounding in the indicators)
+            confirm_timeframes: Higher timeframes ('1wk', '1mo') that must agree with a BUY:
+                it is only taken when none of them signals SELL
         """
         self.ticker = ticker
         self.start_date = start_date
@@ -29,13 +92,60 @@ class Backtester:
         self.trades = []
         self.equity_curve = []
 
+        # Bar size and how many bars make up a year
+        self.interval = interval
+        self.periods_per_year = PERIODS_PER_YEAR[interval]
+        self.price_dtype = price_dtype
+
+        # Open position (carried across simulate_trades calls so runs can be chunked)
+        self.position = None  # Shares held
+        self.entry_price = 0
+        self.entry_date = None
+        self.bars_processed = 0
+
         # Risk management parameters
         self.stop_loss_pct = stop_loss_pct
         self.max_position_pct = max_position_pct
         self.daily_loss_limit_pct = daily_loss_limit_pct
         self.daily_start_equity = initial_capital
         self.trading_halted = False  # Circuit breaker flag
+
+        # Indicator periods
+        self.ma_short_period = ma_short_period
+        self.ma_long_period = ma_long_period
+        self.rsi_period = rsi_period
+        self.volume_period = volume_period
+
+        # Multi-timeframe confirmation
+        self.confirm_timeframes = tuple(confirm_timeframes or ())
+        for timeframe in self.confirm_timeframes:
+            if timeframe not in TIMEFRAME_RULES:
+                raise ValueError(f"Unknown timeframe '{timeframe}'. Choose from: {', '.join(TIMEFRAME_RULES)}")
+
+        self.result_store = result_store
+
+    def warmup_bars(self):
+        """
+        Number of past bars the indicators need to produce their next value
+
+        Keeping this many trailing bars lets a later chunk of data continue the
+        indicator series exactly where the previous chunk stopped.
+        """
+        warmup = max(self.ma_short_period, self.ma_long_period, self.rsi_period + 1, self.volume_period)
+        for timeframe in self.confirm_timeframes:
+            warmup = max(warmup, timeframe_warmup_bars(timeframe, self.interval))
+        return warmup
         
+    def compute_indicators(self, close, volume):
+        """
+        Short MA, long MA, RSI and volume ratio with this backtest's periods
+
+        Served from the indicator store when one is enabled (see
+        indicators.indicator_store), otherwise computed from scratch.
+        """
+        return compute_indicators(close, volume, self.ticker, self.ma_short_period, self.ma_long_period,
+                                  self.rsi_period, self.volume_period, self.interval)
+
     def generate_signals(self, price_data):
         """
         Generate buy/sell signals for each day
@@ -44,9 +154,7 @@ class Backtester:
             DataFrame with signals added
         """
         # Calculate indicators
-        ma50, ma200 = calculate_moving_averages(price_data['Close'])
-        rsi = calculate_rsi(price_data['Close'])
-        volume_ratio = calculate_volume_ratio(price_data['Volume'])
+        ma50, ma200, rsi, volume_ratio = self.compute_indicators(price_data['Close'], price_data['Volume'])
         
         # Add to dataframe
         price_data['MA50'] = ma50
@@ -55,68 +163,88 @@ class Backtester:
         price_data['Volume_Ratio'] = volume_ratio
         
         # Generate simple signals based on technical indicators
-        signals = []
-        
-        for i in range(len(price_data)):
-            if pd.isna(price_data['MA200'].iloc[i]):
-                signals.append('HOLD')
-                continue
-            
-            score = 0
-            price = price_data['Close'].iloc[i]
-            ma50_val = price_data['MA50'].iloc[i]
-            ma200_val = price_data['MA200'].iloc[i]
-            rsi_val = price_data['RSI'].iloc[i]
-            vol_ratio = price_data['Volume_Ratio'].iloc[i]
-            
-            # Score trend (0-3 points)
-            if price > ma50_val and price > ma200_val:
-                score += 3  # Strong uptrend
-            elif price > ma50_val:
-                score += 2  # Uptrend
-            elif price > ma200_val:
-                score += 1  # Weak uptrend
-            
-            # Score RSI (0-2 points)
-            if not pd.isna(rsi_val):
-                if 30 < rsi_val < 70:
-                    score += 2  # Good range
-                elif rsi_val < 30:
-                    score += 1  # Oversold (potential bounce)
-            
-            # Score volume (0-1 point)
-            if not pd.isna(vol_ratio) and vol_ratio > 1.0:
-                score += 1
-            
-            # Generate signal (max score = 6)
-            if score >= 5:
-                signals.append('BUY')
-            elif score >= 3:
-                signals.append('HOLD')
-            else:
-                signals.append('SELL')
-        
-        price_data['Signal'] = signals
+        codes = compute_signal_codes(price_data['Close'], ma50, ma200, rsi, volume_ratio)
+        codes = self.confirm_signal_codes(codes, price_data['Close'], price_data['Volume'])
+        price_data['Signal'] = decode_signals(codes)
         return price_data
+
+    def generate_signal_codes(self, bars):
+        """
+        Generate signal codes for compact bars without storing the indicators
+
+        Args:
+            bars: BarData
+
+        Returns:
+            int8 array of signal codes (same rules as generate_signals)
+        """
+        close = bars.close_series()
+        volume = bars.volume_series()
+        ma50, ma200, rsi, volume_ratio = self.compute_indicators(close, volume)
+        codes = compute_signal_codes(close, ma50, ma200, rsi, volume_ratio)
+        return self.confirm_signal_codes(codes, close, volume)
+
+    def confirm_signal_codes(self, codes, close, volume):
+        """
+        Turn BUY signals into HOLD where a confirming timeframe signals SELL
+
+        Each higher timeframe applies the same signal rules to its own bars
+        (resampled from these, periods from HIGHER_TIMEFRAME_PERIODS) as they
+        stood before the day's week or month began.
+
+        Args:
+            codes: int8 signal codes of the daily bars
+            close, volume: Daily Series the codes were computed from
+
+        Returns:
+            int8 array of confirmed signal codes
+        """
+        if not self.confirm_timeframes:
+            return codes
+
+        daily = pd.DataFrame({'Close': close, 'Volume': volume})
+        codes = np.array(codes, dtype=np.int8)
+        for timeframe in self.confirm_timeframes:
+            higher = higher_timeframe_indicators(daily, timeframe, self.ticker)
+            higher_codes = compute_signal_codes(higher['close'], higher['ma_short'], higher['ma_long'],
+                                                higher['rsi'], higher['volume_ratio'])
+            codes[(codes == BUY) & (higher_codes == SELL)] = HOLD
+        return codes
     
-    def simulate_trades(self, price_data):
+    def simulate_trades(self, price_data, verbose=True, close_at_end=True):
         """
         Simulate trading based on signals with risk management controls
 
+        The open position is kept on the instance, so consecutive calls with
+        consecutive blocks of bars continue the same simulation.
+
         Args:
-            price_data: DataFrame with prices and signals
+            price_data: BarData with signal codes, or DataFrame with Close and Signal columns
+            verbose: Print the trade log
+            close_at_end: Sell any open position on the last bar
 
         Returns:
             Final portfolio value
         """
-        position = None  # Current position (shares held)
-        entry_price = 0
-        entry_date = None
+        position = self.position  # Current position (shares held)
+        entry_price = self.entry_price
+        entry_date = self.entry_date
+        bars_before = self.bars_processed
+
+        # Plain arrays are much faster to index than .iloc inside the loop
+        dates = price_data.index
+        if isinstance(price_data, BarData):
+            closes = price_data.close.astype(np.float64, copy=False)
+            signals = price_data.signals
+        else:
+            closes = price_data['Close'].to_numpy(dtype=np.float64)
+            signals = encode_signals(price_data['Signal'])
+        signal_names = ('SELL', 'HOLD', 'BUY')
 
         for i in range(len(price_data)):
-            date = price_data.index[i]
-            current_price = price_data['Close'].iloc[i]
-            signal = price_data['Signal'].iloc[i]
+            date = dates[i]
+            current_price = closes[i]
+            signal = signals[i]
 
             # Calculate current equity
             if position is not None:
@@ -125,10 +253,11 @@ class Backtester:
                 equity = self.cash
 
             # Check daily loss limit (circuit breaker)
-            if i > 0 and equity < self.daily_start_equity * (1 - self.daily_loss_limit_pct):
+            if bars_before + i > 0 and equity < self.daily_start_equity * (1 - self.daily_loss_limit_pct):
                 if not self.trading_halted:
-                    print(f"\n[!] CIRCUIT BREAKER TRIGGERED on {date.date()}")
-                    print(f"    Daily loss exceeded {self.daily_loss_limit_pct*100}%. Trading halted for the day.")
+                    if verbose:
+                        print(f"\n[!] CIRCUIT BREAKER TRIGGERED on {date.date()}")
+                        print(f"    Daily loss exceeded {self.daily_loss_limit_pct*100}%. Trading halted for the day.")
                     self.trading_halted = True
             else:
                 # Reset circuit breaker at start of new day
@@ -139,7 +268,7 @@ class Backtester:
             self.equity_curve.append({
                 'date': date,
                 'equity': equity,
-                'signal': signal
+                'signal': signal_names[signal + 1]
             })
 
             # RISK CONTROL: Check stop-loss on existing position
@@ -148,12 +277,13 @@ class Backtester:
                 position_loss_pct = (current_price - entry_price) / entry_price
                 if position_loss_pct <= -self.stop_loss_pct:
                     # Stop-loss triggered - force sell
-                    signal = 'SELL'
+                    signal = SELL
                     stop_loss_triggered = True
-                    print(f"\n[X] STOP-LOSS TRIGGERED on {date.date()} | Loss: {position_loss_pct*100:.2f}%")
+                    if verbose:
+                        print(f"\n[X] STOP-LOSS TRIGGERED on {date.date()} | Loss: {position_loss_pct*100:.2f}%")
 
             # BUY signal
-            if signal == 'BUY' and position is None and self.cash > 0 and not self.trading_halted:
+            if signal == BUY and position is None and self.cash > 0 and not self.trading_halted:
                 # RISK CONTROL: Position sizing - limit investment amount
                 max_investment = self.cash * self.max_position_pct
                 position = max_investment / current_price
@@ -161,10 +291,11 @@ class Backtester:
                 entry_date = date
                 self.cash = self.cash - max_investment  # Deduct invested amount
 
-                print(f"BUY:  {date.date()} | Price: ${current_price:.2f} | Shares: {position:.2f} | Investment: ${max_investment:.2f}")
+                if verbose:
+                    print(f"BUY:  {date.date()} | Price: ${current_price:.2f} | Shares: {position:.2f} | Investment: ${max_investment:.2f}")
 
             # SELL signal (includes stop-loss triggered sells)
-            elif signal == 'SELL' and position is not None:
+            elif signal == SELL and position is not None:
                 # Sell all shares
                 exit_price = current_price
                 proceeds = position * exit_price
@@ -187,36 +318,64 @@ class Backtester:
                 self.cash = self.cash + proceeds
                 position = None
 
-                print(f"SELL: {date.date()} | Price: ${exit_price:.2f} | Profit: ${profit:.2f} ({profit_pct:.2f}%) | Reason: {sell_reason}")
+                if verbose:
+                    print(f"SELL: {date.date()} | Price: ${exit_price:.2f} | Profit: ${profit:.2f} ({profit_pct:.2f}%) | Reason: {sell_reason}")
         
-        # Close position at end if still holding
-        if position is not None:
-            final_price = price_data['Close'].iloc[-1]
-            final_date = price_data.index[-1]
-            proceeds = position * final_price
-            profit = proceeds - (position * entry_price)
-            profit_pct = (profit / (position * entry_price)) * 100
-
-            self.trades.append({
-                'entry_date': entry_date,
-                'entry_price': entry_price,
-                'exit_date': final_date,
-                'exit_price': final_price,
-                'shares': position,
-                'profit': profit,
-                'profit_pct': profit_pct,
-                'exit_reason': 'END_OF_PERIOD'
-            })
+        # Save position state for the next block of bars
+        self.position = position
+        self.entry_price = entry_price
+        self.entry_date = entry_date
+        self.bars_processed = bars_before + len(price_data)
 
-            self.cash = self.cash + proceeds
-            print(f"SELL: {final_date.date()} | Price: ${final_price:.2f} | Profit: ${profit:.2f} ({profit_pct:.2f}%) | Reason: END_OF_PERIOD")
+        # Close position at end if still holding
+        if close_at_end and len(price_data) > 0:
+            self.close_position(price_data.index[-1], closes[-1], verbose=verbose)
 
         return self.cash
+
+    def close_position(self, final_date, final_price, verbose=True):
+        """
+        Sell any open position at the end of the backtest
+
+        Args:
+            final_date: Date of the last bar
+            final_price: Closing price of the last bar
+            verbose: Print the trade
+        """
+        if self.position is None:
+            return
+
+        position = self.position
+        entry_price = self.entry_price
+        proceeds = position * final_price
+        profit = proceeds - (position * entry_price)
+        profit_pct = (profit / (position * entry_price)) * 100
+
+        self.trades.append({
+            'entry_date': self.entry_date,
+            'entry_price': entry_price,
+            'exit_date': final_date,
+            'exit_price': final_price,
+            'shares': position,
+            'profit': profit,
+            'profit_pct': profit_pct,
+            'exit_reason': 'END_OF_PERIOD'
+        })
+
+        self.cash = self.cash + proceeds
+        self.position = None
+        if verbose:
+            print(f"SELL: {final_date.date()} | Price: ${final_price:.2f} | Profit: ${profit:.2f} ({profit_pct:.2f}%) | Reason: END_OF_PERIOD")
     
-    def calculate_metrics(self):
+    def calculate_metrics(self, equity_stats=None):
         """
         Calculate comprehensive performance metrics including risk-adjusted returns
 
+        Args:
+            equity_stats: Optional dict with 'max_drawdown', 'sharpe_ratio' and
+                'sortino_ratio' already computed from the equity curve (used by
+                chunked runs that do not keep the whole curve in memory)
+
         Returns:
             Dictionary of metrics
         """
@@ -231,7 +390,8 @@ class Backtester:
         start_date_obj = pd.to_datetime(self.start_date)
         end_date_obj = pd.to_datetime(self.end_date)
         years = (end_date_obj - start_date_obj).days / 365.25
-        cagr = ((final_value / self.initial_capital) ** (1 / years) - 1) * 100
+        # Sessions shorter than a day (intraday paper trading) have no annual rate to report
+        cagr = ((final_value / self.initial_capital) ** (1 / years) - 1) * 100 if years > 0 else 0.0
 
         # Win rate
         winning_trades = [t for t in self.trades if t['profit'] > 0]
@@ -241,6 +401,44 @@ class Backtester:
         total_profit = sum(t['profit'] for t in self.trades)
         avg_profit = total_profit / len(self.trades)
 
+        if equity_stats is not None:
+            max_drawdown = equity_stats['max_drawdown']
+            sharpe_ratio = equity_stats['sharpe_ratio']
+            sortino_ratio = equity_stats['sortino_ratio']
+        else:
+            max_drawdown, sharpe_ratio, sortino_ratio = self._equity_curve_stats()
+
+        # Best and worst trades
+        best_trade = max(self.trades, key=lambda x: x['profit_pct'])
+        worst_trade = min(self.trades, key=lambda x: x['profit_pct'])
+
+        # Count stop-loss triggered trades
+        stop_loss_trades = [t for t in self.trades if t.get('exit_reason') == 'STOP-LOSS']
+        stop_loss_count = len(stop_loss_trades)
+
+        return {
+            'final_value': final_value,
+            'total_profit': total_profit,
+            'total_return': total_return,
+            'cagr': cagr,
+            'num_trades': len(self.trades),
+            'win_rate': win_rate,
+            'avg_profit': avg_profit,
+            'max_drawdown': max_drawdown,
+            'sharpe_ratio': sharpe_ratio,
+            'sortino_ratio': sortino_ratio,
+            'best_trade': best_trade,
+            'worst_trade': worst_trade,
+            'stop_loss_count': stop_loss_count
+        }
+    
+    def _equity_curve_stats(self):
+        """
+        Max drawdown, Sharpe and Sortino ratios from the recorded equity curve
+
+        Returns:
+            Tuple of (max_drawdown, sharpe_ratio, sortino_ratio)
+        """
         # Max drawdown
         equity_values = [e['equity'] for e in self.equity_curve]
         peak = equity_values[0]
@@ -254,53 +452,70 @@ class Backtester:
                 max_drawdown = drawdown
 
         # Sharpe Ratio (risk-adjusted return metric)
-        # Calculate daily returns
+        # Calculate per-bar returns
         equity_series = pd.Series(equity_values)
         daily_returns = equity_series.pct_change().dropna()
 
+        risk_free_rate_daily = 0.02 / self.periods_per_year
         if len(daily_returns) > 0 and daily_returns.std() > 0:
-            # Annualized Sharpe Ratio (assuming 252 trading days per year)
-            # Risk-free rate assumed to be 2% annually (0.02/252 daily)
-            risk_free_rate_daily = 0.02 / 252
+            # Annualized Sharpe Ratio (periods_per_year bars per year, 252 for daily bars)
+            # Risk-free rate assumed to be 2% annually (0.02/252 daily for daily bars)
             excess_returns = daily_returns - risk_free_rate_daily
-            sharpe_ratio = np.sqrt(252) * (excess_returns.mean() / daily_returns.std())
+            sharpe_ratio = np.sqrt(self.periods_per_year) * (excess_returns.mean() / daily_returns.std())
         else:
             sharpe_ratio = 0
 
         # Sortino Ratio (only penalizes downside volatility)
         downside_returns = daily_returns[daily_returns < 0]
         if len(downside_returns) > 0 and downside_returns.std() > 0:
-            sortino_ratio = np.sqrt(252) * (daily_returns.mean() - risk_free_rate_daily) / downside_returns.std()
+            sortino_ratio = np.sqrt(self.periods_per_year) * (daily_returns.mean() - risk_free_rate_daily) / downside_returns.std()
         else:
             sortino_ratio = 0
 
-        # Best and worst trades
-        best_trade = max(self.trades, key=lambda x: x['profit_pct'])
-        worst_trade = min(self.trades, key=lambda x: x['profit_pct'])
+        return max_drawdown, sharpe_ratio, sortino_ratio
 
-        # Count stop-loss triggered trades
-        stop_loss_trades = [t for t in self.trades if t.get('exit_reason') == 'STOP-LOSS']
-        stop_loss_count = len(stop_loss_trades)
+    def load_price_data(self):
+        """
+        Fetch price history and slice it to the backtest window
+
+        Returns:
+            DataFrame of bars between start_date and end_date
+        """
+        price_data = fetch_stock_data(self.ticker, period="10y", interval=self.interval)
+        if price_data.empty:
+            # Failed downloads come back without a DatetimeIndex to slice
+            return price_data
+        return price_data[self.start_date:self.end_date]
+
+    def print_results(self, metrics):
+        """Print the results table for a completed run"""
+        print("\n" + "="*70)
+        print("RESULTS")
+        print("="*70)
+        print(f"Final Account Value:     ${metrics['final_value']:,.2f}")
+        print(f"Total Profit/Loss:       ${metrics['total_profit']:,.2f}")
+        print(f"Total Return:            {metrics['total_return']:.2f}%")
+        print(f"CAGR:                    {metrics['cagr']:.2f}%")
+        print(f"\nRisk-Adjusted Performance:")
+        print(f"Sharpe Ratio:            {metrics['sharpe_ratio']:.3f}")
+        print(f"Sortino Ratio:           {metrics['sortino_ratio']:.3f}")
+        print(f"Max Drawdown:            {metrics['max_drawdown']:.2f}%")
+        print(f"\nTrading Statistics:")
+        print(f"Number of Trades:        {metrics['num_trades']}")
+        print(f"Win Rate:                {metrics['win_rate']:.2f}%")
+        print(f"Average Profit/Trade:    ${metrics['avg_profit']:,.2f}")
+        print(f"Stop-Loss Exits:         {metrics['stop_loss_count']}")
+        print(f"\nBest Trade:              {metrics['best_trade']['profit_pct']:.2f}% on {metrics['best_trade']['exit_date'].date()}")
+        print(f"Worst Trade:             {metrics['worst_trade']['profit_pct']:.2f}% on {metrics['worst_trade']['exit_date'].date()}")
+        print("="*70 + "\n")
 
-        return {
-            'final_value': final_value,
-            'total_profit': total_profit,
-            'total_return': total_return,
-            'cagr': cagr,
-            'num_trades': len(self.trades),
-            'win_rate': win_rate,
-            'avg_profit': avg_profit,
-            'max_drawdown': max_drawdown,
-            'sharpe_ratio': sharpe_ratio,
-            'sortino_ratio': sortino_ratio,
-            'best_trade': best_trade,
-            'worst_trade': worst_trade,
-            'stop_loss_count': stop_loss_count
-        }
-    
     def run(self, verbose=True):
         """
         Run the backtest
+
+        When a result_store is attached, a run whose inputs (parameters,
+        config periods and price data) match a stored run is returned from
+        the store without simulating.
         
         Returns:
             Dictionary with results
@@ -313,22 +528,43 @@ class Backtester:
             print(f"{'='*70}\n")
         
         # Fetch data
-        price_data = fetch_stock_data(self.ticker, period="10y")
-        price_data = price_data[self.start_date:self.end_date]
+        price_data = self.load_price_data()
         
         if price_data.empty:
             print(f"Error: No data available for {self.ticker}")
             return None
+
+        # Reuse a stored result if nothing that affects the run has changed
+        if self.result_store is not None:
+            store_inputs = backtest_inputs(self, price_data)
+            run_key = make_run_key(store_inputs)
+            found, stored = self.result_store.get(run_key)
+            if found:
+                if verbose:
+                    print(f"Loaded stored result (run {run_key[:12]})")
+                if stored is None:
+                    print("\nNo trades were executed!")
+                    return None
+                self.trades = stored['trades']
+                self.equity_curve = stored['equity_curve']
+                self.cash = stored['metrics']['final_value']
+                if verbose:
+                    self.print_results(stored['metrics'])
+                return stored
         
+        # Keep only the columns the simulation needs, as compact arrays
+        bars = BarData.from_frame(price_data, dtype=self.price_dtype)
+        del price_data
+
         # Generate signals
-        price_data = self.generate_signals(price_data)
+        bars.signals = self.generate_signal_codes(bars)
         
         if verbose:
             print("Trade Log:")
             print("-" * 70)
         
         # Simulate trades
-        final_value = self.simulate_trades(price_data)
+        final_value = self.simulate_trades(bars, verbose=verbose)
         
         # Calculate metrics
         metrics = self.calculate_metrics()
@@ -336,33 +572,22 @@ class Backtester:
         if metrics is None:
             print("\nNo trades were executed!")
             print("The algorithm may be too conservative or data is insufficient.")
+            if self.result_store is not None:
+                self.result_store.put(run_key, store_inputs, None)
             return None
         
         # Print results
         if verbose:
-            print("\n" + "="*70)
-            print("RESULTS")
-            print("="*70)
-            print(f"Final Account Value:     ${metrics['final_value']:,.2f}")
-            print(f"Total Profit/Loss:       ${metrics['total_profit']:,.2f}")
-            print(f"Total Return:            {metrics['total_return']:.2f}%")
-            print(f"CAGR:                    {metrics['cagr']:.2f}%")
-            print(f"\nRisk-Adjusted Performance:")
-            print(f"Sharpe Ratio:            {metrics['sharpe_ratio']:.3f}")
-            print(f"Sortino Ratio:           {metrics['sortino_ratio']:.3f}")
-            print(f"Max Drawdown:            {metrics['max_drawdown']:.2f}%")
-            print(f"\nTrading Statistics:")
-            print(f"Number of Trades:        {metrics['num_trades']}")
-            print(f"Win Rate:                {metrics['win_rate']:.2f}%")
-            print(f"Average Profit/Trade:    ${metrics['avg_profit']:,.2f}")
-            print(f"Stop-Loss Exits:         {metrics['stop_loss_count']}")
-            print(f"\nBest Trade:              {metrics['best_trade']['profit_pct']:.2f}% on {metrics['best_trade']['exit_date'].date()}")
-            print(f"Worst Trade:             {metrics['worst_trade']['profit_pct']:.2f}% on {metrics['worst_trade']['exit_date'].date()}")
-            print("="*70 + "\n")
+            self.print_results(metrics)
         
-        return {
+        results = {
             'ticker': self.ticker,
             'metrics': metrics,
             'trades': self.trades,
             'equity_curve': self.equity_curve
-        }
\ No newline at end of file
+        }
+
+        if self.result_store is not None:
+            self.result_store.put(run_key, store_inputs, results)
+
+        return results
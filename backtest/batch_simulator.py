@@ -0,0 +1,369 @@
+"""
+Batched simulation of many risk-parameter sets in one pass
+
+The stop-loss and circuit-breaker rules in Backtester.simulate_trades depend
+on the path, so the simulation cannot be vectorized over time. It can be
+vectorized over parameter sets, though: every combination of stop_loss_pct,
+max_position_pct and daily_loss_limit_pct sees the same prices and signals,
+and only its state differs (cash, shares, entry price, circuit-breaker flag).
+
+simulate_batch() walks the bars once and updates one state vector per
+parameter set with NumPy. When numba is installed, a compiled kernel runs the
+same arithmetic as a plain loop across the parameter sets in parallel.
+
+Both backends perform exactly the same floating-point operations as
+Backtester.simulate_trades, so final values, trade counts and profits match
+the single-run simulator exactly. Sharpe ratios are accumulated with Welford's
+algorithm and agree with calculate_metrics() to rounding error.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from data.bars import BarData, BUY, SELL, encode_signals
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+RESULT_FIELDS = ('final_value', 'total_profit', 'num_trades', 'winning_trades',
+                 'stop_loss_count', 'max_drawdown', 'return_count', 'return_mean', 'return_m2')
+
+
+def make_param_grid(stop_loss_pcts, max_position_pcts, daily_loss_limit_pcts):
+    """
+    Every combination of the given risk parameters as flat arrays
+
+    Returns:
+        Tuple of (stop_loss_pct, max_position_pct, daily_loss_limit_pct) arrays
+    """
+    combos = np.array(list(itertools.product(stop_loss_pcts, max_position_pcts, daily_loss_limit_pcts)),
+                      dtype=np.float64)
+    return combos[:, 0].copy(), combos[:, 1].copy(), combos[:, 2].copy()
+
+
+def _simulate_numpy(closes, signals, stop_loss, max_position, daily_limit, initial_capital, equity_out):
+    """Walk the bars once, updating every parameter set's state with vector operations"""
+    n_params = len(stop_loss)
+
+    cash = np.full(n_params, float(initial_capital))
+    position = np.zeros(n_params)
+    entry_price = np.zeros(n_params)
+    in_position = np.zeros(n_params, dtype=bool)
+    daily_start_equity = np.full(n_params, float(initial_capital))
+    halted = np.zeros(n_params, dtype=bool)
+
+    total_profit = np.zeros(n_params)
+    num_trades = np.zeros(n_params, dtype=np.int64)
+    winning_trades = np.zeros(n_params, dtype=np.int64)
+    stop_loss_count = np.zeros(n_params, dtype=np.int64)
+
+    peak = np.zeros(n_params)
+    max_drawdown = np.zeros(n_params)
+    previous_equity = np.zeros(n_params)
+    count = 0
+    mean = np.zeros(n_params)
+    m2 = np.zeros(n_params)
+
+    loss_floor = 1 - daily_limit
+
+    for i in range(len(closes)):
+        price = closes[i]
+        signal = signals[i]
+
+        equity = np.where(in_position, cash + position * price, cash)
+
+        # Circuit breaker: halt while below the limit, reset the reference once recovered
+        if i > 0:
+            breach = equity < daily_start_equity * loss_floor
+            daily_start_equity = np.where(~breach & halted, equity, daily_start_equity)
+            halted = breach
+        else:
+            daily_start_equity = np.where(halted, equity, daily_start_equity)
+            halted = np.zeros(n_params, dtype=bool)
+
+        if equity_out is not None:
+            equity_out[i] = equity
+
+        # Drawdown and return statistics
+        if i == 0:
+            peak = equity.copy()
+        else:
+            peak = np.maximum(peak, equity)
+            returns = equity / previous_equity - 1
+            count += 1
+            delta = returns - mean
+            mean = mean + delta / count
+            m2 = m2 + delta * (returns - mean)
+        max_drawdown = np.maximum(max_drawdown, (peak - equity) / peak * 100)
+        previous_equity = equity
+
+        # Stop-loss on open positions
+        with np.errstate(divide='ignore', invalid='ignore'):
+            position_loss_pct = (price - entry_price) / entry_price
+        stop = in_position & (position_loss_pct <= -stop_loss)
+
+        buy = (signal == BUY) & ~in_position & (cash > 0) & ~halted
+        sell = ~buy & in_position & (stop | (signal == SELL))
+
+        if buy.any():
+            investment = cash * max_position
+            position = np.where(buy, investment / price, position)
+            entry_price = np.where(buy, price, entry_price)
+            cash = np.where(buy, cash - investment, cash)
+            in_position = in_position | buy
+
+        if sell.any():
+            proceeds = position * price
+            profit = proceeds - (position * entry_price)
+            total_profit = np.where(sell, total_profit + profit, total_profit)
+            num_trades += sell
+            winning_trades += sell & (profit > 0)
+            stop_loss_count += sell & stop
+            cash = np.where(sell, cash + proceeds, cash)
+            in_position = in_position & ~sell
+
+    # Close open positions at the last price
+    if len(closes) > 0 and in_position.any():
+        price = closes[-1]
+        proceeds = position * price
+        profit = proceeds - (position * entry_price)
+        total_profit = np.where(in_position, total_profit + profit, total_profit)
+        num_trades += in_position
+        winning_trades += in_position & (profit > 0)
+        cash = np.where(in_position, cash + proceeds, cash)
+
+    return (cash, total_profit, num_trades, winning_trades, stop_loss_count, max_drawdown,
+            np.full(n_params, count), mean, m2)
+
+
+def _simulate_loops(closes, signals, stop_loss, max_position, daily_limit, initial_capital,
+                    equity_out, record_equity, out_float, out_int):
+    """Same simulation as a plain loop per parameter set (compiled with numba)"""
+    n_params = len(stop_loss)
+    for p in numba.prange(n_params):
+        cash = float(initial_capital)
+        position = 0.0
+        entry_price = 0.0
+        in_position = False
+        daily_start_equity = float(initial_capital)
+        halted = False
+        loss_floor = 1 - daily_limit[p]
+
+        total_profit = 0.0
+        num_trades = 0
+        winning_trades = 0
+        stop_loss_count = 0
+        peak = 0.0
+        max_drawdown = 0.0
+        previous_equity = 0.0
+        count = 0
+        mean = 0.0
+        m2 = 0.0
+
+        for i in range(len(closes)):
+            price = closes[i]
+            signal = signals[i]
+
+            if in_position:
+                equity = cash + position * price
+            else:
+                equity = cash
+
+            if i > 0 and equity < daily_start_equity * loss_floor:
+                halted = True
+            else:
+                if halted:
+                    halted = False
+                    daily_start_equity = equity
+
+            if record_equity:
+                equity_out[i, p] = equity
+
+            if i == 0:
+                peak = equity
+            else:
+                if equity > peak:
+                    peak = equity
+                returns = equity / previous_equity - 1
+                count += 1
+                delta = returns - mean
+                mean = mean + delta / count
+                m2 = m2 + delta * (returns - mean)
+            drawdown = (peak - equity) / peak * 100
+            if drawdown > max_drawdown:
+                max_drawdown = drawdown
+            previous_equity = equity
+
+            stop = False
+            if in_position:
+                position_loss_pct = (price - entry_price) / entry_price
+                if position_loss_pct <= -stop_loss[p]:
+                    stop = True
+
+            if signal == BUY and not in_position and cash > 0 and not halted:
+                investment = cash * max_position[p]
+                position = investment / price
+                entry_price = price
+                cash = cash - investment
+                in_position = True
+            elif in_position and (stop or signal == SELL):
+                proceeds = position * price
+                profit = proceeds - (position * entry_price)
+                total_profit = total_profit + profit
+                num_trades += 1
+                if profit > 0:
+                    winning_trades += 1
+                if stop:
+                    stop_loss_count += 1
+                cash = cash + proceeds
+                in_position = False
+
+        if in_position and len(closes) > 0:
+            proceeds = position * closes[len(closes) - 1]
+            profit = proceeds - (position * entry_price)
+            total_profit = total_profit + profit
+            num_trades += 1
+            if profit > 0:
+                winning_trades += 1
+            cash = cash + proceeds
+
+        out_float[0, p] = cash
+        out_float[1, p] = total_profit
+        out_float[2, p] = max_drawdown
+        out_float[3, p] = mean
+        out_float[4, p] = m2
+        out_int[0, p] = num_trades
+        out_int[1, p] = winning_trades
+        out_int[2, p] = stop_loss_count
+        out_int[3, p] = count
+
+
+_numba_kernel = None
+
+
+def _simulate_numba(closes, signals, stop_loss, max_position, daily_limit, initial_capital, equity_out):
+    """Run the compiled kernel (compiled on first use)"""
+    global _numba_kernel
+    if _numba_kernel is None:
+        _numba_kernel = numba.njit(parallel=True, cache=True)(_simulate_loops)
+
+    n_params = len(stop_loss)
+    record_equity = equity_out is not None
+    if equity_out is None:
+        equity_out = np.empty((1, 1))
+    out_float = np.empty((5, n_params))
+    out_int = np.empty((4, n_params), dtype=np.int64)
+
+    _numba_kernel(closes, signals, stop_loss, max_position, daily_limit, float(initial_capital),
+                  equity_out, record_equity, out_float, out_int)
+
+    return (out_float[0], out_float[1], out_int[0], out_int[1], out_int[2], out_float[2],
+            out_int[3], out_float[3], out_float[4])
+
+
+def simulate_batch(price_data, stop_loss_pct, max_position_pct, daily_loss_limit_pct,
+                   initial_capital=10000, periods_per_year=252, backend='auto', record_equity=False):
+    """
+    Simulate many risk-parameter sets over the same bars in one pass
+
+    Args:
+        price_data: BarData with signal codes, or DataFrame with Close and Signal columns
+        stop_loss_pct, max_position_pct, daily_loss_limit_pct: Scalars or arrays
+            (broadcast to a common length, one entry per parameter set)
+        initial_capital: Starting investment
+        periods_per_year: Bars per year for annualizing Sharpe
+        backend: 'numba', 'numpy' or 'auto' (numba when installed)
+        record_equity: Also return the (bars x parameter sets) equity matrix
+
+    Returns:
+        Dictionary of arrays with one entry per parameter set: the parameters,
+        final_value, total_profit, total_return, num_trades, winning_trades,
+        win_rate, stop_loss_count, max_drawdown and sharpe_ratio
+        (plus 'equity' when record_equity is set)
+    """
+    if isinstance(price_data, BarData):
+        closes = price_data.close.astype(np.float64, copy=False)
+        signals = price_data.signals
+    else:
+        closes = price_data['Close'].to_numpy(dtype=np.float64)
+        signals = encode_signals(price_data['Signal'])
+    closes = np.ascontiguousarray(closes)
+    signals = np.ascontiguousarray(signals, dtype=np.int8)
+
+    stop_loss, max_position, daily_limit = (
+        np.ascontiguousarray(a, dtype=np.float64)
+        for a in np.broadcast_arrays(np.atleast_1d(stop_loss_pct), np.atleast_1d(max_position_pct),
+                                     np.atleast_1d(daily_loss_limit_pct))
+    )
+
+    if backend == 'auto':
+        backend = 'numba' if numba is not None else 'numpy'
+    if backend == 'numba' and numba is None:
+        raise ImportError("backend='numba' requires the numba package (pip install numba)")
+    if backend not in ('numba', 'numpy'):
+        raise ValueError(f"Unknown backend '{backend}'")
+
+    equity_out = np.empty((len(closes), len(stop_loss))) if record_equity else None
+    simulate = _simulate_numba if backend == 'numba' else _simulate_numpy
+    outputs = simulate(closes, signals, stop_loss, max_position, daily_limit, initial_capital, equity_out)
+    final_value, total_profit, num_trades, winning_trades, stop_loss_count, max_drawdown, count, mean, m2 = outputs
+
+    # Sharpe ratio as in Backtester.calculate_metrics (2% annual risk-free rate)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(m2 / (count - 1))
+        sharpe_ratio = np.sqrt(periods_per_year) * (mean - 0.02 / periods_per_year) / std
+        win_rate = winning_trades / num_trades * 100
+    sharpe_ratio = np.where((count > 1) & (std > 0), sharpe_ratio, 0.0)
+    win_rate = np.where(num_trades > 0, win_rate, 0.0)
+
+    result = {
+        'stop_loss_pct': stop_loss,
+        'max_position_pct': max_position,
+        'daily_loss_limit_pct': daily_limit,
+        'final_value': final_value,
+        'total_profit': total_profit,
+        'total_return': (final_value - initial_capital) / initial_capital * 100,
+        'num_trades': num_trades,
+        'winning_trades': winning_trades,
+        'win_rate': win_rate,
+        'stop_loss_count': stop_loss_count,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe_ratio,
+    }
+    if record_equity:
+        result['equity'] = equity_out
+    return result
+
+
+def run_parameter_sweep(backtester, stop_loss_pcts, max_position_pcts, daily_loss_limit_pcts,
+                        backend='auto', sort_by='sharpe_ratio'):
+    """
+    Fetch data and signals once, then evaluate every risk-parameter combination
+
+    Args:
+        backtester: Backtester supplying the ticker, dates, capital, interval and indicator periods
+        stop_loss_pcts, max_position_pcts, daily_loss_limit_pcts: Values to combine
+        backend: 'numba', 'numpy' or 'auto'
+        sort_by: Result column to sort by (descending)
+
+    Returns:
+        DataFrame with one row per parameter combination
+    """
+    price_data = backtester.load_price_data()
+    if price_data.empty:
+        print(f"Error: No data available for {backtester.ticker}")
+        return None
+
+    bars = BarData.from_frame(price_data, dtype=backtester.price_dtype)
+    bars.signals = backtester.generate_signal_codes(bars)
+
+    grid = make_param_grid(stop_loss_pcts, max_position_pcts, daily_loss_limit_pcts)
+    result = simulate_batch(bars, *grid, initial_capital=backtester.initial_capital,
+                            periods_per_year=backtester.periods_per_year, backend=backend)
+
+    table = pd.DataFrame(result)
+    return table.sort_values(sort_by, ascending=False).reset_index(drop=True)
@@ -0,0 +1,277 @@
+"""
+Checkpoint and resume of backtest state
+
+A nightly job that re-runs Backtester.run() over the whole history to add one
+bar repeats years of identical work. run_incremental() instead saves the
+complete simulation state after each run:
+
+- cash, open position, entry price/date and bars processed
+- circuit-breaker state (halted flag and reference equity)
+- the trailing warmup_bars() closes and volumes the indicators need
+- trade log and equity curve
+
+The state is saved before the end-of-period sale, so the next run restores it,
+computes signals for the new bars only (prefixed with the warm-up bars) and
+simulates them. The results are identical to a full rerun over the same data.
+
+The trade log and equity curve grow with the history, so they are not part of
+the state file. Each run appends its new trades and equity points to a
+journal next to it (<checkpoint>.journal), and the state records how many
+bytes of the journal it covers. Saving therefore costs the new bars, not the
+whole history.
+
+A checkpoint is only reused when it was made with the same parameters and the
+history still contains the bars it covers, unchanged. yfinance adjusts past
+prices for dividends and splits, which rewrites every bar before the event,
+so comparing the first and the last warm-up-sized stretches of the covered
+bars detects it without rehashing the whole history. After an adjustment the
+run starts from scratch. A revision confined to bars between those stretches
+is not detected; delete the checkpoint to re-run after one.
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from backtest.result_store import hash_price_data
+from data.bars import BarData
+
+# Bump when the saved state or the simulation logic changes
+CHECKPOINT_VERSION = 3
+
+_STATE_ATTRIBUTES = [
+    'cash', 'position', 'entry_price', 'entry_date', 'bars_processed',
+    'daily_start_equity', 'trading_halted',
+]
+
+# Attributes that only grow; new items are appended to the journal
+_JOURNAL_ATTRIBUTES = ['trades', 'equity_curve']
+
+
+def checkpoint_params(backtester):
+    """
+    Inputs a checkpoint depends on (everything except the end date)
+
+    Args:
+        backtester: Backtester instance
+
+    Returns:
+        Dictionary of parameters
+    """
+    params = {
+        'version': CHECKPOINT_VERSION,
+        'ticker': backtester.ticker,
+        'start_date': str(backtester.start_date),
+        'interval': backtester.interval,
+        'price_dtype': np.dtype(backtester.price_dtype).name,
+        'initial_capital': float(backtester.initial_capital),
+        'stop_loss_pct': float(backtester.stop_loss_pct),
+        'max_position_pct': float(backtester.max_position_pct),
+        'daily_loss_limit_pct': float(backtester.daily_loss_limit_pct),
+        'ma_short_period': backtester.ma_short_period,
+        'ma_long_period': backtester.ma_long_period,
+        'rsi_period': backtester.rsi_period,
+        'volume_period': backtester.volume_period,
+    }
+    if backtester.confirm_timeframes:
+        params['confirm_timeframes'] = list(backtester.confirm_timeframes)
+    return params
+
+
+def _journal_path(path):
+    return f"{path}.journal"
+
+
+def save_checkpoint(backtester, path, warmup, head, state=None):
+    """
+    Write the backtester's simulation state to disk
+
+    Args:
+        backtester: Backtester after simulate_trades(..., close_at_end=False)
+        path: Checkpoint file
+        warmup: DataFrame with the trailing Close/Volume bars the indicators need
+        head: Tuple of (bars, hash_price_data()) of the first bars of the history
+        state: The checkpoint the run resumed from (None when it started from scratch);
+            only the trades and equity points added since are appended to the journal
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Append the new items, dropping anything a crashed run appended after the last state
+    journal_size = state['journal_size'] if state is not None else 0
+    counts = {name: state['counts'][name] if state is not None else 0 for name in _JOURNAL_ATTRIBUTES}
+    mode = "r+b" if journal_size and os.path.exists(_journal_path(path)) else "wb"
+    with open(_journal_path(path), mode) as f:
+        f.truncate(journal_size)
+        f.seek(journal_size)
+        pickle.dump({name: getattr(backtester, name)[counts[name]:] for name in _JOURNAL_ATTRIBUTES}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+        journal_size = f.tell()
+
+    new_state = {name: getattr(backtester, name) for name in _STATE_ATTRIBUTES}
+    new_state['counts'] = {name: len(getattr(backtester, name)) for name in _JOURNAL_ATTRIBUTES}
+    new_state['journal_size'] = journal_size
+    new_state['params'] = checkpoint_params(backtester)
+    new_state['warmup'] = warmup
+    new_state['head'] = head
+
+    # Write to a temp file first so a crash never leaves a partial checkpoint
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(new_state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint written by save_checkpoint()
+
+    Returns:
+        State dictionary, or None if the file is missing or unreadable
+    """
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading checkpoint {path}: {e}")
+        return None
+
+
+def load_journal(path, state):
+    """
+    Trades and equity points covered by a checkpoint
+
+    Returns:
+        Dictionary of 'trades' and 'equity_curve' lists, or None if the
+        journal is missing or shorter than the state says
+    """
+    items = {name: [] for name in _JOURNAL_ATTRIBUTES}
+    try:
+        with open(_journal_path(path), "rb") as f:
+            while f.tell() < state['journal_size']:
+                entry = pickle.load(f)
+                for name in _JOURNAL_ATTRIBUTES:
+                    items[name].extend(entry[name])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading checkpoint journal {_journal_path(path)}: {e}")
+        return None
+    if any(len(items[name]) != state['counts'][name] for name in _JOURNAL_ATTRIBUTES):
+        return None
+    return items
+
+
+def _resume_point(backtester, state, price_data):
+    """
+    Position in price_data right after the checkpoint's last bar
+
+    Returns:
+        Row index of the first new bar, or None if the checkpoint cannot be used
+    """
+    if state is None:
+        return None
+    if state.get('params') != checkpoint_params(backtester):
+        print(f"Checkpoint for {backtester.ticker} was made with different parameters; re-running from start")
+        return None
+
+    # The bars already simulated must still be in the history, unchanged. Price adjustments
+    # rewrite every earlier bar, so the first and last stretches of them are enough to check.
+    resume_at = state['bars_processed']
+    warmup = state['warmup']
+    head_bars, head_hash = state['head']
+    if (resume_at > len(price_data)
+            or hash_price_data(price_data.iloc[resume_at - len(warmup):resume_at]) != hash_price_data(warmup)
+            or hash_price_data(price_data.iloc[:head_bars]) != head_hash):
+        print(f"Price history for {backtester.ticker} changed since the checkpoint; re-running from start")
+        return None
+
+    return resume_at
+
+
+def run_incremental(backtester, checkpoint_path, verbose=True):
+    """
+    Run a backtest, simulating only the bars added since the last checkpoint
+
+    Args:
+        backtester: Freshly constructed Backtester
+        checkpoint_path: Checkpoint file (created if missing, updated after the run)
+        verbose: Print the trade log for the new bars and the results
+
+    Returns:
+        Dictionary with results (same shape as Backtester.run())
+    """
+    price_data = backtester.load_price_data()
+    if price_data.empty:
+        print(f"Error: No data available for {backtester.ticker}")
+        return None
+    price_data = price_data[['Close', 'Volume']]
+
+    state = load_checkpoint(checkpoint_path)
+    resume_at = _resume_point(backtester, state, price_data)
+    journal = load_journal(checkpoint_path, state) if resume_at is not None else None
+    if resume_at is not None and journal is None:
+        print(f"Checkpoint journal for {backtester.ticker} is incomplete; re-running from start")
+        resume_at = None
+
+    if resume_at is None:
+        state = None
+        resume_at = 0
+        warmup = price_data.iloc[:0]
+    else:
+        for name in _STATE_ATTRIBUTES:
+            setattr(backtester, name, state[name])
+        for name in _JOURNAL_ATTRIBUTES:
+            setattr(backtester, name, journal[name])
+        warmup = state['warmup']
+
+    new_bars = price_data.iloc[resume_at:]
+
+    if verbose:
+        print(f"\n{'='*70}")
+        print(f"BACKTESTING: {backtester.ticker} (incremental)")
+        print(f"Period: {backtester.start_date} to {backtester.end_date}")
+        print(f"Initial Capital: ${backtester.initial_capital:,.2f}")
+        print(f"Resuming after {resume_at:,} bars, {len(new_bars):,} new")
+        print(f"{'='*70}\n")
+        print("Trade Log:")
+        print("-" * 70)
+
+    # Signals for the new bars only; the warm-up bars continue the indicators
+    bars = BarData.from_frame(pd.concat([warmup, new_bars]), dtype=backtester.price_dtype)
+    codes = backtester.generate_signal_codes(bars)
+    skip = len(warmup)
+    new = BarData(bars.timestamps[skip:], bars.close[skip:], bars.volume[skip:],
+                  tz=bars.tz, signals=codes[skip:])
+    backtester.simulate_trades(new, verbose=verbose, close_at_end=False)
+
+    # Save before the end-of-period sale so the next run continues the open position
+    keep = backtester.warmup_bars()
+    if state is None:
+        head = price_data.iloc[:keep]
+        head = (len(head), hash_price_data(head))
+    else:
+        head = state['head']
+    save_checkpoint(backtester, checkpoint_path, price_data.iloc[-keep:], head, state)
+
+    backtester.close_position(price_data.index[-1], np.float64(bars.close[-1]), verbose=verbose)
+
+    metrics = backtester.calculate_metrics()
+    if metrics is None:
+        print("\nNo trades were executed!")
+        return None
+
+    if verbose:
+        backtester.print_results(metrics)
+
+    return {
+        'ticker': backtester.ticker,
+        'metrics': metrics,
+        'trades': backtester.trades,
+        'equity_curve': backtester.equity_curve
+    }
@@ -63,20 +63,22 @@ def calculate_cagr(start_value, end_value, years):
     Returns:
         CAGR as percentage
     """
-    if start_value == 0 or years == 0:
+    if start_value == 0 or years <= 0:
         return 0
     
     cagr = ((end_value / start_value) ** (1 / years) - 1) * 100
     return cagr
 
 
-def calculate_sharpe_ratio(returns, risk_free_rate=0.02):
+def calculate_sharpe_ratio(returns, risk_free_rate=0.02, periods_per_year=252):
     """
     Calculate Sharpe Ratio (risk-adjusted return)
     
     Args:
         returns: List of period returns
         risk_free_rate: Annual risk-free rate (default 2%)
+        periods_per_year: Bars per year (252 for daily bars; see
+            PERIODS_PER_YEAR in config.py for intraday intervals)
     
     Returns:
         Sharpe ratio
@@ -85,12 +87,12 @@ def calculate_sharpe_ratio(returns, risk_free_rate=0.02):
         return 0
     
     returns_array = np.array(returns)
-    excess_returns = returns_array - (risk_free_rate / 252)  # Daily risk-free rate
+    excess_returns = returns_array - (risk_free_rate / periods_per_year)  # Per-bar risk-free rate
     
     if np.std(excess_returns) == 0:
         return 0
     
-    sharpe = np.mean(excess_returns) / np.std(excess_returns) * np.sqrt(252)
+    sharpe = np.mean(excess_returns) / np.std(excess_returns) * np.sqrt(periods_per_year)
     return sharpe
 
 
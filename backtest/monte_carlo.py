@@ -0,0 +1,240 @@
+"""
+Monte Carlo robustness analysis for backtest results
+
+A backtest produces one historical path, so its return, drawdown and Sharpe
+ratio are single point estimates. This module resamples that path into
+thousands of synthetic ones to show the range of outcomes the strategy could
+plausibly have produced:
+
+- Trade bootstrap: draw the realized trade returns with replacement and
+  compound them in random order.
+- Block bootstrap: draw blocks of consecutive daily equity returns (which
+  keeps short-term autocorrelation and volatility clustering) and chain them.
+
+All paths in a chunk are computed together as one 2-D NumPy array (paths x
+steps). Chunks are sized from a memory budget so the number of paths does not
+drive peak memory. The random generator is seeded for reproducible results.
+"""
+
+import numpy as np
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Rough number of (paths x steps) float64 arrays alive at once while processing a chunk
+_ARRAYS_PER_CHUNK = 4
+
+
+def _chunk_paths(n_steps, max_chunk_mb):
+    """Number of paths per chunk that keeps the working arrays under max_chunk_mb"""
+    bytes_per_path = max(1, n_steps) * 8 * _ARRAYS_PER_CHUNK
+    return max(1, int(max_chunk_mb * 1024 * 1024 // bytes_per_path))
+
+
+def _max_drawdown(paths, initial_capital):
+    """Max drawdown (%) of every path; paths is (n_paths, n_steps) of equity values"""
+    peaks = np.maximum.accumulate(paths, axis=1)
+    peaks = np.maximum(peaks, initial_capital)  # the starting capital is the first peak
+    drawdowns = (peaks - paths) / peaks
+    return np.max(drawdowns, axis=1) * 100
+
+
+def _sharpe(returns, periods_per_year, risk_free_rate):
+    """Annualized Sharpe ratio of every row of returns, matching Backtester.calculate_metrics"""
+    if returns.shape[1] < 2:
+        return np.zeros(returns.shape[0])
+    std = returns.std(axis=1, ddof=1)
+    excess = returns.mean(axis=1) - risk_free_rate / periods_per_year
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.sqrt(periods_per_year) * excess / std
+    return np.where(std > 0, sharpe, 0.0)
+
+
+def summarize(values, percentiles=DEFAULT_PERCENTILES):
+    """
+    Percentile band of a simulated statistic
+
+    Args:
+        values: 1-D array of per-path values
+        percentiles: Percentiles to report
+
+    Returns:
+        Dictionary like {'p5': ..., 'p50': ..., 'p95': ..., 'mean': ...}
+    """
+    band = {f'p{p:g}': float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+    band['mean'] = float(np.mean(values))
+    return band
+
+
+def _simulate(draw_returns, n_paths, n_steps, initial_capital, periods_per_year, risk_free_rate,
+              percentiles, max_chunk_mb, equity_bands):
+    """
+    Shared driver: draw returns chunk by chunk and collect per-path statistics
+
+    Args:
+        draw_returns: Function(count) -> (count, n_steps) array of sampled returns
+        n_paths: Total number of paths
+
+    Returns:
+        Summary dictionary
+    """
+    chunk = _chunk_paths(n_steps, max_chunk_mb)
+    final_equity = np.empty(n_paths)
+    max_drawdown = np.empty(n_paths)
+    sharpe = np.empty(n_paths)
+    bands = np.empty((n_paths, n_steps), dtype=np.float32) if equity_bands else None
+
+    for start in range(0, n_paths, chunk):
+        count = min(chunk, n_paths - start)
+        returns = draw_returns(count)
+        paths = initial_capital * np.cumprod(1 + returns, axis=1)
+
+        final_equity[start:start + count] = paths[:, -1]
+        max_drawdown[start:start + count] = _max_drawdown(paths, initial_capital)
+        sharpe[start:start + count] = _sharpe(returns, periods_per_year, risk_free_rate)
+        if bands is not None:
+            bands[start:start + count] = paths
+
+    result = {
+        'n_paths': n_paths,
+        'n_steps': n_steps,
+        'final_equity': summarize(final_equity, percentiles),
+        'total_return': summarize((final_equity / initial_capital - 1) * 100, percentiles),
+        'max_drawdown': summarize(max_drawdown, percentiles),
+        'sharpe_ratio': summarize(sharpe, percentiles),
+        'prob_loss': float(np.mean(final_equity < initial_capital)),
+    }
+    if bands is not None:
+        result['equity_bands'] = {
+            f'p{p:g}': row for p, row in zip(percentiles, np.percentile(bands, percentiles, axis=0))
+        }
+    return result
+
+
+def trade_returns(trades, initial_capital):
+    """
+    Return of each trade relative to account equity when it was opened
+
+    The backtester holds one position at a time, so the account equity before
+    trade k is the initial capital plus the profits of trades 0..k-1.
+
+    Args:
+        trades: List of trade dicts from Backtester.run()
+        initial_capital: Starting capital of the backtest
+
+    Returns:
+        1-D array of per-trade account returns
+    """
+    profits = np.array([t['profit'] for t in trades], dtype=float)
+    equity_before = initial_capital + np.concatenate(([0.0], np.cumsum(profits)[:-1]))
+    return profits / equity_before
+
+
+def bootstrap_trades(trades, initial_capital, n_paths=10000, n_trades=None, seed=None,
+                     percentiles=DEFAULT_PERCENTILES, max_chunk_mb=64, equity_bands=False):
+    """
+    Resample realized trades into synthetic equity paths
+
+    Args:
+        trades: List of trade dicts from Backtester.run()
+        initial_capital: Starting capital of the backtest
+        n_paths: Number of synthetic paths
+        n_trades: Trades per path (default: the realized number of trades)
+        seed: Random seed for reproducible results
+        percentiles: Percentiles to report
+        max_chunk_mb: Memory budget for one chunk of paths
+        equity_bands: Also return per-trade percentile bands of the equity path
+            (keeps an n_paths x n_trades float32 array in memory)
+
+    Returns:
+        Dictionary of percentile bands for final equity, total return, max
+        drawdown and Sharpe ratio, plus the probability of a loss
+    """
+    if not trades:
+        return None
+
+    returns = trade_returns(trades, initial_capital)
+    n_trades = n_trades or len(returns)
+    rng = np.random.default_rng(seed)
+
+    # Annualize the per-trade Sharpe by how often the strategy actually traded
+    years = (trades[-1]['exit_date'] - trades[0]['entry_date']).days / 365.25
+    trades_per_year = len(trades) / years if years > 0 else len(trades)
+
+    def draw(count):
+        return returns[rng.integers(0, len(returns), size=(count, n_trades))]
+
+    result = _simulate(draw, n_paths, n_trades, initial_capital, trades_per_year, 0.0,
+                       percentiles, max_chunk_mb, equity_bands)
+    result['method'] = 'trade_bootstrap'
+    return result
+
+
+def block_bootstrap(equity_curve, n_paths=10000, block_size=20, horizon=None, seed=None,
+                    periods_per_year=252, risk_free_rate=0.02, percentiles=DEFAULT_PERCENTILES,
+                    max_chunk_mb=64, equity_bands=False):
+    """
+    Block-bootstrap daily equity returns into synthetic equity paths
+
+    Args:
+        equity_curve: List of dicts with 'equity' values (from Backtester.run())
+        n_paths: Number of synthetic paths
+        block_size: Consecutive returns per block
+        horizon: Returns per path (default: the length of the historical path)
+        seed: Random seed for reproducible results
+        periods_per_year: Bars per year for annualizing Sharpe
+        risk_free_rate: Annual risk-free rate used in Sharpe
+        percentiles: Percentiles to report
+        max_chunk_mb: Memory budget for one chunk of paths
+        equity_bands: Also return per-step percentile bands of the equity path
+            (keeps an n_paths x horizon float32 array in memory)
+
+    Returns:
+        Dictionary of percentile bands for final equity, total return, max
+        drawdown and Sharpe ratio, plus the probability of a loss
+    """
+    equity = np.array([e['equity'] for e in equity_curve], dtype=float)
+    returns = equity[1:] / equity[:-1] - 1
+    if len(returns) < 2:
+        return None
+
+    block_size = max(1, min(block_size, len(returns)))
+    horizon = horizon or len(returns)
+    n_blocks = -(-horizon // block_size)  # ceiling division
+    offsets = np.arange(block_size)
+    rng = np.random.default_rng(seed)
+
+    def draw(count):
+        starts = rng.integers(0, len(returns) - block_size + 1, size=(count, n_blocks))
+        index = (starts[:, :, None] + offsets).reshape(count, -1)[:, :horizon]
+        return returns[index]
+
+    result = _simulate(draw, n_paths, horizon, equity[0], periods_per_year, risk_free_rate,
+                       percentiles, max_chunk_mb, equity_bands)
+    result['method'] = 'block_bootstrap'
+    result['block_size'] = block_size
+    return result
+
+
+def print_monte_carlo_summary(result, ticker=""):
+    """
+    Print the percentile bands from bootstrap_trades() or block_bootstrap()
+
+    Args:
+        result: Monte Carlo result dictionary
+        ticker: Optional ticker for the title
+    """
+    keys = [k for k in result['final_equity'] if k != 'mean']
+
+    print("\n" + "="*80)
+    print(f"MONTE CARLO ({result['method']}, {result['n_paths']:,} paths) {ticker}".rstrip())
+    print("="*80)
+    print(f"{'Statistic':<18}" + "".join(f"{k:>12}" for k in keys))
+    print("-"*80)
+    for label, name, fmt in [("Final Equity $", 'final_equity', "{:>12,.0f}"),
+                             ("Total Return %", 'total_return', "{:>12.2f}"),
+                             ("Max Drawdown %", 'max_drawdown', "{:>12.2f}"),
+                             ("Sharpe Ratio", 'sharpe_ratio', "{:>12.3f}")]:
+        print(f"{label:<18}" + "".join(fmt.format(result[name][k]) for k in keys))
+    print("-"*80)
+    print(f"Probability of Loss:     {result['prob_loss']*100:.1f}%")
+    print("="*80 + "\n")
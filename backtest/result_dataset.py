@@ -0,0 +1,394 @@
+"""
+Columnar export of backtest results
+
+Backtester.run() returns trades and the equity curve as lists of dicts, which
+are slow to pickle and large on disk once a sweep covers hundreds of tickers.
+ResultDatasetWriter streams results into three Parquet datasets under one
+root directory:
+
+    <root>/trades/ticker=<ticker>/run_id=<run>/part-*.parquet
+    <root>/equity/ticker=<ticker>/run_id=<run>/part-*.parquet
+    <root>/metrics/ticker=<ticker>/run_id=<run>/part-*.parquet
+
+Every row carries the result_id of the Backtester.run() result it came from,
+so a sweep can store many results per ticker and run. Rows are buffered per
+file and written as one Parquet row group every EXPORT_BATCH_ROWS rows. When
+more than EXPORT_MAX_BUFFERED_ROWS rows are buffered across all files,
+everything is flushed, so memory stays bounded however many results are
+written.
+
+ResultDataset reads the datasets back lazily. Only the requested columns
+and the partitions of the requested tickers and runs are read from disk.
+Its results have the same shape as Backtester.run(), with DataFrames in
+place of the lists, so they can be passed to backtest.visualizations.
+
+Requires pyarrow (pip install pyarrow).
+"""
+
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from config import EXPORT_BATCH_ROWS, EXPORT_MAX_BUFFERED_ROWS
+
+DATASETS = ('trades', 'equity', 'metrics')
+
+# Partition columns (encoded in the directory names, not stored in the files)
+PARTITIONING = ('ticker', 'run_id')
+
+# Files kept open at once; older ones are closed and a new part file is started
+MAX_OPEN_FILES = 64
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for result datasets (pip install pyarrow)")
+
+
+def _timestamps(values):
+    """Timestamp array in the bars' local time (timezone dropped so every ticker shares one type)"""
+    index = pd.DatetimeIndex(values)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return pa.array(index.to_numpy(dtype='datetime64[ns]'))
+
+
+def _floats(rows, key):
+    return pa.array(np.fromiter((row[key] for row in rows), dtype=np.float64, count=len(rows)))
+
+
+def _scalar(value):
+    """Metric or parameter value as a Python number, or a string for anything else"""
+    if value is None or isinstance(value, (bool, np.bool_)):
+        return value if value is None else bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    return str(value)
+
+
+def trades_table(trades, result_id):
+    """Arrow table of a result's trades"""
+    return pa.table({
+        'result_id': pa.array([result_id] * len(trades), pa.string()),
+        'entry_date': _timestamps([t['entry_date'] for t in trades]),
+        'entry_price': _floats(trades, 'entry_price'),
+        'exit_date': _timestamps([t['exit_date'] for t in trades]),
+        'exit_price': _floats(trades, 'exit_price'),
+        'shares': _floats(trades, 'shares'),
+        'profit': _floats(trades, 'profit'),
+        'profit_pct': _floats(trades, 'profit_pct'),
+        'exit_reason': pa.array([t.get('exit_reason') for t in trades], pa.string()),
+    })
+
+
+def equity_table(equity_curve, result_id):
+    """Arrow table of (part of) a result's equity curve"""
+    return pa.table({
+        'result_id': pa.array([result_id] * len(equity_curve), pa.string()),
+        'date': _timestamps([e['date'] for e in equity_curve]),
+        'equity': _floats(equity_curve, 'equity'),
+        'signal': pa.array([e.get('signal') for e in equity_curve], pa.string()),
+    })
+
+
+def metrics_table(metrics, result_id, params=None):
+    """
+    One-row Arrow table of a result's scalar metrics and parameters
+
+    best_trade and worst_trade are left out (they are rows of the trades dataset).
+    """
+    row = {'result_id': result_id}
+    for name, value in (params or {}).items():
+        row[name] = _scalar(value)
+    for name, value in metrics.items():
+        if not isinstance(value, dict):
+            row[name] = _scalar(value)
+    return pa.Table.from_pylist([row])
+
+
+class _PartitionFile:
+    """Buffered writer of one partition's part files"""
+
+    def __init__(self, path):
+        self.path = path
+        self.pieces = []
+        self.rows = 0
+        self.writer = None
+        self._files = 0
+
+    def flush(self):
+        if not self.rows:
+            return
+        table = pa.concat_tables(self.pieces, promote_options='default')
+        if self.writer is not None and table.schema != self.writer.schema:
+            # Columns changed (e.g. different parameters); continue in a new file
+            self.writer.close()
+            self.writer = None
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            suffix = f"-{self._files}" if self._files else ""
+            self.writer = pq.ParquetWriter(self.path.replace(".parquet", f"{suffix}.parquet"), table.schema)
+            self._files += 1
+        # The whole buffer becomes one row group
+        self.writer.write_table(table, row_group_size=len(table))
+        self.pieces = []
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class ResultDatasetWriter:
+    def __init__(self, root, run_id=None, batch_rows=EXPORT_BATCH_ROWS,
+                 max_buffered_rows=EXPORT_MAX_BUFFERED_ROWS):
+        """
+        Open a writer that appends results to the datasets under root
+
+        Several writers (threads, processes or machines) can write to the same
+        root and run at once; each writes its own part files.
+
+        Args:
+            root: Directory of the trades, equity and metrics datasets
+            run_id: Run partition for everything this writer writes
+                (default: the current date and time)
+            batch_rows: Rows per Parquet row group
+            max_buffered_rows: Rows buffered across all files before everything is flushed
+        """
+        _require_pyarrow()
+        self.root = root
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.batch_rows = batch_rows
+        self.max_buffered_rows = max_buffered_rows
+        self._writer_id = uuid.uuid4().hex[:12]
+        self._files = OrderedDict()    # (dataset, ticker) -> _PartitionFile, most recently used last
+        self._parts = 0
+        self._buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _file(self, dataset, ticker):
+        key = (dataset, ticker)
+        file = self._files.get(key)
+        if file is not None:
+            self._files.move_to_end(key)
+            return file
+
+        if len(self._files) >= MAX_OPEN_FILES:
+            _, oldest = self._files.popitem(last=False)
+            self._buffered -= oldest.rows
+            oldest.close()
+
+        directory = os.path.join(self.root, dataset, f"ticker={quote(ticker, safe='')}",
+                                 f"run_id={quote(self.run_id, safe='')}")
+        self._parts += 1
+        file = _PartitionFile(os.path.join(directory, f"part-{self._writer_id}-{self._parts:05d}.parquet"))
+        self._files[key] = file
+        return file
+
+    def _append(self, dataset, ticker, table):
+        if table.num_rows == 0:
+            return
+        file = self._file(dataset, ticker)
+        file.pieces.append(table)
+        file.rows += table.num_rows
+        self._buffered += table.num_rows
+
+        if file.rows >= self.batch_rows:
+            self._buffered -= file.rows
+            file.flush()
+        if self._buffered > self.max_buffered_rows:
+            self.flush()
+
+    def new_result_id(self):
+        """Identifier linking a result's trades, equity and metrics rows"""
+        return uuid.uuid4().hex[:16]
+
+    def write(self, result, params=None, result_id=None):
+        """
+        Append one backtest result
+
+        Args:
+            result: Dictionary returned by Backtester.run() (None is ignored)
+            params: Optional dictionary of parameters stored with the metrics
+            result_id: Identifier to use (e.g. one already passed to equity_sink())
+
+        Returns:
+            The result_id, or None if result is None
+        """
+        if result is None:
+            return None
+        result_id = result_id or self.new_result_id()
+        ticker = result['ticker']
+        self._append('trades', ticker, trades_table(result['trades'], result_id))
+        if result.get('equity_curve'):
+            self._append('equity', ticker, equity_table(result['equity_curve'], result_id))
+        self._append('metrics', ticker, metrics_table(result['metrics'], result_id, params))
+        return result_id
+
+    def equity_sink(self, ticker, result_id):
+        """
+        Callable that appends blocks of equity rows as they are produced
+
+        Pass it to backtest.streaming.run_chunked() so the equity curve of a
+        long run is exported block by block instead of kept in memory.
+        """
+        def append(equity_curve):
+            self._append('equity', ticker, equity_table(equity_curve, result_id))
+        return append
+
+    def flush(self):
+        """Write every buffered row"""
+        for file in self._files.values():
+            file.flush()
+        self._buffered = 0
+
+    def close(self):
+        """Flush and close every open file"""
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+        self._buffered = 0
+
+
+class ResultDataset:
+    def __init__(self, root):
+        """
+        Open the datasets written by ResultDatasetWriter (nothing is read yet)
+
+        Args:
+            root: Directory of the trades, equity and metrics datasets
+        """
+        _require_pyarrow()
+        self.root = root
+        self._datasets = {}
+        self._partitioning = ds.partitioning(
+            pa.schema([(name, pa.string()) for name in PARTITIONING]), flavor='hive'
+        )
+
+    def dataset(self, name):
+        """The pyarrow dataset of 'trades', 'equity' or 'metrics' (None if nothing was written)"""
+        if name not in self._datasets:
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                return None
+            discovered = ds.dataset(path, format='parquet', partitioning=self._partitioning)
+            # Part files can have different columns (the writer starts a new file when the
+            # parameters change), and discovery only looks at one of them, so read every
+            # file's footer and open the dataset with the union of their schemas
+            schemas = [fragment.physical_schema for fragment in discovered.get_fragments()]
+            schemas.append(self._partitioning.schema)
+            schema = pa.unify_schemas(schemas, promote_options='permissive')
+            self._datasets[name] = ds.dataset(path, schema=schema, format='parquet',
+                                              partitioning=self._partitioning)
+        return self._datasets[name]
+
+    @staticmethod
+    def _filter(tickers=None, run_ids=None, result_ids=None):
+        expression = None
+        for field, values in (('ticker', tickers), ('run_id', run_ids), ('result_id', result_ids)):
+            if values is None:
+                continue
+            values = [values] if isinstance(values, str) else list(values)
+            condition = ds.field(field).isin(values)
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def scan(self, name, columns=None, tickers=None, run_ids=None, result_ids=None):
+        """
+        Iterate over a dataset in record batches
+
+        Args:
+            name: 'trades', 'equity' or 'metrics'
+            columns: Columns to read (default all, including ticker and run_id)
+            tickers, run_ids, result_ids: Optional values (or lists) to keep
+
+        Yields:
+            pyarrow.RecordBatch
+        """
+        dataset = self.dataset(name)
+        if dataset is None:
+            return
+        yield from dataset.to_batches(columns=columns, filter=self._filter(tickers, run_ids, result_ids))
+
+    def read(self, name, columns=None, tickers=None, run_ids=None, result_ids=None):
+        """
+        Read the selected columns and partitions of a dataset
+
+        Returns:
+            DataFrame (empty if nothing matches)
+        """
+        dataset = self.dataset(name)
+        if dataset is None:
+            return pd.DataFrame(columns=columns)
+        table = dataset.to_table(columns=columns, filter=self._filter(tickers, run_ids, result_ids))
+        return table.to_pandas()
+
+    def trades(self, **kwargs):
+        """read('trades', ...)"""
+        return self.read('trades', **kwargs)
+
+    def equity(self, **kwargs):
+        """read('equity', ...)"""
+        return self.read('equity', **kwargs)
+
+    def metrics(self, **kwargs):
+        """read('metrics', ...)"""
+        return self.read('metrics', **kwargs)
+
+    def result(self, ticker, result_id=None, run_id=None, trade_columns=None, equity_columns=('date', 'equity')):
+        """
+        One stored result in the shape of Backtester.run()
+
+        Args:
+            ticker: Stock symbol
+            result_id: Result to load (default: the ticker's first result in run_id)
+            run_id: Run to look in (default all runs)
+            trade_columns: Trade columns to load (default all)
+            equity_columns: Equity columns to load (default date and equity, enough for the charts)
+
+        Returns:
+            Dictionary with 'ticker', 'metrics' (dict), 'trades' and
+            'equity_curve' (DataFrames sorted by date), or None if not found
+        """
+        metrics = self.metrics(tickers=ticker, run_ids=run_id, result_ids=result_id)
+        if metrics.empty:
+            print(f"Error: No stored result for {ticker}")
+            return None
+        row = metrics.iloc[0]
+        result_id = row['result_id']
+
+        trades = self.trades(columns=trade_columns, tickers=ticker, run_ids=row['run_id'], result_ids=result_id)
+        equity = self.equity(columns=list(equity_columns), tickers=ticker, run_ids=row['run_id'],
+                             result_ids=result_id)
+        if 'exit_date' in trades.columns:
+            trades = trades.sort_values('exit_date', ignore_index=True)
+        if 'date' in equity.columns:
+            equity = equity.sort_values('date', ignore_index=True)
+
+        return {
+            'ticker': ticker,
+            'metrics': row.drop(['ticker', 'run_id', 'result_id']).dropna().to_dict(),
+            'trades': trades,
+            'equity_curve': equity,
+        }
@@ -0,0 +1,271 @@
+"""
+Persistent result store for backtests
+
+Every backtest run is keyed by a SHA-256 hash of all of its inputs: the ticker,
+date range, capital and risk parameters, the indicator periods (config.py
+defaults unless overridden) and the price data itself. Re-running an unchanged
+backtest returns the stored metrics, trades and equity curve instead of
+re-simulating.
+
+Results live in a single SQLite file. The inputs and headline metrics are kept
+in indexed columns so past runs can be queried by ticker, parameter ranges or
+metric thresholds; the full trade log and equity curve are stored as blobs.
+"""
+
+import hashlib
+import json
+import pickle
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Bump when the simulation logic changes so old results are not reused
+RESULT_STORE_VERSION = 1
+
+PARAM_COLUMNS = [
+    'initial_capital', 'stop_loss_pct', 'max_position_pct', 'daily_loss_limit_pct',
+    'ma_short_period', 'ma_long_period', 'rsi_period', 'volume_period',
+]
+
+METRIC_COLUMNS = [
+    'final_value', 'total_return', 'cagr', 'num_trades', 'win_rate',
+    'max_drawdown', 'sharpe_ratio', 'sortino_ratio', 'stop_loss_count',
+]
+
+SUMMARY_COLUMNS = ['run_key', 'ticker', 'start_date', 'end_date'] + PARAM_COLUMNS + METRIC_COLUMNS + ['created_at']
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_key TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    {', '.join(f'{c} REAL' for c in PARAM_COLUMNS)},
+    data_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    {', '.join(f'{c} REAL' for c in METRIC_COLUMNS)},
+    metrics BLOB,
+    trades BLOB,
+    equity_curve BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_runs_ticker ON runs (ticker, start_date, end_date);
+CREATE INDEX IF NOT EXISTS idx_runs_risk ON runs (stop_loss_pct, max_position_pct, daily_loss_limit_pct);
+CREATE INDEX IF NOT EXISTS idx_runs_sharpe ON runs (sharpe_ratio);
+CREATE INDEX IF NOT EXISTS idx_runs_return ON runs (total_return);
+CREATE INDEX IF NOT EXISTS idx_runs_drawdown ON runs (max_drawdown);
+"""
+
+
+def hash_price_data(price_data):
+    """
+    Fingerprint the price bars a backtest depends on
+
+    Args:
+        price_data: DataFrame with a DatetimeIndex and Close/Volume columns
+
+    Returns:
+        Hex digest that changes whenever a date, close or volume changes
+    """
+    digest = hashlib.sha256()
+    digest.update(price_data.index.asi8.tobytes())
+    digest.update(price_data['Close'].to_numpy(dtype='float64').tobytes())
+    digest.update(price_data['Volume'].to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()
+
+
+def backtest_inputs(backtester, price_data):
+    """
+    Collect every input that determines a backtest's result
+
+    Args:
+        backtester: Backtester instance (parameters are read from it)
+        price_data: Price bars the run will simulate over
+
+    Returns:
+        Dictionary of inputs (used for both the hash and the indexed columns)
+    """
+    inputs = {
+        'version': RESULT_STORE_VERSION,
+        'ticker': backtester.ticker,
+        'start_date': str(backtester.start_date),
+        'end_date': str(backtester.end_date),
+        'interval': backtester.interval,
+        'price_dtype': np.dtype(backtester.price_dtype).name,
+        'initial_capital': float(backtester.initial_capital),
+        'stop_loss_pct': float(backtester.stop_loss_pct),
+        'max_position_pct': float(backtester.max_position_pct),
+        'daily_loss_limit_pct': float(backtester.daily_loss_limit_pct),
+        'ma_short_period': backtester.ma_short_period,
+        'ma_long_period': backtester.ma_long_period,
+        'rsi_period': backtester.rsi_period,
+        'volume_period': backtester.volume_period,
+        'data_hash': hash_price_data(price_data),
+    }
+    if backtester.confirm_timeframes:
+        # Only present when set, so keys of runs without confirmation are unchanged
+        inputs['confirm_timeframes'] = list(backtester.confirm_timeframes)
+    return inputs
+
+
+def make_run_key(inputs):
+    """Hash a dictionary of backtest inputs into a run key"""
+    payload = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultStore:
+    def __init__(self, path):
+        """
+        Open (or create) a result store
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # A fresh connection per call keeps the store safe to share across threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, run_key):
+        """
+        Look up a stored run
+
+        Args:
+            run_key: Key from make_run_key()
+
+        Returns:
+            Tuple of (found, result) where result is the dict Backtester.run()
+            returned, or None if that run executed no trades
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT ticker, metrics, trades, equity_curve FROM runs WHERE run_key = ?",
+                (run_key,)
+            ).fetchone()
+
+        if row is None:
+            return False, None
+
+        ticker, metrics, trades, equity_curve = row
+        if metrics is None:
+            return True, None
+
+        return True, {
+            'ticker': ticker,
+            'metrics': pickle.loads(metrics),
+            'trades': pickle.loads(trades),
+            'equity_curve': pickle.loads(equity_curve),
+        }
+
+    def put(self, run_key, inputs, result):
+        """
+        Store the outcome of a run
+
+        Args:
+            run_key: Key from make_run_key()
+            inputs: Dictionary from backtest_inputs()
+            result: Dict returned by Backtester.run(), or None if no trades ran
+        """
+        metrics = result['metrics'] if result else {}
+        row = {
+            'run_key': run_key,
+            'ticker': inputs['ticker'],
+            'start_date': inputs['start_date'],
+            'end_date': inputs['end_date'],
+            'data_hash': inputs['data_hash'],
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'metrics': pickle.dumps(metrics) if result else None,
+            'trades': pickle.dumps(result['trades']) if result else None,
+            'equity_curve': pickle.dumps(result['equity_curve']) if result else None,
+        }
+        for column in PARAM_COLUMNS:
+            row[column] = inputs[column]
+        for column in METRIC_COLUMNS:
+            row[column] = float(metrics[column]) if column in metrics else None
+
+        columns = ', '.join(row)
+        placeholders = ', '.join('?' for _ in row)
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO runs ({columns}) VALUES ({placeholders})",
+                tuple(row.values())
+            )
+
+    def query(self, ticker=None, param_ranges=None, min_metrics=None, max_metrics=None,
+              order_by=None, descending=True, limit=None):
+        """
+        Search past runs by ticker, parameter ranges and metric thresholds
+
+        Args:
+            ticker: Ticker symbol or list of symbols (None for all)
+            param_ranges: Dict of parameter -> (low, high); either bound may be None
+            min_metrics: Dict of metric -> minimum value (e.g. {'sharpe_ratio': 1.0})
+            max_metrics: Dict of metric -> maximum value (e.g. {'max_drawdown': 20})
+            order_by: Column to sort by (e.g. 'sharpe_ratio')
+            descending: Sort direction for order_by
+            limit: Maximum number of rows
+
+        Returns:
+            DataFrame with one row per run (inputs and headline metrics only)
+        """
+        clauses = []
+        params = []
+
+        if ticker is not None:
+            tickers = [ticker] if isinstance(ticker, str) else list(ticker)
+            clauses.append(f"ticker IN ({', '.join('?' for _ in tickers)})")
+            params.extend(tickers)
+
+        for column, (low, high) in (param_ranges or {}).items():
+            _check_column(column, PARAM_COLUMNS)
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                params.append(high)
+
+        for column, value in (min_metrics or {}).items():
+            _check_column(column, METRIC_COLUMNS)
+            clauses.append(f"{column} >= ?")
+            params.append(value)
+
+        for column, value in (max_metrics or {}).items():
+            _check_column(column, METRIC_COLUMNS)
+            clauses.append(f"{column} <= ?")
+            params.append(value)
+
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM runs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_by is not None:
+            _check_column(order_by, SUMMARY_COLUMNS)
+            sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+
+def _check_column(column, allowed):
+    """Reject column names that are not part of the schema (they are put into SQL directly)"""
+    if column not in allowed:
+        raise ValueError(f"Unknown column '{column}'. Choose from: {', '.join(allowed)}")
@@ -0,0 +1,239 @@
+"""
+Rolling covariance and portfolio risk limits
+
+Position sizing with max_position_pct treats every holding as an independent
+bet, even when five of them move together. RollingCovariance keeps the
+covariance of returns across a whole universe over the last `window` bars so
+a portfolio backtest can limit how correlated its holdings are and how
+volatile the book is.
+
+The matrix is not recomputed from the window on every bar. The model keeps
+running sums over the window (pairwise bar counts, sums and cross products)
+and each new bar adds its outer products to them: a rank-one update. The bar
+that leaves the window is subtracted the same way, so a bar costs O(n^2) for
+n tickers instead of O(window * n^2). To keep floating-point drift from
+building up, the sums are rebuilt from the stored window once every `window`
+bars.
+
+Missing returns (a ticker not yet listed, or a halted day) are skipped
+pairwise: each covariance uses the bars where both tickers have a return.
+
+The sample covariance of a few hundred tickers over a few months of bars is
+noisy, so covariance() shrinks it toward a constant-correlation target (every
+pair gets the average correlation), as in Ledoit and Wolf (2004). Pairs with
+too little shared history get the target alone.
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import RISK_WINDOW, RISK_SHRINKAGE
+
+
+class RollingCovariance:
+    def __init__(self, tickers, window=RISK_WINDOW, min_periods=None, shrinkage=RISK_SHRINKAGE):
+        """
+        Rolling covariance of a ticker universe
+
+        Args:
+            tickers: Ticker symbols (the columns of the return rows)
+            window: Bars in the rolling window
+            min_periods: Shared bars a pair needs for its own estimate (default window / 2)
+            shrinkage: Weight of the constant-correlation target (0 = sample covariance)
+        """
+        self.tickers = list(tickers)
+        self.window = window
+        self.min_periods = min_periods or max(2, window // 2)
+        self.shrinkage = shrinkage
+        self._columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        n = len(self.tickers)
+        # Ring buffer of the window's returns (0 where missing) and validity
+        self._rows = np.zeros((window, n))
+        self._valid = np.zeros((window, n), dtype=bool)
+        self._next = 0
+        self._since_rebuild = 0
+        self.bars = 0
+
+        # Pairwise sums over the window: bars where both have a return, sum of
+        # the row ticker's returns over those bars, and sum of the products
+        self._count = np.zeros((n, n))
+        self._sum = np.zeros((n, n))
+        self._product = np.zeros((n, n))
+
+    def _add(self, values, valid, signs):
+        """Add (sign 1) or subtract (sign -1) the outer products of each row"""
+        valid = valid.astype(float)
+        signed_valid = valid * signs[:, None]
+        self._count += valid.T @ signed_valid
+        self._sum += values.T @ signed_valid
+        self._product += values.T @ (values * signs[:, None])
+
+    def update(self, returns):
+        """
+        Add one bar (or several consecutive bars) of returns
+
+        Args:
+            returns: Array of returns in ticker order, one row per bar (NaN = missing)
+        """
+        rows = np.atleast_2d(np.asarray(returns, dtype=float))
+        for start in range(0, len(rows), self.window):
+            self._push(rows[start:start + self.window])
+
+    def _push(self, rows):
+        valid = ~np.isnan(rows)
+        values = np.where(valid, rows, 0.0)
+        slots = (self._next + np.arange(len(rows))) % self.window
+
+        # Subtract the bars leaving the window (empty slots hold zeros) and add the new ones
+        signs = np.repeat([-1.0, 1.0], len(rows))
+        self._add(np.vstack([self._rows[slots], values]), np.vstack([self._valid[slots], valid]), signs)
+        self._rows[slots] = values
+        self._valid[slots] = valid
+
+        self._next = (self._next + len(rows)) % self.window
+        self.bars += len(rows)
+        self._since_rebuild += len(rows)
+        if self._since_rebuild >= self.window:
+            self._rebuild()
+
+    def _rebuild(self):
+        """Recompute the running sums from the stored window"""
+        self._count[:] = 0
+        self._sum[:] = 0
+        self._product[:] = 0
+        self._add(self._rows, self._valid, np.ones(self.window))
+        self._since_rebuild = 0
+
+    def _indices(self, tickers):
+        if tickers is None:
+            return np.arange(len(self.tickers))
+        return np.array([self._columns[ticker] for ticker in tickers], dtype=int)
+
+    def sample_covariance(self, tickers=None):
+        """
+        Unshrunk pairwise covariance of the window
+
+        Args:
+            tickers: Subset of tickers (default all)
+
+        Returns:
+            2D array; NaN for pairs with fewer than min_periods shared bars
+        """
+        idx = np.ix_(self._indices(tickers), self._indices(tickers))
+        count, total, product = self._count[idx], self._sum[idx], self._product[idx]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = (product - total * total.T / count) / (count - 1)
+        covariance[count < self.min_periods] = np.nan
+        return covariance
+
+    def covariance(self, tickers=None):
+        """
+        Shrunk covariance matrix
+
+        Args:
+            tickers: Subset of tickers (default all)
+
+        Returns:
+            DataFrame, tickers x tickers. Tickers without min_periods bars of
+            their own have NaN rows and columns.
+        """
+        names = self.tickers if tickers is None else list(tickers)
+        sample = self.sample_covariance(names)
+        variances = np.diag(sample).copy()
+        variances[variances <= 0] = np.nan
+        scale = np.sqrt(np.outer(variances, variances))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = sample / scale
+        off_diagonal = correlation[~np.eye(len(names), dtype=bool)]
+        off_diagonal = off_diagonal[~np.isnan(off_diagonal)]
+        average = float(np.clip(off_diagonal.mean(), -1, 1)) if len(off_diagonal) else 0.0
+
+        target = average * scale
+        np.fill_diagonal(target, variances)
+        shrunk = (1 - self.shrinkage) * sample + self.shrinkage * target
+        # Pairs without enough shared history fall back to the target
+        shrunk = np.where(np.isnan(sample), target, shrunk)
+        return pd.DataFrame(shrunk, index=names, columns=names)
+
+    def correlation(self, tickers=None):
+        """
+        Correlation matrix of the shrunk covariance
+
+        Returns:
+            DataFrame, tickers x tickers, values in [-1, 1]
+        """
+        covariance = self.covariance(tickers)
+        values = covariance.to_numpy()
+        deviations = np.sqrt(np.diag(values))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = np.clip(values / np.outer(deviations, deviations), -1, 1)
+        np.fill_diagonal(correlation, 1.0)
+        return pd.DataFrame(correlation, index=covariance.index, columns=covariance.columns)
+
+    def portfolio_volatility(self, weights, periods_per_year=252):
+        """
+        Annualized volatility of a portfolio
+
+        Args:
+            weights: Series or dictionary of ticker -> weight (fractions of the book)
+            periods_per_year: Bars per year for annualizing
+
+        Returns:
+            Volatility as a fraction (0.15 = 15%); tickers without a variance
+            estimate contribute nothing, NaN if none of them has one
+        """
+        weights = pd.Series(weights, dtype=float)
+        weights = weights[weights != 0]
+        if weights.empty:
+            return 0.0
+        covariance = self.covariance(weights.index).to_numpy()
+        known = ~np.isnan(np.diag(covariance))
+        if not known.any():
+            return float('nan')
+        w = weights.to_numpy()[known]
+        variance = w @ np.nan_to_num(covariance[np.ix_(known, known)]) @ w
+        return float(np.sqrt(max(variance, 0.0) * periods_per_year))
+
+
+def select_uncorrelated(ranked, correlation, k, max_correlation):
+    """
+    Pick up to k names best-first, skipping names too correlated with those already picked
+
+    Args:
+        ranked: Ticker symbols in order of preference
+        correlation: DataFrame covering at least the ranked tickers
+        k: Names to pick
+        max_correlation: Highest correlation allowed between two picked names
+
+    Returns:
+        List of picked tickers (fewer than k if the ranking runs out)
+    """
+    ranked = list(ranked)
+    if not ranked or k <= 0:
+        return []
+    matrix = correlation.loc[ranked, ranked].to_numpy()
+    # Highest correlation of each candidate with anything picked so far
+    closest = np.full(len(ranked), -np.inf)
+    picked = []
+    for i in range(len(ranked)):
+        if closest[i] > max_correlation:
+            continue
+        picked.append(i)
+        if len(picked) == k:
+            break
+        closest = np.fmax(closest, matrix[i])
+    return [ranked[i] for i in picked]
+
+
+def volatility_scale(volatility, max_volatility):
+    """
+    Fraction of the book to keep invested so the portfolio stays under max_volatility
+
+    Returns:
+        1.0 when the volatility is unknown or within the limit
+    """
+    if not max_volatility or not volatility or np.isnan(volatility) or volatility <= max_volatility:
+        return 1.0
+    return max_volatility / volatility
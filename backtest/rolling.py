@@ -0,0 +1,299 @@
+"""
+Rolling-window performance analytics
+
+calculate_metrics() and calculate_sharpe_ratio() summarize a whole backtest in
+one number. This module computes the same statistics over a trailing window at
+every bar, for a single equity curve (Series) or a panel of curves (DataFrame,
+one column per ticker or strategy):
+
+- rolling_sharpe, rolling_sortino, rolling_volatility
+- rolling_drawdown: distance below the highest equity of the window
+- rolling_return and rolling_excess_return (strategy minus buy-and-hold, as in
+  compare_to_buy_and_hold)
+
+Each series costs O(n) regardless of the window length. Window sums of returns,
+squared returns and downside returns are differences of cumulative sums, and
+the rolling high uses the van Herk/Gil-Werman block algorithm (the vectorized
+counterpart of a monotonic deque). All columns of a panel are processed in the
+same NumPy operations. Values are NaN until a full window is available.
+"""
+
+import numpy as np
+import pandas as pd
+
+from backtest.metrics import compare_to_buy_and_hold
+
+
+def equity_series(equity_curve):
+    """
+    Turn a Backtester equity curve into a Series indexed by date
+
+    Args:
+        equity_curve: List of dicts with 'date' and 'equity' keys
+
+    Returns:
+        Series of equity values
+    """
+    return pd.Series([e['equity'] for e in equity_curve],
+                     index=pd.DatetimeIndex([e['date'] for e in equity_curve]), name='equity')
+
+
+def equity_panel(results):
+    """
+    Combine several backtest results into one equity panel
+
+    Args:
+        results: List of Backtester.run() results (with equity curves)
+
+    Returns:
+        DataFrame with one column of equity per ticker (NaN where a ticker has no bar)
+    """
+    return pd.DataFrame({r['ticker']: equity_series(r['equity_curve']) for r in results})
+
+
+def _as_2d(values):
+    """Float array of shape (n, columns) plus a function restoring the input's type"""
+    if isinstance(values, pd.DataFrame):
+        array = values.to_numpy(dtype=float)
+        return array, lambda result: pd.DataFrame(result, index=values.index, columns=values.columns)
+    if isinstance(values, pd.Series):
+        array = values.to_numpy(dtype=float)[:, None]
+        return array, lambda result: pd.Series(result[:, 0], index=values.index, name=values.name)
+    array = np.asarray(values, dtype=float)
+    if array.ndim == 1:
+        return array[:, None], lambda result: result[:, 0]
+    return array, lambda result: result
+
+
+def _returns(equity):
+    """Per-bar returns of each column; the first row is NaN"""
+    returns = np.full_like(equity, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = equity[1:] / equity[:-1] - 1
+    return returns
+
+
+def _window_sum(values, window):
+    """
+    Trailing sums of `window` rows via cumulative sums, O(n)
+
+    Returns:
+        Array of the same shape; rows before the first full window are 0
+    """
+    totals = np.cumsum(values, axis=0)
+    sums = np.zeros_like(totals)
+    sums[window - 1:] = totals[window - 1:]
+    sums[window:] -= totals[:-window]
+    return sums
+
+
+def _window_moments(returns, window, mask=None):
+    """
+    Count, mean and sample standard deviation of returns over each trailing window
+
+    Args:
+        returns: (n, columns) returns, NaN where missing
+        window: Window length in bars
+        mask: Optional boolean array selecting which returns to include (e.g. losses)
+
+    Returns:
+        Tuple of (valid, count, mean, std); valid marks windows without missing returns
+    """
+    finite = np.isfinite(returns)
+    valid = _window_sum(finite.astype(float), window) == window
+    valid[:window - 1] = False
+
+    selected = finite if mask is None else finite & mask
+    # Centering each column first keeps the sum-of-squares subtraction precise
+    center = np.nanmean(np.where(selected, returns, np.nan), axis=0) if selected.any() else 0.0
+    center = np.nan_to_num(center)
+    shifted = np.where(selected, returns - center, 0.0)
+
+    count = _window_sum(selected.astype(float), window)
+    total = _window_sum(shifted, window)
+    total_sq = _window_sum(shifted ** 2, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        variance = (total_sq - total * mean) / (count - 1)
+    std = np.sqrt(np.clip(variance, 0, None))
+
+    # Windows of identical returns (e.g. the strategy sat in cash) have exactly zero
+    # spread, which the cumulative-sum difference only reproduces up to rounding
+    included = np.where(selected, returns, np.nan)
+    constant = _rolling_max(included, window) == -_rolling_max(-included, window)
+    std[constant | (count < 2)] = 0.0
+    return valid, count, mean + center, std
+
+
+def _rolling_max(values, window):
+    """
+    Maximum of each trailing window in O(n) (van Herk/Gil-Werman)
+
+    The series is cut into blocks of `window` rows. A window ending at row i
+    spans the tail of one block and the head of the next, so its maximum is
+    the larger of a suffix maximum and a prefix maximum.
+    """
+    n, columns = values.shape
+    filled = np.where(np.isnan(values), -np.inf, values)
+    blocks = -(-n // window)
+    padded = np.full((blocks * window, columns), -np.inf)
+    padded[:n] = filled
+    padded = padded.reshape(blocks, window, columns)
+
+    prefix = np.maximum.accumulate(padded, axis=1).reshape(-1, columns)[:n]
+    suffix = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape(-1, columns)[:n]
+
+    result = np.full((n, columns), np.nan)
+    if n >= window:
+        result[window - 1:] = np.maximum(suffix[:n - window + 1], prefix[window - 1:])
+    return result
+
+
+def _risk_ratios(values, window, risk_free_rate, periods_per_year):
+    """Rolling volatility, Sharpe and Sortino of a (n, columns) equity array"""
+    returns = _returns(values)
+    valid, _, mean, std = _window_moments(returns, window)
+    with np.errstate(invalid='ignore'):
+        losses = returns < 0
+    _, _, _, down_std = _window_moments(returns, window, mask=losses)
+
+    excess = np.sqrt(periods_per_year) * (mean - risk_free_rate / periods_per_year)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, excess / std, 0.0)
+        sortino = np.where(down_std > 0, excess / down_std, 0.0)
+
+    return {
+        'sharpe': np.where(valid, sharpe, np.nan),
+        'sortino': np.where(valid, sortino, np.nan),
+        'volatility': np.where(valid, std * np.sqrt(periods_per_year) * 100, np.nan),
+    }
+
+
+def rolling_volatility(equity, window, periods_per_year=252):
+    """
+    Annualized volatility of returns over each trailing window
+
+    Args:
+        equity: Series, DataFrame or array of equity values
+        window: Window length in bars (number of returns)
+        periods_per_year: Bars per year (see PERIODS_PER_YEAR in config.py)
+
+    Returns:
+        Volatility in % (same type and shape as equity)
+    """
+    values, wrap = _as_2d(equity)
+    return wrap(_risk_ratios(values, window, 0.0, periods_per_year)['volatility'])
+
+
+def rolling_sharpe(equity, window, risk_free_rate=0.02, periods_per_year=252):
+    """
+    Annualized Sharpe ratio over each trailing window (as in Backtester.calculate_metrics)
+
+    Args:
+        equity: Series, DataFrame or array of equity values
+        window: Window length in bars (number of returns)
+        risk_free_rate: Annual risk-free rate
+        periods_per_year: Bars per year
+
+    Returns:
+        Sharpe ratios (same type and shape as equity); 0 for flat windows
+    """
+    values, wrap = _as_2d(equity)
+    return wrap(_risk_ratios(values, window, risk_free_rate, periods_per_year)['sharpe'])
+
+
+def rolling_sortino(equity, window, risk_free_rate=0.02, periods_per_year=252):
+    """
+    Annualized Sortino ratio over each trailing window (downside deviation of losing bars)
+
+    Args:
+        equity: Series, DataFrame or array of equity values
+        window: Window length in bars (number of returns)
+        risk_free_rate: Annual risk-free rate
+        periods_per_year: Bars per year
+
+    Returns:
+        Sortino ratios (same type and shape as equity); 0 with fewer than two losing bars
+    """
+    values, wrap = _as_2d(equity)
+    return wrap(_risk_ratios(values, window, risk_free_rate, periods_per_year)['sortino'])
+
+
+def rolling_drawdown(equity, window):
+    """
+    Drawdown below the highest equity of each trailing window
+
+    Args:
+        equity: Series, DataFrame or array of equity values
+        window: Window length in bars
+
+    Returns:
+        Drawdown in % (same type and shape as equity)
+    """
+    values, wrap = _as_2d(equity)
+    peaks = _rolling_max(values, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return wrap((peaks - values) / peaks * 100)
+
+
+def rolling_return(equity, window):
+    """
+    Return over each trailing window of `window` bars
+
+    Returns:
+        Return in % (same type and shape as equity)
+    """
+    values, wrap = _as_2d(equity)
+    result = np.full_like(values, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[window:] = (values[window:] / values[:-window] - 1) * 100
+    return wrap(result)
+
+
+def rolling_excess_return(equity, prices, window):
+    """
+    Strategy return minus buy-and-hold return over each trailing window
+
+    Args:
+        equity: Strategy equity (Series, DataFrame or array)
+        prices: Closing prices of the traded tickers, aligned with equity
+            (same shape; DataFrame columns matching the equity panel)
+        window: Window length in bars
+
+    Returns:
+        Outperformance in percentage points (same type and shape as equity)
+    """
+    values, wrap = _as_2d(equity)
+    price_values, _ = _as_2d(prices)
+    strategy = rolling_return(values, window)
+    buy_and_hold = rolling_return(price_values, window)
+    return wrap(compare_to_buy_and_hold(strategy, buy_and_hold))
+
+
+def rolling_metrics(equity, window, prices=None, risk_free_rate=0.02, periods_per_year=252):
+    """
+    All rolling statistics for an equity curve or a panel of curves
+
+    Args:
+        equity: Series (one curve) or DataFrame (one column per curve)
+        window: Window length in bars
+        prices: Optional closing prices aligned with equity, for excess_return
+        risk_free_rate: Annual risk-free rate
+        periods_per_year: Bars per year
+
+    Returns:
+        DataFrame with one column per statistic for a Series, or columns
+        (statistic, curve) for a DataFrame
+    """
+    values, wrap = _as_2d(equity)
+    metrics = {name: wrap(series)
+               for name, series in _risk_ratios(values, window, risk_free_rate, periods_per_year).items()}
+    metrics['drawdown'] = rolling_drawdown(equity, window)
+    metrics['return'] = rolling_return(equity, window)
+    if prices is not None:
+        metrics['excess_return'] = rolling_excess_return(equity, prices, window)
+
+    if isinstance(equity, pd.DataFrame):
+        return pd.concat(metrics, axis=1)
+    return pd.DataFrame(metrics)
@@ -0,0 +1,238 @@
+"""
+Universe rotation backtests
+
+Backtester trades one ticker on its own signals. A rotation strategy instead
+holds the K best-ranked tickers of the universe in equal weights and
+rebalances into the new top K every few bars:
+
+1. Score every ticker on every day (analysis.cross_section.technical_score_panel).
+2. Select each day's top K (top_k_mask).
+3. simulate_rotation() holds the selection made at a bar's close from the next
+   bar on, so a day's scores never trade on that day's return.
+
+Between rebalances the positions drift with their prices; at a rebalance the
+book is reset to equal weights and the traded fraction (turnover) is charged
+at cost_bps. Places a day cannot fill (fewer than K tickers with a score)
+are held in cash. Each holding period is simulated with whole-panel NumPy
+operations, so a universe of thousands of tickers runs in seconds.
+
+Risk limits (optional) use a backtest.risk.RollingCovariance of the whole
+universe, updated with each bar's returns up to the rebalance bar:
+
+- max_correlation walks the day's ranking best-first and skips a name whose
+  correlation with a name already picked is above the limit, filling the
+  K places from further down the ranking.
+- max_volatility scales the equal weights down (the rest is held in cash)
+  when the book's annualized volatility would be above the limit.
+"""
+
+import numpy as np
+import pandas as pd
+
+from analysis.cross_section import load_price_panels, technical_score_panel, top_k_mask
+from backtest.metrics import calculate_cagr, calculate_sharpe_ratio, compare_to_buy_and_hold
+from backtest.risk import RollingCovariance, select_uncorrelated, volatility_scale
+from config import DEFAULT_INTERVAL, PERIODS_PER_YEAR, RISK_WINDOW
+
+
+def simulate_rotation(close, membership, initial_capital=10000, rebalance_every=1, cost_bps=0.0,
+                      periods_per_year=252, scores=None, max_correlation=None, max_volatility=None,
+                      risk_model=None):
+    """
+    Simulate holding the selected tickers in equal weights
+
+    Args:
+        close: DataFrame of closing prices, dates x tickers
+        membership: Boolean DataFrame of the same shape (True = hold from the next bar on)
+        initial_capital: Starting investment
+        rebalance_every: Bars between rebalances
+        cost_bps: Trading cost in basis points of the traded value
+        periods_per_year: Bars per year for annualizing
+        scores: Optional DataFrame ranking the tickers (higher is better) for
+            max_correlation; without it the selected tickers are taken in column order
+        max_correlation: Highest correlation allowed between two holdings
+        max_volatility: Highest annualized portfolio volatility (fraction)
+        risk_model: RollingCovariance over close's columns for the risk limits,
+            possibly warmed up with earlier bars (default: a new one)
+
+    Returns:
+        Dictionary with 'metrics', the 'equity', 'turnover' and 'exposure'
+        Series and the 'holdings' DataFrame (tickers held after each rebalance)
+    """
+    raw_returns = close.pct_change(fill_method=None).to_numpy()
+    returns = np.nan_to_num(raw_returns)
+    selected = membership.reindex_like(close).fillna(False).to_numpy(dtype=bool)
+    counts = selected.sum(axis=1)
+    num_bars, num_tickers = returns.shape
+
+    # First rebalance on the first bar that selects anything
+    first = int(np.argmax(counts > 0)) if counts.any() else num_bars
+    rebalance_bars = np.arange(first, num_bars, max(1, rebalance_every))
+
+    equity = np.full(num_bars, float(initial_capital))
+    turnover = np.zeros(num_bars)
+    exposure = np.zeros(num_bars)
+    held = np.zeros((len(rebalance_bars), num_tickers), dtype=bool)
+    weights = np.zeros(num_tickers)    # drifted weights going into the next rebalance
+    value = float(initial_capital)
+
+    risk = None
+    if max_correlation is not None or max_volatility:
+        risk = risk_model if risk_model is not None else RollingCovariance(close.columns)
+        ranking = scores.reindex_like(close).to_numpy(dtype=float) if scores is not None else None
+        updated = 0    # bars already added to the risk model
+
+    for i, bar in enumerate(rebalance_bars):
+        target = selected[bar] / counts[bar] if counts[bar] else np.zeros(num_tickers)
+        if risk is not None and counts[bar]:
+            # Returns up to and including the rebalance bar are known at its close
+            risk.update(raw_returns[updated:bar + 1])
+            updated = bar + 1
+            target = _risk_limited_target(risk, target, selected[bar], counts[bar],
+                                          ranking[bar] if ranking is not None else None,
+                                          max_correlation, max_volatility, periods_per_year)
+        held[i] = target > 0
+        exposure[bar] = target.sum()
+        traded = np.abs(target - weights).sum()
+        turnover[bar] = traded
+        value -= value * traded * cost_bps / 10000
+        equity[bar] = value
+
+        # Hold until the next rebalance bar (inclusive) and let the weights drift
+        end = rebalance_bars[i + 1] if i + 1 < len(rebalance_bars) else num_bars - 1
+        if end == bar:
+            weights = target
+            continue
+        growth = np.cumprod(1 + returns[bar + 1:end + 1], axis=0)
+        positions = target * growth
+        cash = 1 - target.sum()
+        invested = positions.sum(axis=1)
+        path = value * (invested + cash)
+        equity[bar + 1:end + 1] = path
+        exposure[bar + 1:end + 1] = invested / (invested + cash)
+        weights = value * positions[-1] / path[-1]
+        value = path[-1]
+
+    index = close.index
+    equity = pd.Series(equity, index=index, name='equity')
+    bar_returns = equity.pct_change().to_numpy()[first + 1:]
+
+    # Equal-weight buy-and-hold of the universe over the same bars
+    if first < num_bars - 1:
+        universe = np.nanmean(np.cumprod(1 + returns[first + 1:], axis=0)[-1]) - 1
+    else:
+        universe = 0.0
+
+    running_peak = np.maximum.accumulate(equity.to_numpy())
+    total_return = (equity.iloc[-1] - initial_capital) / initial_capital * 100
+    years = (index[-1] - index[first]).days / 365.25 if first < num_bars else 0
+    rebalances = turnover[rebalance_bars] if len(rebalance_bars) else np.zeros(1)
+    metrics = {
+        'final_value': float(equity.iloc[-1]),
+        'total_return': float(total_return),
+        'cagr': float(calculate_cagr(initial_capital, equity.iloc[-1], years)),
+        'max_drawdown': float(((running_peak - equity) / running_peak).max() * 100),
+        'sharpe_ratio': float(calculate_sharpe_ratio(bar_returns, periods_per_year=periods_per_year)),
+        'num_rebalances': int(len(rebalance_bars)),
+        'avg_turnover': float(rebalances.mean()),
+        'avg_exposure': float(exposure[first:].mean() * 100) if first < num_bars else 0.0,
+        'universe_return': float(universe * 100),
+        'outperformance': float(compare_to_buy_and_hold(total_return, universe * 100)),
+    }
+
+    return {
+        'metrics': metrics,
+        'equity': equity,
+        'turnover': pd.Series(turnover, index=index, name='turnover'),
+        'exposure': pd.Series(exposure, index=index, name='exposure'),
+        'holdings': pd.DataFrame(held, index=index[rebalance_bars], columns=close.columns),
+    }
+
+
+def _risk_limited_target(risk, target, selected, k, ranking, max_correlation, max_volatility, periods_per_year):
+    """
+    Apply the correlation and volatility limits to one rebalance's equal weights
+
+    Args:
+        risk: RollingCovariance updated through the rebalance bar
+        target: Equal weights of the selected tickers
+        selected: Boolean array of the selected tickers
+        k: Number of places
+        ranking: The bar's scores (NaN = not eligible), or None to rank the selection by column
+        max_correlation, max_volatility, periods_per_year: See simulate_rotation()
+
+    Returns:
+        Array of target weights (summing to at most 1)
+    """
+    tickers = np.asarray(risk.tickers, dtype=object)
+    if max_correlation is not None:
+        if ranking is not None:
+            eligible = np.flatnonzero(~np.isnan(ranking))
+            # Best score first; ties go to earlier columns as in top_k_mask()
+            order = eligible[np.argsort(-ranking[eligible], kind='stable')]
+        else:
+            order = np.flatnonzero(selected)
+        picked = select_uncorrelated(tickers[order], risk.correlation(tickers[order]), k, max_correlation)
+        # Places left empty by the limit are held in cash
+        target = np.isin(tickers, picked) / k
+
+    if max_volatility:
+        invested = np.flatnonzero(target)
+        volatility = risk.portfolio_volatility(pd.Series(target[invested], index=tickers[invested]),
+                                               periods_per_year)
+        target = target * volatility_scale(volatility, max_volatility)
+    return target
+
+
+def run_rotation(tickers, start_date, end_date, top_k=20, rebalance_every=5, cost_bps=10.0,
+                 initial_capital=10000, interval=DEFAULT_INTERVAL, workers=8, max_correlation=None,
+                 max_volatility=None, risk_window=RISK_WINDOW):
+    """
+    Download a universe, rank it every day and backtest holding the top K
+
+    Indicators are computed over the full downloaded history and then cut to
+    the backtest window, so they are warmed up on the first day.
+
+    Args:
+        tickers: List of stock symbols
+        start_date, end_date: Backtest window
+        top_k: Names held at a time
+        rebalance_every: Bars between rebalances
+        cost_bps: Trading cost in basis points of the traded value
+        initial_capital: Starting investment
+        interval: Bar size
+        workers: Download threads
+        max_correlation: Highest correlation allowed between two holdings
+        max_volatility: Highest annualized portfolio volatility (fraction)
+        risk_window: Bars in the covariance window of the risk limits
+
+    Returns:
+        Dictionary from simulate_rotation() plus the 'scores' panel, or None
+        if no ticker has data in the window
+    """
+    close, volume = load_price_panels(tickers, interval=interval, workers=workers)
+    if close.empty:
+        return None
+
+    scores = technical_score_panel(close, volume)
+    window = slice(start_date, end_date)
+    first = close.index.searchsorted(close.loc[window].index[0]) if len(close.loc[window]) else len(close)
+    risk_model = None
+    if max_correlation is not None or max_volatility:
+        # Warm the covariance up with the bars before the window
+        risk_model = RollingCovariance(close.columns, window=risk_window)
+        history = close.iloc[max(0, first - risk_window - 1):first]
+        risk_model.update(history.pct_change(fill_method=None).iloc[1:].to_numpy())
+
+    close, scores = close.iloc[first:].loc[:end_date], scores.iloc[first:].loc[:end_date]
+    if close.empty:
+        print(f"Error: No data between {start_date} and {end_date}")
+        return None
+
+    result = simulate_rotation(close, top_k_mask(scores, top_k), initial_capital=initial_capital,
+                               rebalance_every=rebalance_every, cost_bps=cost_bps,
+                               periods_per_year=PERIODS_PER_YEAR[interval], scores=scores,
+                               max_correlation=max_correlation, max_volatility=max_volatility,
+                               risk_model=risk_model)
+    result['scores'] = scores
+    return result
@@ -0,0 +1,529 @@
+"""
+Sharded execution of universe-wide backtests and analyses
+
+A full ticker x parameter sweep over thousands of symbols is more work than
+one machine should do. A sharded job splits it into deterministic shards that
+any number of worker processes, on any number of machines sharing the job
+directory, work through:
+
+    <job_dir>/job.json              job definition (kind, dates, parameter grid)
+    <job_dir>/queue.sqlite          shard queue with leases
+    <job_dir>/parts/<shard_id>.npz  columnar partial results, one file per shard
+
+Shards are cut from the sorted ticker list and the risk-parameter grid, so
+creating the same job twice gives the same shards. A worker claims a shard by
+taking a lease on it and renews the lease while it works. If the worker dies,
+the lease runs out and another worker picks the shard up; a shard that raises
+goes back into the queue until it has been tried max_attempts times.
+
+Partial results are written to a temp file and renamed into place, and only
+the worker holding a shard's lease can mark it done, so a retried shard
+replaces its partial file instead of adding a second one. merge_results()
+concatenates the finished shards into one DataFrame.
+
+The queue relies on SQLite file locking, so the job directory must be on a
+filesystem with working locks (a local disk, or an NFSv4 mount), and leases
+assume the workers' clocks agree to within a few seconds.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtest.backtester import Backtester
+from backtest.batch_simulator import make_param_grid, simulate_batch
+from data.bars import BarData
+from config import DEFAULT_INTERVAL
+
+JOB_KINDS = ('backtest', 'analyze')
+RISK_PARAMS = ('stop_loss_pct', 'max_position_pct', 'daily_loss_limit_pct')
+
+DEFAULT_RISK_GRID = {
+    'stop_loss_pct': [0.07],
+    'max_position_pct': [1.0],
+    'daily_loss_limit_pct': [0.10],
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    shard_id TEXT PRIMARY KEY,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER,
+    error TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_shards_status ON shards (status, lease_expires);
+"""
+
+
+def plan_shards(tickers, shard_size=50, num_params=1, param_chunk=None):
+    """
+    Split a ticker x parameter space into deterministic shards
+
+    Args:
+        tickers: Ticker symbols (duplicates are dropped, order does not matter)
+        shard_size: Tickers per shard
+        num_params: Number of parameter sets in the grid
+        param_chunk: Parameter sets per shard (default: all of them)
+
+    Returns:
+        List of shard dicts with shard_id, tickers, param_start and param_stop
+    """
+    tickers = sorted({t.strip().upper() for t in tickers})
+    param_chunk = param_chunk or num_params
+
+    shards = []
+    for i in range(0, len(tickers), shard_size):
+        for start in range(0, num_params, param_chunk):
+            shards.append({
+                'shard_id': f"{len(shards):06d}",
+                'tickers': tickers[i:i + shard_size],
+                'param_start': start,
+                'param_stop': min(start + param_chunk, num_params),
+            })
+    return shards
+
+
+class ShardQueue:
+    def __init__(self, path):
+        """
+        Open (or create) a shard queue
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, shards):
+        """Queue shards (shards that are already queued keep their state)"""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO shards (shard_id, spec, updated_at) VALUES (?, ?, ?)",
+                [(s['shard_id'], json.dumps(s), _now()) for s in shards]
+            )
+
+    def claim(self, worker, lease_seconds, max_attempts=3):
+        """
+        Lease the next shard that is pending or whose lease has run out
+
+        Args:
+            worker: Worker id
+            lease_seconds: How long the lease lasts unless renewed
+            max_attempts: Shards claimed this often are marked failed instead
+
+        Returns:
+            Shard dict, or None when nothing is left to claim
+        """
+        now = time.time()
+        with self._connect() as conn:
+            # Take the write lock up front so two workers cannot claim the same shard
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE shards SET status = 'failed', worker = NULL, error = COALESCE(error, 'lease expired'), "
+                "updated_at = ? WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (_now(), now, max_attempts)
+            )
+            row = conn.execute(
+                "SELECT shard_id, spec FROM shards "
+                "WHERE (status = 'pending' OR (status = 'running' AND lease_expires < ?)) AND attempts < ? "
+                "ORDER BY shard_id LIMIT 1",
+                (now, max_attempts)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE shards SET status = 'running', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE shard_id = ?",
+                (worker, now + lease_seconds, _now(), row[0])
+            )
+        return json.loads(row[1])
+
+    def renew(self, shard_id, worker, lease_seconds):
+        """
+        Extend a lease
+
+        Returns:
+            True if the worker still holds the shard
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET lease_expires = ? WHERE shard_id = ? AND worker = ? AND status = 'running'",
+                (time.time() + lease_seconds, shard_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, shard_id, worker, rows):
+        """
+        Mark a shard done
+
+        Returns:
+            True if the worker still held the shard (False if its lease was lost)
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET status = 'done', worker = NULL, lease_expires = NULL, rows = ?, "
+                "error = NULL, updated_at = ? WHERE shard_id = ? AND worker = ? AND status = 'running'",
+                (rows, _now(), shard_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, shard_id, worker, error, max_attempts=3):
+        """Release a shard after an error (it is retried until max_attempts is reached)"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+                "WHERE shard_id = ? AND worker = ? AND status = 'running'",
+                (max_attempts, error, _now(), shard_id, worker)
+            )
+
+    def retry_failed(self):
+        """
+        Put failed shards back in the queue with a fresh attempt count
+
+        Returns:
+            Number of shards requeued
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET status = 'pending', attempts = 0, updated_at = ? WHERE status = 'failed'",
+                (_now(),)
+            )
+        return cursor.rowcount
+
+    def counts(self):
+        """
+        Returns:
+            Dictionary of status -> number of shards
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall()
+        counts = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        counts.update(dict(rows))
+        return counts
+
+    def shards(self, status=None):
+        """
+        List shards and their queue state
+
+        Returns:
+            DataFrame with one row per shard
+        """
+        sql = "SELECT shard_id, status, worker, attempts, rows, error, updated_at FROM shards"
+        params = []
+        if status is not None:
+            sql += " WHERE status = ?"
+            params.append(status)
+        with self._connect() as conn:
+            return pd.read_sql_query(sql + " ORDER BY shard_id", conn, params=params)
+
+
+def create_job(job_dir, tickers, kind='backtest', start_date='2020-01-01', end_date='2024-01-01',
+               initial_capital=10000, interval=DEFAULT_INTERVAL, param_grid=None,
+               shard_size=50, param_chunk=None, max_attempts=3):
+    """
+    Define a sharded job and queue its shards
+
+    Calling this again with the same arguments is a no-op, so every node may
+    run it before starting its workers.
+
+    Args:
+        job_dir: Directory shared by all workers
+        tickers: Ticker symbols
+        kind: 'backtest' (ticker x risk-parameter sweep) or 'analyze' (score each ticker)
+        start_date, end_date, initial_capital, interval: Backtest settings
+        param_grid: Dict of risk parameter -> list of values (missing ones
+            fall back to DEFAULT_RISK_GRID)
+        shard_size: Tickers per shard
+        param_chunk: Parameter sets per shard (default: the whole grid)
+        max_attempts: Times a shard is tried before it is marked failed
+
+    Returns:
+        Job dictionary (as stored in job.json)
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind '{kind}'. Choose from: {', '.join(JOB_KINDS)}")
+
+    grid = dict(DEFAULT_RISK_GRID)
+    grid.update(param_grid or {})
+    grid = {p: [float(v) for v in grid[p]] for p in RISK_PARAMS}
+    num_params = int(np.prod([len(grid[p]) for p in RISK_PARAMS])) if kind == 'backtest' else 1
+
+    job = {
+        'kind': kind,
+        'start_date': str(start_date),
+        'end_date': str(end_date),
+        'initial_capital': float(initial_capital),
+        'interval': interval,
+        'param_grid': grid if kind == 'backtest' else None,
+        'max_attempts': max_attempts,
+        'shards': plan_shards(tickers, shard_size, num_params, param_chunk),
+    }
+
+    os.makedirs(os.path.join(job_dir, "parts"), exist_ok=True)
+    job_path = os.path.join(job_dir, "job.json")
+    if os.path.exists(job_path):
+        existing = load_job(job_dir)
+        if existing != job:
+            raise ValueError(f"{job_dir} already holds a different job; use a new directory")
+    else:
+        _write_atomic(job_path, json.dumps(job, indent=1).encode())
+
+    ShardQueue(os.path.join(job_dir, "queue.sqlite")).add(job['shards'])
+    return job
+
+
+def load_job(job_dir):
+    """Read a job definition written by create_job()"""
+    with open(os.path.join(job_dir, "job.json")) as f:
+        return json.load(f)
+
+
+def run_backtest_shard(job, shard):
+    """
+    Run every ticker of a shard over the shard's slice of the parameter grid
+
+    Data and signals are prepared once per ticker and the parameter sets are
+    simulated together by simulate_batch().
+
+    Returns:
+        DataFrame with one row per ticker and parameter set
+    """
+    grid = make_param_grid(*(job['param_grid'][p] for p in RISK_PARAMS))
+    start, stop = shard['param_start'], shard['param_stop']
+    stop_loss, max_position, daily_limit = (values[start:stop] for values in grid)
+
+    tables = []
+    for ticker in shard['tickers']:
+        backtester = Backtester(ticker, job['start_date'], job['end_date'],
+                                initial_capital=job['initial_capital'], interval=job['interval'])
+        price_data = backtester.load_price_data()
+        if price_data.empty:
+            print(f"Error: No data available for {ticker}")
+            continue
+
+        bars = BarData.from_frame(price_data, dtype=backtester.price_dtype)
+        bars.signals = backtester.generate_signal_codes(bars)
+        result = simulate_batch(bars, stop_loss, max_position, daily_limit,
+                                initial_capital=job['initial_capital'],
+                                periods_per_year=backtester.periods_per_year)
+
+        table = pd.DataFrame(result)
+        table.insert(0, 'param_index', np.arange(start, stop))
+        table.insert(0, 'ticker', ticker)
+        tables.append(table)
+
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+def run_analyze_shard(job, shard, vix):
+    """
+    Score every ticker of a shard
+
+    Returns:
+        DataFrame with one row per ticker (individual scores as columns)
+    """
+    from analysis.analyzer import analyze_stock
+
+    rows = []
+    for ticker in shard['tickers']:
+        result = analyze_stock(ticker, vix=vix)
+        if result is None:
+            continue
+        row = {k: v for k, v in result.items() if k != 'scores'}
+        row.update(result['scores'])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def write_partial(path, table):
+    """
+    Write a shard's results as one NumPy array per column
+
+    The file is written under a temporary name and renamed into place, so
+    readers never see a half-written shard and a retry simply replaces it.
+    """
+    columns = {}
+    for name in table.columns:
+        values = table[name].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        columns[name] = values
+
+    tmp_path = f"{path}.{socket.gethostname()}-{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **columns)
+    os.replace(tmp_path, path)
+
+
+def read_partial(path, columns=None):
+    """
+    Read a partial result file
+
+    Args:
+        path: File written by write_partial()
+        columns: Optional list of columns to load (the others are not read)
+
+    Returns:
+        DataFrame
+    """
+    with np.load(path, allow_pickle=False) as data:
+        names = data.files if columns is None else [c for c in columns if c in data.files]
+        return pd.DataFrame({name: data[name] for name in names})
+
+
+@contextmanager
+def _keep_lease(queue, shard_id, worker, lease_seconds):
+    """Renew a shard's lease in the background while the shard runs"""
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(lease_seconds / 3):
+            if not queue.renew(shard_id, worker, lease_seconds):
+                return
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_worker(job_dir, worker_id=None, lease_seconds=300, max_shards=None, verbose=True):
+    """
+    Claim and run shards until the queue is empty
+
+    Start as many workers as you like, on one machine or several; they
+    coordinate only through the job directory.
+
+    Args:
+        job_dir: Directory created by create_job()
+        worker_id: Name recorded in the queue (default: host name and process id)
+        lease_seconds: Lease length; a crashed worker's shard is retried after this long
+        max_shards: Stop after this many shards
+        verbose: Print progress
+
+    Returns:
+        Dictionary with the worker id and the number of shards completed and failed
+    """
+    job = load_job(job_dir)
+    queue = ShardQueue(os.path.join(job_dir, "queue.sqlite"))
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    vix = None
+    completed = failed = 0
+
+    while max_shards is None or completed + failed < max_shards:
+        shard = queue.claim(worker_id, lease_seconds, job['max_attempts'])
+        if shard is None:
+            break
+        shard_id = shard['shard_id']
+        started = time.perf_counter()
+
+        try:
+            with _keep_lease(queue, shard_id, worker_id, lease_seconds):
+                if job['kind'] == 'backtest':
+                    table = run_backtest_shard(job, shard)
+                else:
+                    if vix is None:
+                        from indicators.technical import calculate_vix
+                        vix = calculate_vix()
+                    table = run_analyze_shard(job, shard, vix)
+                write_partial(os.path.join(job_dir, "parts", f"{shard_id}.npz"), table)
+        except Exception as e:
+            queue.fail(shard_id, worker_id, f"{type(e).__name__}: {e}", job['max_attempts'])
+            failed += 1
+            if verbose:
+                print(f"[{worker_id}] Shard {shard_id} failed: {e}")
+            continue
+
+        if queue.complete(shard_id, worker_id, len(table)):
+            completed += 1
+            if verbose:
+                print(f"[{worker_id}] Shard {shard_id}: {len(shard['tickers'])} tickers, "
+                      f"{len(table)} rows in {time.perf_counter() - started:.1f}s")
+        elif verbose:
+            print(f"[{worker_id}] Lost the lease on shard {shard_id}; another worker owns it now")
+
+    return {'worker': worker_id, 'completed': completed, 'failed': failed}
+
+
+def job_status(job_dir):
+    """
+    Summarize the progress of a job
+
+    Returns:
+        Dictionary with the shard counts per status and the failed shards' errors
+    """
+    queue = ShardQueue(os.path.join(job_dir, "queue.sqlite"))
+    failed = queue.shards('failed')
+    return {
+        'shards': queue.counts(),
+        'failed': dict(zip(failed['shard_id'], failed['error'])),
+    }
+
+
+def merge_results(job_dir, columns=None):
+    """
+    Combine the partial results of every finished shard
+
+    Args:
+        job_dir: Directory created by create_job()
+        columns: Optional list of columns to load
+
+    Returns:
+        DataFrame sorted by ticker (and parameter set for backtest jobs);
+        unfinished shards are left out
+    """
+    queue = ShardQueue(os.path.join(job_dir, "queue.sqlite"))
+    counts = queue.counts()
+    total = sum(counts.values())
+    if counts['done'] < total:
+        print(f"Warning: {total - counts['done']} of {total} shards are not finished; merging the rest")
+
+    done = queue.shards('done')['shard_id']
+    tables = [read_partial(os.path.join(job_dir, "parts", f"{shard_id}.npz"), columns) for shard_id in done]
+    tables = [t for t in tables if not t.empty]
+    if not tables:
+        return pd.DataFrame()
+
+    merged = pd.concat(tables, ignore_index=True)
+    sort_keys = [k for k in ('ticker', 'param_index') if k in merged.columns]
+    if sort_keys:
+        merged = merged.sort_values(sort_keys, kind='stable')
+    return merged.reset_index(drop=True)
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{socket.gethostname()}-{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
@@ -0,0 +1,200 @@
+"""
+Chunked (out-of-core) backtesting
+
+Backtester.run() loads the whole history into one DataFrame, which is fine
+for a few years of daily bars but not for years of 1-minute bars. run_chunked()
+streams bars from a BarStore in fixed-size blocks instead:
+
+- Indicators: each block is prefixed with the last warmup_bars() bars of the
+  previous block, so moving averages, RSI and volume ratios continue across
+  block boundaries as if computed on the full series.
+- Positions: Backtester.simulate_trades() keeps the open position, entry
+  price/date and circuit-breaker state on the instance, so each block carries
+  on where the previous one stopped.
+- Metrics: the equity curve is folded into RunningEquityStats after every
+  block and then discarded, and Sharpe/Sortino are annualized for the bar size.
+
+Peak memory therefore depends on chunk_size, not on the length of the history.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class RunningEquityStats:
+    """
+    Max drawdown, Sharpe and Sortino inputs accumulated block by block
+
+    Return mean and variance are merged per block with the parallel form of
+    Welford's algorithm, which stays numerically stable over millions of bars.
+    """
+
+    def __init__(self):
+        self.last_equity = None
+        self.peak = None
+        self.max_drawdown = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.down_count = 0
+        self.down_mean = 0.0
+        self.down_m2 = 0.0
+
+    @staticmethod
+    def _merge(count, mean, m2, values):
+        """Fold a batch of values into running (count, mean, M2)"""
+        if len(values) == 0:
+            return count, mean, m2
+        batch_count = len(values)
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        total = count + batch_count
+        delta = batch_mean - mean
+        mean = mean + delta * batch_count / total
+        m2 = m2 + batch_m2 + delta ** 2 * count * batch_count / total
+        return total, mean, m2
+
+    def update(self, equity_values):
+        """
+        Add the next block of equity values
+
+        Args:
+            equity_values: Equity at each bar of the block, in order
+        """
+        values = np.asarray(equity_values, dtype=float)
+        if len(values) == 0:
+            return
+
+        # Drawdown from the running peak (the first bar starts the peak)
+        if self.peak is None:
+            self.peak = values[0]
+        peaks = np.maximum.accumulate(np.concatenate(([self.peak], values)))[1:]
+        self.max_drawdown = max(self.max_drawdown, ((peaks - values) / peaks * 100).max())
+        self.peak = peaks[-1]
+
+        # Bar-to-bar returns, including the step across the block boundary
+        if self.last_equity is not None:
+            values = np.concatenate(([self.last_equity], values))
+        returns = values[1:] / values[:-1] - 1
+        self.last_equity = values[-1]
+
+        self.count, self.mean, self.m2 = self._merge(self.count, self.mean, self.m2, returns)
+        self.down_count, self.down_mean, self.down_m2 = self._merge(
+            self.down_count, self.down_mean, self.down_m2, returns[returns < 0]
+        )
+
+    def as_dict(self, periods_per_year=252, risk_free_rate=0.02):
+        """
+        Final statistics in the form Backtester.calculate_metrics() accepts
+
+        Args:
+            periods_per_year: Bars per year for annualizing
+            risk_free_rate: Annual risk-free rate
+
+        Returns:
+            Dictionary with max_drawdown, sharpe_ratio and sortino_ratio
+        """
+        risk_free_per_bar = risk_free_rate / periods_per_year
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0
+        down_std = np.sqrt(self.down_m2 / (self.down_count - 1)) if self.down_count > 1 else 0
+
+        sharpe_ratio = np.sqrt(periods_per_year) * (self.mean - risk_free_per_bar) / std if std > 0 else 0
+        sortino_ratio = np.sqrt(periods_per_year) * (self.mean - risk_free_per_bar) / down_std if down_std > 0 else 0
+
+        return {
+            'max_drawdown': self.max_drawdown,
+            'sharpe_ratio': sharpe_ratio,
+            'sortino_ratio': sortino_ratio,
+        }
+
+
+def generate_chunk_signals(backtester, chunk, warmup):
+    """
+    Compute indicators and signals for one block of bars
+
+    Args:
+        backtester: Backtester supplying the indicator periods
+        chunk: DataFrame with Close and Volume for the new bars
+        warmup: Trailing bars of the previous block (None for the first block)
+
+    Returns:
+        Tuple of (signals for the chunk's bars, warm-up bars for the next block)
+    """
+    bars = chunk if warmup is None or warmup.empty else pd.concat([warmup, chunk])
+    signals = backtester.generate_signals(bars[['Close', 'Volume']].copy())
+    next_warmup = bars[['Close', 'Volume']].iloc[-backtester.warmup_bars():]
+    return signals.iloc[len(bars) - len(chunk):], next_warmup
+
+
+def run_chunked(backtester, bar_store, chunk_size=100000, verbose=True, keep_equity_curve=False,
+                equity_sink=None):
+    """
+    Run a backtest over bars streamed from a BarStore
+
+    Args:
+        backtester: Backtester (its ticker, interval and date range select the bars)
+        bar_store: data.bar_store.BarStore holding the history
+        chunk_size: Bars per block; peak memory grows with this, not the history length
+        verbose: Print the trade log and results
+        keep_equity_curve: Also return the full equity curve (not memory-bounded)
+        equity_sink: Optional callable given each block's equity rows before they
+            are dropped (e.g. ResultDatasetWriter.equity_sink())
+
+    Returns:
+        Dictionary with results (same shape as Backtester.run())
+    """
+    if verbose:
+        print(f"\n{'='*70}")
+        print(f"BACKTESTING: {backtester.ticker} ({backtester.interval} bars, chunks of {chunk_size:,})")
+        print(f"Period: {backtester.start_date} to {backtester.end_date}")
+        print(f"Initial Capital: ${backtester.initial_capital:,.2f}")
+        print(f"{'='*70}\n")
+        print("Trade Log:")
+        print("-" * 70)
+
+    stats = RunningEquityStats()
+    equity_curve = []
+    warmup = None
+    last_date = None
+    last_price = None
+
+    chunks = bar_store.iter_chunks(backtester.ticker, backtester.interval, chunk_size,
+                                   start_date=backtester.start_date, end_date=backtester.end_date)
+    for chunk in chunks:
+        signals, warmup = generate_chunk_signals(backtester, chunk, warmup)
+        backtester.simulate_trades(signals, verbose=verbose, close_at_end=False)
+
+        # Fold this block's equity into the running statistics, then drop it
+        stats.update([e['equity'] for e in backtester.equity_curve])
+        if equity_sink is not None:
+            equity_sink(backtester.equity_curve)
+        if keep_equity_curve:
+            equity_curve.extend(backtester.equity_curve)
+        backtester.equity_curve = []
+
+        last_date = chunk.index[-1]
+        last_price = chunk['Close'].iloc[-1]
+
+    if last_date is None:
+        print(f"Error: No stored {backtester.interval} bars for {backtester.ticker}")
+        return None
+
+    backtester.close_position(last_date, last_price, verbose=verbose)
+    backtester.equity_curve = equity_curve
+
+    metrics = backtester.calculate_metrics(
+        equity_stats=stats.as_dict(backtester.periods_per_year)
+    )
+    if metrics is None:
+        print("\nNo trades were executed!")
+        return None
+
+    if verbose:
+        backtester.print_results(metrics)
+
+    return {
+        'ticker': backtester.ticker,
+        'metrics': metrics,
+        'trades': backtester.trades,
+        'equity_curve': equity_curve
+    }
@@ -0,0 +1,268 @@
+"""
+Universe-level backtest report
+
+create_performance_summary() writes four 300-dpi charts per ticker, which
+for a few hundred tickers means over a thousand files and minutes of
+matplotlib time. UniverseReport renders a whole universe into four figures,
+however many tickers it holds:
+
+    universe_equity.png     small multiples of equity curves (growth of $1)
+    universe_drawdown.png   the same panels for drawdowns
+    universe_metrics.png    heatmap of every ticker's metrics, as percentiles
+    universe_returns.png    distribution of total returns, of trade returns,
+                            and return against max drawdown
+
+Tickers are sorted by total return and split into a fixed grid of panels
+with shared axes. Each panel draws all of its curves as a single
+LineCollection, colored by total return, instead of one plot() call per
+ticker. Curves are thinned to MAX_POINTS_PER_CURVE points as results are
+added, so the report can collect results as they stream in without keeping
+full equity curves.
+
+Per-ticker charts (create_performance_summary) are only drawn for the
+tickers passed as drill_down.
+"""
+
+import os
+
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection
+
+from backtest.visualizations import create_performance_summary, equity_points
+
+# Points kept per equity curve (more than a small panel can show)
+MAX_POINTS_PER_CURVE = 500
+
+# Small-multiple grid (rows x columns) of the equity and drawdown figures
+PANEL_GRID = (3, 4)
+
+REPORT_DPI = 150
+
+# Metrics in the heatmap, and whether a higher value is better
+HEATMAP_METRICS = {
+    'total_return': True,
+    'cagr': True,
+    'sharpe_ratio': True,
+    'sortino_ratio': True,
+    'max_drawdown': False,
+    'win_rate': True,
+    'avg_profit': True,
+    'num_trades': True,
+}
+
+
+class UniverseReport:
+    def __init__(self, drill_down=None):
+        """
+        Collect backtest results for a universe report
+
+        Args:
+            drill_down: Tickers that also get the full per-ticker charts
+        """
+        self.drill_down = set(drill_down or ())
+        self.tickers = []
+        self.curves = []        # (date numbers, growth of $1, running peak) per ticker, thinned
+        self.metrics = []
+        self.trade_returns = []
+        self._drill_down_results = []
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def add(self, result):
+        """
+        Add one Backtester.run() result (the full result is not kept)
+
+        Args:
+            result: Dictionary with 'ticker', 'metrics', 'trades' and
+                optionally 'equity_curve' (results with an 'error' are skipped)
+        """
+        if result is None or 'error' in result:
+            return
+        ticker = result['ticker']
+        self.tickers.append(ticker)
+        self.metrics.append({k: v for k, v in result['metrics'].items() if not isinstance(v, dict)})
+
+        trades = result.get('trades')
+        if isinstance(trades, pd.DataFrame):
+            self.trade_returns.append(trades['profit_pct'].to_numpy(dtype=float))
+        else:
+            self.trade_returns.append(np.array([t['profit_pct'] for t in trades or ()], dtype=float))
+
+        curve = None
+        equity_curve = result.get('equity_curve')
+        if equity_curve is not None and len(equity_curve) > 1:
+            dates, values = equity_points(equity_curve)
+            values = np.asarray(values, dtype=float)
+            step = max(1, len(values) // MAX_POINTS_PER_CURVE)
+            keep = np.r_[np.arange(0, len(values) - 1, step), len(values) - 1]
+            # Only the kept dates are converted
+            dates = pd.DatetimeIndex([dates[k] for k in keep])
+            if dates.tz is not None:
+                dates = dates.tz_localize(None)
+            # Thinning skips points, so take each kept point's running peak from the full curve
+            peaks = np.maximum.accumulate(values)[keep]
+            curve = (mdates.date2num(dates), values[keep] / values[0], peaks / values[0])
+        self.curves.append(curve)
+
+        if ticker in self.drill_down:
+            # Copy so the caller can still drop the equity curve from its own dict
+            self._drill_down_results.append(dict(result))
+
+    def summary(self):
+        """
+        Returns:
+            DataFrame of the collected metrics, one row per ticker
+        """
+        return pd.DataFrame(self.metrics, index=pd.Index(self.tickers, name='ticker'))
+
+    def render(self, save_dir='charts', dpi=REPORT_DPI):
+        """
+        Write the report figures (and the drill-down charts)
+
+        Args:
+            save_dir: Directory for the PNG files
+            dpi: Resolution of the report figures
+
+        Returns:
+            List of the paths written
+        """
+        if not self.tickers:
+            print("No results to report")
+            return []
+        os.makedirs(save_dir, exist_ok=True)
+        summary = self.summary()
+        order = np.argsort(-summary['total_return'].to_numpy(), kind='stable')
+
+        paths = [
+            self._save(self._plot_panels(order, drawdown=False), save_dir, 'universe_equity.png', dpi),
+            self._save(self._plot_panels(order, drawdown=True), save_dir, 'universe_drawdown.png', dpi),
+            self._save(self._plot_heatmap(summary.iloc[order]), save_dir, 'universe_metrics.png', dpi),
+            self._save(self._plot_distributions(summary), save_dir, 'universe_returns.png', dpi),
+        ]
+        print(f"Universe report for {len(self.tickers)} tickers saved to {save_dir}/")
+
+        for result in self._drill_down_results:
+            create_performance_summary(result, save_dir=save_dir)
+        return paths
+
+    @staticmethod
+    def _save(fig, save_dir, name, dpi):
+        path = os.path.join(save_dir, name)
+        fig.savefig(path, dpi=dpi, bbox_inches='tight')
+        plt.close(fig)
+        return path
+
+    def _plot_panels(self, order, drawdown):
+        """Small multiples of the equity (or drawdown) curves, best total return first"""
+        rows, cols = PANEL_GRID
+        fig, axes = plt.subplots(rows, cols, figsize=(4 * cols, 2.6 * rows), sharex=True, sharey=True,
+                                 squeeze=False)
+        returns = np.array([m['total_return'] for m in self.metrics], dtype=float)
+        limit = max(1.0, np.nanmax(np.abs(returns)))
+        groups = np.array_split(order, min(rows * cols, len(order)))
+
+        for ax, group in zip(axes.flat, groups):
+            segments, colors = [], []
+            for i in group:
+                if self.curves[i] is None:
+                    continue
+                x, growth, peaks = self.curves[i]
+                y = (growth / peaks - 1) * 100 if drawdown else growth
+                segments.append(np.column_stack([x, y]))
+                colors.append(returns[i])
+            if segments:
+                lines = LineCollection(segments, cmap='RdYlGn', linewidths=0.8, alpha=0.8)
+                lines.set_array(np.array(colors))
+                lines.set_clim(-limit, limit)
+                ax.add_collection(lines)
+            ax.set_title(f"{self.tickers[group[0]]} .. {self.tickers[group[-1]]} ({len(group)})", fontsize=9)
+            ax.axhline(0 if drawdown else 1, color='gray', linewidth=0.6, linestyle='--')
+            ax.grid(True, alpha=0.3)
+
+        for ax in axes.flat[len(groups):]:
+            ax.set_visible(False)
+        for ax in axes.flat:
+            ax.autoscale_view()
+        axes[0, 0].xaxis_date()
+        fig.autofmt_xdate()
+
+        what = 'Drawdown (%)' if drawdown else 'Growth of $1'
+        fig.suptitle(f"{what} - {len(order)} tickers, best total return first", fontsize=14, fontweight='bold')
+        fig.tight_layout()
+        return fig
+
+    def _plot_heatmap(self, summary):
+        """Every ticker's metrics as percentiles within the universe (greener is better)"""
+        columns = [c for c in HEATMAP_METRICS if c in summary.columns]
+        percentiles = pd.DataFrame({
+            c: summary[c].rank(pct=True, ascending=HEATMAP_METRICS[c]) * 100 for c in columns
+        })
+
+        height = min(16, max(4, 0.18 * len(summary)))
+        fig, ax = plt.subplots(figsize=(1.2 * len(columns) + 3, height))
+        image = ax.imshow(percentiles.to_numpy(dtype=float), cmap='RdYlGn', aspect='auto', vmin=0, vmax=100,
+                          interpolation='nearest')
+        ax.set_xticks(range(len(columns)))
+        ax.set_xticklabels(columns, rotation=45, ha='right')
+        # Label at most ~60 rows so the names stay readable
+        step = max(1, -(-len(summary) // 60))
+        ax.set_yticks(range(0, len(summary), step))
+        ax.set_yticklabels(summary.index[::step], fontsize=7)
+        colorbar = fig.colorbar(image, ax=ax)
+        colorbar.set_label('Percentile in universe')
+        ax.set_title('Metric percentiles (best total return first)', fontsize=14, fontweight='bold')
+        fig.tight_layout()
+        return fig
+
+    def _plot_distributions(self, summary):
+        """Total returns, pooled trade returns, and return against drawdown"""
+        fig, (left, middle, right) = plt.subplots(1, 3, figsize=(18, 5))
+
+        returns = summary['total_return'].to_numpy(dtype=float)
+        left.hist(returns, bins=min(50, max(10, len(returns) // 5)), color='#2E86AB', edgecolor='black')
+        left.axvline(np.median(returns), color='red', linestyle='--', label=f"Median {np.median(returns):.1f}%")
+        left.set_title('Total return per ticker')
+        left.set_xlabel('Total return (%)')
+        left.legend()
+
+        trades = np.concatenate(self.trade_returns) if self.trade_returns else np.array([])
+        if len(trades):
+            middle.hist(trades, bins=60, color='#A23B72', edgecolor='black')
+            middle.axvline(0, color='black', linewidth=1)
+        middle.set_title(f'Trade returns ({len(trades):,} trades)')
+        middle.set_xlabel('Profit (%)')
+
+        drawdowns = summary['max_drawdown'].to_numpy(dtype=float)
+        points = right.scatter(drawdowns, returns, c=summary.get('sharpe_ratio'), cmap='RdYlGn', s=12)
+        fig.colorbar(points, ax=right, label='Sharpe ratio')
+        right.set_title('Return vs max drawdown')
+        right.set_xlabel('Max drawdown (%)')
+        right.set_ylabel('Total return (%)')
+
+        for ax in (left, middle, right):
+            ax.grid(True, alpha=0.3)
+        fig.tight_layout()
+        return fig
+
+
+def create_universe_report(results, save_dir='charts', drill_down=None, dpi=REPORT_DPI):
+    """
+    Render the universe report for a list of backtest results
+
+    Args:
+        results: Iterable of dictionaries returned by Backtester.run()
+        save_dir: Directory for the PNG files
+        drill_down: Tickers that also get the full per-ticker charts
+        dpi: Resolution of the report figures
+
+    Returns:
+        List of the paths written
+    """
+    report = UniverseReport(drill_down)
+    for result in results:
+        report.add(result)
+    return report.render(save_dir, dpi=dpi)
@@ -9,18 +9,24 @@ import numpy as np
 from datetime import datetime
 
 
+def equity_points(equity_curve):
+    """Dates and equity values from a list of dicts or a DataFrame with date and equity columns"""
+    if isinstance(equity_curve, pd.DataFrame):
+        return list(equity_curve['date']), equity_curve['equity'].tolist()
+    return [e['date'] for e in equity_curve], [e['equity'] for e in equity_curve]
+
+
 def plot_equity_curve(equity_curve, ticker, save_path=None):
     """
     Plot the equity curve over time
 
     Args:
-        equity_curve: List of dicts with 'date' and 'equity' keys
+        equity_curve: List of dicts with 'date' and 'equity' keys (or a DataFrame with those columns)
         ticker: Stock ticker symbol
         save_path: Optional path to save the figure
     """
     # Extract data
-    dates = [e['date'] for e in equity_curve]
-    equity_values = [e['equity'] for e in equity_curve]
+    dates, equity_values = equity_points(equity_curve)
 
     # Create figure
     plt.figure(figsize=(12, 6))
@@ -53,13 +59,12 @@ def plot_drawdown(equity_curve, ticker, save_path=None):
     Plot the drawdown over time
 
     Args:
-        equity_curve: List of dicts with 'date' and 'equity' keys
+        equity_curve: List of dicts with 'date' and 'equity' keys (or a DataFrame with those columns)
         ticker: Stock ticker symbol
         save_path: Optional path to save the figure
     """
     # Extract data
-    dates = [e['date'] for e in equity_curve]
-    equity_values = [e['equity'] for e in equity_curve]
+    dates, equity_values = equity_points(equity_curve)
 
     # Calculate drawdown
     peak = equity_values[0]
@@ -99,16 +104,19 @@ def plot_trade_distribution(trades, ticker, save_path=None):
     Plot the distribution of trade returns
 
     Args:
-        trades: List of trade dictionaries
+        trades: List of trade dictionaries (or a DataFrame with a profit_pct column)
         ticker: Stock ticker symbol
         save_path: Optional path to save the figure
     """
-    if not trades:
+    if trades is None or len(trades) == 0:
         print("No trades to plot")
         return
 
     # Extract profit percentages
-    profit_pcts = [t['profit_pct'] for t in trades]
+    if isinstance(trades, pd.DataFrame):
+        profit_pcts = trades['profit_pct'].tolist()
+    else:
+        profit_pcts = [t['profit_pct'] for t in trades]
 
     # Create figure with two subplots
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
@@ -150,7 +158,7 @@ def plot_monthly_returns(equity_curve, ticker, save_path=None):
     Plot monthly returns heatmap
 
     Args:
-        equity_curve: List of dicts with 'date' and 'equity' keys
+        equity_curve: List of dicts with 'date' and 'equity' keys (or a DataFrame with those columns)
         ticker: Stock ticker symbol
         save_path: Optional path to save the figure
     """
@@ -0,0 +1,351 @@
+"""
+Walk-forward optimization on top of Backtester
+
+A single backtest over one fixed window tends to overfit: the parameters
+that look best in hindsight say little about how they would have done on
+data they were not chosen on. Walk-forward analysis rolls a train window
+and the test window that follows it across the history:
+
+1. On each train slice, every parameter combination is backtested and the
+   best one (by the objective, e.g. Sharpe ratio) is picked.
+2. That combination is then run on the following, unseen test slice.
+3. The out-of-sample test equity curves are chained into one curve.
+
+Indicators and signals are computed once per indicator-period setting over
+the full history and then sliced per window, so a window never recomputes
+them (and indicators are already warmed up at the start of every slice).
+Windows are independent and run in parallel worker processes.
+"""
+
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from backtest.backtester import Backtester
+from backtest.metrics import calculate_returns, calculate_max_drawdown, calculate_cagr, calculate_sharpe_ratio
+from data.data_fetcher import fetch_stock_data
+from config import MA_SHORT_PERIOD, MA_LONG_PERIOD, RSI_PERIOD, VOLUME_PERIOD
+
+INDICATOR_PARAMS = ('ma_short_period', 'ma_long_period', 'rsi_period', 'volume_period')
+RISK_PARAMS = ('stop_loss_pct', 'max_position_pct', 'daily_loss_limit_pct')
+
+DEFAULT_PARAM_GRID = {
+    'stop_loss_pct': [0.05, 0.07, 0.10],
+    'max_position_pct': [0.5, 1.0],
+    'daily_loss_limit_pct': [0.10],
+    'ma_short_period': [MA_SHORT_PERIOD],
+    'ma_long_period': [MA_LONG_PERIOD],
+    'rsi_period': [RSI_PERIOD],
+    'volume_period': [VOLUME_PERIOD],
+}
+
+
+def expand_grid(param_grid):
+    """
+    Split a parameter grid into indicator settings and risk settings
+
+    Args:
+        param_grid: Dict of parameter name -> list of values. Missing
+            parameters fall back to DEFAULT_PARAM_GRID.
+
+    Returns:
+        Tuple of (indicator_settings, risk_settings), each a list of dicts.
+        Settings whose short MA is not shorter than the long MA are dropped.
+    """
+    grid = dict(DEFAULT_PARAM_GRID)
+    grid.update(param_grid or {})
+
+    unknown = set(grid) - set(INDICATOR_PARAMS) - set(RISK_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown parameters in grid: {', '.join(sorted(unknown))}")
+
+    indicator_settings = [
+        dict(zip(INDICATOR_PARAMS, values))
+        for values in itertools.product(*(grid[p] for p in INDICATOR_PARAMS))
+    ]
+    indicator_settings = [s for s in indicator_settings if s['ma_short_period'] < s['ma_long_period']]
+
+    risk_settings = [
+        dict(zip(RISK_PARAMS, values))
+        for values in itertools.product(*(grid[p] for p in RISK_PARAMS))
+    ]
+    return indicator_settings, risk_settings
+
+
+def build_signal_frames(ticker, price_data, indicator_settings):
+    """
+    Compute indicators and signals once per indicator setting
+
+    Args:
+        ticker: Stock symbol
+        price_data: Full price history (Close and Volume columns)
+        indicator_settings: List of indicator-period dicts
+
+    Returns:
+        Dict of setting key (tuple of periods) -> DataFrame with Close and Signal
+    """
+    frames = {}
+    for setting in indicator_settings:
+        key = tuple(setting[p] for p in INDICATOR_PARAMS)
+        backtester = Backtester(ticker, price_data.index[0], price_data.index[-1], **setting)
+        signals = backtester.generate_signals(price_data[['Close', 'Volume']].copy())
+        frames[key] = signals[['Close', 'Signal']]
+    return frames
+
+
+def index_timestamp(value, index):
+    """
+    Parse a date for searching a DatetimeIndex
+
+    Naive dates are taken to be in the index's time zone; tz-aware dates are
+    converted to it (or to naive UTC for a naive index).
+
+    Args:
+        value: Date string, datetime or Timestamp
+        index: DatetimeIndex to search
+
+    Returns:
+        Timestamp comparable with the index
+    """
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is None:
+        return timestamp.tz_localize(index.tz) if index.tz is not None else timestamp
+    if index.tz is None:
+        return timestamp.tz_convert('UTC').tz_localize(None)
+    return timestamp.tz_convert(index.tz)
+
+
+def make_windows(index, start_date, end_date, train_days, test_days):
+    """
+    Lay out rolling train/test windows over the backtest period
+
+    Args:
+        index: DatetimeIndex of the full price history
+        start_date, end_date: Backtest period
+        train_days: Bars in each train window
+        test_days: Bars in each test window (windows advance by this much)
+
+    Returns:
+        List of (train_start, test_start, test_end) integer positions into index;
+        the train slice is [train_start, test_start) and the test slice
+        [test_start, test_end)
+    """
+    first = index.searchsorted(index_timestamp(start_date, index))
+    last = index.searchsorted(index_timestamp(end_date, index), side='right')
+
+    windows = []
+    train_start = first
+    while train_start + train_days + test_days <= last:
+        test_start = train_start + train_days
+        windows.append((train_start, test_start, test_start + test_days))
+        train_start += test_days
+    return windows
+
+
+def evaluate_params(ticker, frame, params, initial_capital):
+    """
+    Backtest one parameter set on one pre-computed signal slice
+
+    Returns:
+        Tuple of (backtester, metrics); metrics is None when no trades ran
+    """
+    backtester = Backtester(ticker, frame.index[0], frame.index[-1],
+                            initial_capital=initial_capital, **params)
+    backtester.simulate_trades(frame, verbose=False)
+    return backtester, backtester.calculate_metrics()
+
+
+def _objective_value(metrics, objective):
+    """Score used to rank parameter sets (runs without trades rank last)"""
+    if metrics is None:
+        return -math.inf
+    value = metrics[objective]
+    return -math.inf if pd.isna(value) else value
+
+
+def _run_window(task):
+    """Optimize on one train slice and evaluate on its test slice (runs in a worker process)"""
+    best_value = -math.inf
+    best_params = None
+
+    for key, frame in task['train_frames'].items():
+        for risk in task['risk_settings']:
+            params = dict(zip(INDICATOR_PARAMS, key), **risk)
+            _, metrics = evaluate_params(task['ticker'], frame, params, task['initial_capital'])
+            value = _objective_value(metrics, task['objective'])
+            if best_params is None or value > best_value:
+                best_value, best_params = value, params
+
+    key = tuple(best_params[p] for p in INDICATOR_PARAMS)
+    backtester, test_metrics = evaluate_params(
+        task['ticker'], task['test_frames'][key], best_params, task['initial_capital']
+    )
+
+    return {
+        'train_start': task['train_start'],
+        'train_end': task['train_end'],
+        'test_start': task['test_start'],
+        'test_end': task['test_end'],
+        'best_params': best_params,
+        'train_score': best_value,
+        'test_metrics': test_metrics,
+        'final_value': backtester.cash,
+        'trades': backtester.trades,
+        'equity_curve': backtester.equity_curve,
+    }
+
+
+def stitch_windows(window_results, initial_capital):
+    """
+    Chain the out-of-sample test windows into one equity curve
+
+    Each window is simulated from initial_capital. Position sizing, stop-losses
+    and the circuit breaker all scale with capital, so a window that starts
+    with the previous window's ending equity is the same run scaled by
+    (previous ending equity / initial_capital).
+
+    Returns:
+        Tuple of (equity_curve, trades, final_value)
+    """
+    equity_curve = []
+    trades = []
+    capital = initial_capital
+
+    for window in window_results:
+        scale = capital / initial_capital
+        for point in window['equity_curve']:
+            equity_curve.append(dict(point, equity=point['equity'] * scale))
+        for trade in window['trades']:
+            trades.append(dict(trade, shares=trade['shares'] * scale, profit=trade['profit'] * scale))
+        capital = window['final_value'] * scale
+
+    return equity_curve, trades, capital
+
+
+def walk_forward(ticker, start_date, end_date, param_grid=None, train_days=504, test_days=126,
+                 initial_capital=10000, objective='sharpe_ratio', workers=None, price_data=None,
+                 verbose=True):
+    """
+    Run a walk-forward optimization
+
+    Args:
+        ticker: Stock symbol
+        start_date: First date of the first train window (e.g., "2016-01-01")
+        end_date: Last date any test window may reach
+        param_grid: Dict of parameter -> list of values (see DEFAULT_PARAM_GRID)
+        train_days: Bars per train window (default 504, about two years)
+        test_days: Bars per test window (default 126, about six months)
+        initial_capital: Starting investment
+        objective: Metric from calculate_metrics() to maximize on train slices
+        workers: Worker processes (default: CPU count; 1 runs in-process)
+        price_data: Optional pre-fetched price history (fetched if None)
+        verbose: Print a summary table
+
+    Returns:
+        Dictionary with per-window results, the stitched out-of-sample
+        equity curve and trades, and metrics for the stitched curve
+    """
+    if price_data is None:
+        price_data = fetch_stock_data(ticker, period="10y")
+    if price_data.empty:
+        print(f"Error: No data available for {ticker}")
+        return None
+
+    indicator_settings, risk_settings = expand_grid(param_grid)
+    windows = make_windows(price_data.index, start_date, end_date, train_days, test_days)
+    if not windows:
+        print(f"Error: {start_date} to {end_date} is too short for one {train_days}+{test_days} bar window")
+        return None
+
+    # Indicators are computed once per setting over the full history, then sliced per window
+    frames = build_signal_frames(ticker, price_data, indicator_settings)
+
+    tasks = []
+    for train_start, test_start, test_end in windows:
+        tasks.append({
+            'ticker': ticker,
+            'train_start': price_data.index[train_start],
+            'train_end': price_data.index[test_start - 1],
+            'test_start': price_data.index[test_start],
+            'test_end': price_data.index[test_end - 1],
+            'train_frames': {k: f.iloc[train_start:test_start] for k, f in frames.items()},
+            'test_frames': {k: f.iloc[test_start:test_end] for k, f in frames.items()},
+            'risk_settings': risk_settings,
+            'objective': objective,
+            'initial_capital': initial_capital,
+        })
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        window_results = [_run_window(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            window_results = list(executor.map(_run_window, tasks))
+
+    equity_curve, trades, final_value = stitch_windows(window_results, initial_capital)
+
+    total_profit, win_rate, num_trades = calculate_returns(trades)
+    years = (equity_curve[-1]['date'] - equity_curve[0]['date']).days / 365.25
+    daily_returns = pd.Series([e['equity'] for e in equity_curve]).pct_change().dropna()
+
+    metrics = {
+        'final_value': final_value,
+        'total_return': (final_value - initial_capital) / initial_capital * 100,
+        'cagr': calculate_cagr(initial_capital, final_value, years),
+        'num_trades': num_trades,
+        'win_rate': win_rate,
+        'max_drawdown': calculate_max_drawdown(equity_curve),
+        'sharpe_ratio': calculate_sharpe_ratio(daily_returns.tolist()),
+        'num_windows': len(window_results),
+    }
+
+    result = {
+        'ticker': ticker,
+        'objective': objective,
+        'windows': [{k: v for k, v in w.items() if k not in ('trades', 'equity_curve')}
+                    for w in window_results],
+        'metrics': metrics,
+        'trades': trades,
+        'equity_curve': equity_curve,
+    }
+
+    if verbose:
+        print_walk_forward_summary(result)
+
+    return result
+
+
+def print_walk_forward_summary(result):
+    """
+    Print one row per window plus the stitched out-of-sample metrics
+
+    Args:
+        result: Dictionary returned by walk_forward()
+    """
+    print("\n" + "="*90)
+    print(f"WALK-FORWARD ANALYSIS: {result['ticker']} (objective: {result['objective']})")
+    print("="*90)
+    print(f"{'Test Window':<25} {'Stop':<7} {'Size':<6} {'MAs':<10} {'Train':<9} {'Test Return':<12} {'Test Sharpe':<10}")
+    print("-"*90)
+
+    for window in result['windows']:
+        params = window['best_params']
+        test = window['test_metrics']
+        period = f"{window['test_start'].date()} - {window['test_end'].date()}"
+        mas = f"{params['ma_short_period']}/{params['ma_long_period']}"
+        test_return = f"{test['total_return']:.2f}%" if test else "no trades"
+        test_sharpe = f"{test['sharpe_ratio']:.3f}" if test else "-"
+        print(f"{period:<25} {params['stop_loss_pct']:<7.2f} {params['max_position_pct']:<6.2f} "
+              f"{mas:<10} {window['train_score']:<9.3f} {test_return:<12} {test_sharpe:<10}")
+
+    metrics = result['metrics']
+    print("-"*90)
+    print(f"Out-of-sample Return:    {metrics['total_return']:.2f}%")
+    print(f"Out-of-sample CAGR:      {metrics['cagr']:.2f}%")
+    print(f"Out-of-sample Sharpe:    {metrics['sharpe_ratio']:.3f}")
+    print(f"Max Drawdown:            {metrics['max_drawdown']:.2f}%")
+    print(f"Trades:                  {metrics['num_trades']} ({metrics['win_rate']:.2f}% winners)")
+    print("="*90 + "\n")
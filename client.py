@@ -0,0 +1,135 @@
+"""
+Thin command-line client for the analysis server
+
+Start the server once:
+    python main.py serve
+
+Then query it without paying for imports or cold downloads:
+    python client.py analyze AAPL MSFT
+    python client.py screen --file tickers.txt --min-recommendation strong_buy
+    python client.py backtest WMT --start 2020-01-01 --end 2024-01-01
+    python client.py stats
+
+Results are written to stdout as one JSON object per line, like main.py.
+Latency (server time and round trip) goes to stderr. Only the standard library
+is imported, so the client starts in milliseconds.
+"""
+
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from config import RECOMMENDATION_THRESHOLDS, SERVER_HOST, SERVER_PORT
+
+
+def read_tickers(args):
+    """Ticker symbols from the arguments, --file or stdin (same rules as main.py)"""
+    if args.tickers:
+        return [t.strip().upper() for t in args.tickers]
+
+    source = open(args.file) if args.file and args.file != "-" else sys.stdin
+    tickers = []
+    with source:
+        for line in source:
+            line = line.split("#", 1)[0]
+            tickers.extend(t.upper() for t in line.replace(",", " ").split())
+    return tickers
+
+
+def request(args, method, path, payload=None):
+    """
+    Send one request to the server
+
+    Returns:
+        Tuple of (decoded JSON response, round-trip seconds)
+    """
+    url = f"http://{args.host}:{args.port}{path}"
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=args.timeout) as response:
+            body = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        body = json.loads(e.read() or b"{}")
+    return body, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Client for the local analysis server (python main.py serve)")
+    parser.add_argument("--host", default=SERVER_HOST, help=f"Server host (default {SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"Server port (default {SERVER_PORT})")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for a response (default 600)")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("tickers", nargs="*", help="Ticker symbols (default: read from --file or stdin)")
+    common.add_argument("-f", "--file", help="File with ticker symbols ('-' for stdin)")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("analyze", parents=[common], help="Score each ticker")
+
+    screen = subparsers.add_parser("screen", parents=[common], help="Only tickers that reach a recommendation level")
+    screen.add_argument("--min-recommendation", default="buy", choices=list(RECOMMENDATION_THRESHOLDS))
+    screen.add_argument("--min-score", type=float)
+    screen.add_argument("--full", action="store_true")
+
+    backtest = subparsers.add_parser("backtest", parents=[common], help="Backtest each ticker")
+    backtest.add_argument("--start", default="2020-01-01")
+    backtest.add_argument("--end", default="2024-01-01")
+    backtest.add_argument("--capital", type=float, default=10000)
+    backtest.add_argument("--stop-loss", type=float, default=0.07)
+    backtest.add_argument("--max-position", type=float, default=1.0)
+    backtest.add_argument("--daily-loss-limit", type=float, default=0.10)
+    backtest.add_argument("--equity-curve", action="store_true")
+
+    subparsers.add_parser("stats", help="Per-endpoint latency and cache statistics")
+    subparsers.add_parser("health", help="Check that the server is up")
+
+    args = parser.parse_args(argv)
+
+    if args.command in ("stats", "health"):
+        method, payload = "GET", None
+    else:
+        method = "POST"
+        payload = {'tickers': read_tickers(args)}
+        if args.command == "screen":
+            payload.update(min_recommendation=args.min_recommendation, min_score=args.min_score, full=args.full)
+        elif args.command == "backtest":
+            payload.update(start=args.start, end=args.end, capital=args.capital, stop_loss=args.stop_loss,
+                           max_position=args.max_position, daily_loss_limit=args.daily_loss_limit,
+                           equity_curve=args.equity_curve)
+
+    try:
+        body, round_trip = request(args, method, f"/{args.command}", payload)
+    except urllib.error.URLError as e:
+        print(f"Error: cannot reach the server at {args.host}:{args.port} ({e.reason}). "
+              f"Start it with: python main.py serve", file=sys.stderr)
+        return 2
+
+    if 'error' in body:
+        print(f"Error: {body['error']}", file=sys.stderr)
+        return 1
+
+    if 'results' in body:
+        for result in body['results']:
+            sys.stdout.write(json.dumps(result) + "\n")
+        if 'screening' in body:
+            s = body['screening']
+            print(f"Screened {s['screened']} tickers, pruned {s['pruned']} "
+                  f"before fundamentals ({s['fetches_avoided']} fetches avoided)", file=sys.stderr)
+    else:
+        print(json.dumps(body, indent=2))
+
+    print(f"Server: {body.get('latency_ms', 0):.1f} ms, round trip: {round_trip * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        sys.exit(1)
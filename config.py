@@ -6,10 +6,87 @@ MA_LONG_PERIOD = 200
 RSI_PERIOD = 14
 VOLUME_PERIOD = 20
 
+# Indicator periods on higher timeframes (multi-timeframe confirmation).
+# 10/40 weeks and 3/10 months span roughly the same time as 50/200 days.
+HIGHER_TIMEFRAME_PERIODS = {
+    '1wk': {'ma_short_period': 10, 'ma_long_period': 40, 'rsi_period': 14, 'volume_period': 4},
+    '1mo': {'ma_short_period': 3, 'ma_long_period': 10, 'rsi_period': 14, 'volume_period': 3},
+}
+
+# Portfolio risk model (rotation backtests): bars in the rolling covariance
+# window and how far the covariance is shrunk toward constant correlation
+RISK_WINDOW = 63
+RISK_SHRINKAGE = 0.2
+
+# Parquet result export: rows buffered per file before a row group is written,
+# and rows buffered across all files before everything is flushed
+EXPORT_BATCH_ROWS = 65536
+EXPORT_MAX_BUFFERED_ROWS = 1000000
+
 # Data Fetching
 DEFAULT_PERIOD = "5y"
 VIX_TICKER = "^VIX"
 
+DEFAULT_INTERVAL = "1d"
+
+# Bars per year for each bar interval (used to annualize Sharpe and Sortino)
+# Regular US session: 252 trading days of 6.5 hours
+PERIODS_PER_YEAR = {
+    '1m': 252 * 390,
+    '2m': 252 * 195,
+    '5m': 252 * 78,
+    '15m': 252 * 26,
+    '30m': 252 * 13,
+    '60m': 252 * 7,     # yfinance returns 7 hourly bars per session
+    '90m': 252 * 5,
+    '1h': 252 * 7,
+    '1d': 252,
+    '5d': 52,
+    '1wk': 52,
+    '1mo': 12,
+    '3mo': 4,
+}
+
+# Longest history yfinance serves for intraday intervals
+MAX_INTRADAY_PERIOD = {
+    '1m': '7d',
+    '2m': '60d',
+    '5m': '60d',
+    '15m': '60d',
+    '30m': '60d',
+    '60m': '730d',
+    '90m': '60d',
+    '1h': '730d',
+}
+
+# On-disk cache: cached downloads older than this are refetched
+CACHE_MAX_AGE_HOURS = 12
+
+# Memory-mapped price panel (python main.py panel): fields stored, one dates x tickers array each
+PANEL_FIELDS = ['Close', 'Volume']
+
+# Local analysis server (python main.py serve / python client.py)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+
+# How long the server keeps downloads in memory (seconds)
+SERVER_CACHE_TTL = {
+    'prices': 15 * 60,
+    'fundamentals': 6 * 3600,
+    'quarterly': 6 * 3600,
+    'vix': 5 * 60,
+}
+
+# Stale-while-revalidate refresher: oldest data (seconds) still served while a
+# background refresh runs. Data younger than SERVER_CACHE_TTL is served as fresh.
+REFRESH_MAX_STALE = {
+    'prices': 24 * 3600,
+    'fundamentals': 7 * 24 * 3600,
+    'quarterly': 30 * 24 * 3600,
+    'vix': 3600,
+}
+REFRESH_WORKERS = 4
+
 # Scoring Thresholds - ADJUSTED FOR REALISM
 # These are more lenient to allow for actual trading opportunities
 SCORE_RANGES = {
@@ -41,6 +118,12 @@ SCORE_RANGES = {
     'vix': [20, 28, 35],
 }
 
+# Sector-relative scoring (python main.py sectors): percentile cutoffs within a
+# sector for 2, 3, 4 and 5 points, and the peers a sector needs before its
+# tickers are ranked within it (smaller sectors are ranked against the universe)
+RELATIVE_SCORE_PERCENTILES = [0.2, 0.4, 0.6, 0.8]
+RELATIVE_MIN_PEERS = 5
+
 # Recommendation Thresholds
 RECOMMENDATION_THRESHOLDS = {
     'strong_buy': 38,      # Down from 40
@@ -0,0 +1,160 @@
+"""
+On-disk bar storage for long intraday histories
+
+yfinance only serves a few days (1-minute) to a few months (5-minute) of
+intraday bars, and years of minute bars do not fit comfortably in memory.
+BarStore accumulates bars on disk, one file per ticker, interval and calendar
+month:
+
+    <root>/<interval>/<ticker>/<YYYY-MM>.pkl
+
+Calling update() regularly (e.g. nightly) appends the newest download, so the
+stored history keeps growing past what yfinance serves at once. iter_chunks()
+streams the bars back in fixed-size blocks. Only one month file and one chunk
+are in memory at a time, however long the history is.
+"""
+
+import os
+
+import pandas as pd
+
+from data.data_fetcher import fetch_stock_data
+from config import DEFAULT_INTERVAL, MAX_INTRADAY_PERIOD
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class BarStore:
+    def __init__(self, root):
+        """
+        Open (or create) a bar store
+
+        Args:
+            root: Directory holding the bar files
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, ticker, interval):
+        return os.path.join(self.root, interval, ticker.replace("/", "-"))
+
+    def partitions(self, ticker, interval=DEFAULT_INTERVAL):
+        """
+        List the stored month files for a ticker in chronological order
+
+        Returns:
+            List of file paths
+        """
+        directory = self._dir(ticker, interval)
+        if not os.path.isdir(directory):
+            return []
+        names = sorted(n for n in os.listdir(directory) if n.endswith(".pkl"))
+        return [os.path.join(directory, n) for n in names]
+
+    def append(self, ticker, interval, bars):
+        """
+        Merge new bars into the store
+
+        Bars that are already stored are replaced by the new values (yfinance
+        can revise the most recent bar), so appending overlapping downloads is safe.
+
+        Args:
+            ticker: Stock symbol
+            interval: Bar size ("1m", "5m", "1d", ...)
+            bars: DataFrame of OHLCV bars with a DatetimeIndex
+
+        Returns:
+            Number of bars that were not stored before
+        """
+        if bars.empty:
+            return 0
+
+        directory = self._dir(ticker, interval)
+        os.makedirs(directory, exist_ok=True)
+        bars = bars[[c for c in BAR_COLUMNS if c in bars.columns]]
+
+        added = 0
+        for month, month_bars in bars.groupby(bars.index.strftime("%Y-%m")):
+            path = os.path.join(directory, f"{month}.pkl")
+            if os.path.exists(path):
+                existing = pd.read_pickle(path)
+                added += len(month_bars.index.difference(existing.index))
+                combined = pd.concat([existing, month_bars])
+                combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+            else:
+                added += len(month_bars)
+                combined = month_bars.sort_index()
+
+            # Write to a temp file first so readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            combined.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+
+        return added
+
+    def update(self, ticker, interval=DEFAULT_INTERVAL, period=None):
+        """
+        Download the newest bars from yfinance and append them
+
+        Args:
+            ticker: Stock symbol
+            interval: Bar size
+            period: How far back to download (default: the most yfinance serves
+                for intraday intervals, "10y" for daily and longer bars)
+
+        Returns:
+            Number of new bars stored
+        """
+        if period is None:
+            period = MAX_INTRADAY_PERIOD.get(interval, "10y")
+        bars = fetch_stock_data(ticker, period=period, interval=interval)
+        return self.append(ticker, interval, bars)
+
+    def iter_chunks(self, ticker, interval=DEFAULT_INTERVAL, chunk_size=100000,
+                    start_date=None, end_date=None, columns=('Close', 'Volume')):
+        """
+        Stream stored bars in blocks of chunk_size rows
+
+        Args:
+            ticker: Stock symbol
+            interval: Bar size
+            chunk_size: Rows per block (the last block may be shorter)
+            start_date, end_date: Optional date range (inclusive)
+            columns: Columns to keep
+
+        Yields:
+            DataFrames of at most chunk_size consecutive bars
+        """
+        buffer = []
+        buffered = 0
+
+        for path in self.partitions(ticker, interval):
+            bars = pd.read_pickle(path)[list(columns)]
+            if start_date is not None or end_date is not None:
+                bars = bars.loc[start_date:end_date]
+
+            buffer.append(bars)
+            buffered += len(bars)
+
+            while buffered >= chunk_size:
+                block = pd.concat(buffer) if len(buffer) > 1 else buffer[0]
+                yield block.iloc[:chunk_size]
+                rest = block.iloc[chunk_size:]
+                buffer = [rest]
+                buffered = len(rest)
+
+        if buffered:
+            yield pd.concat(buffer) if len(buffer) > 1 else buffer[0]
+
+    def load(self, ticker, interval=DEFAULT_INTERVAL, start_date=None, end_date=None):
+        """
+        Load a stored history into one DataFrame (only for histories that fit in memory)
+
+        Returns:
+            DataFrame of OHLCV bars
+        """
+        frames = [pd.read_pickle(p) for p in self.partitions(ticker, interval)]
+        if not frames:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        bars = pd.concat(frames)
+        return bars.loc[start_date:end_date]
@@ -0,0 +1,182 @@
+"""
+Compact in-memory price bars for backtesting
+
+A yfinance history frame carries Open, High, Low, Dividends and Stock Splits
+columns the strategy never reads. Generating signals on it used to add four
+float64 indicator columns and an object column of 'BUY'/'HOLD'/'SELL' strings.
+BarData keeps only what the simulation needs, as contiguous NumPy arrays:
+
+- timestamps: int64 nanoseconds since the epoch (UTC) plus the time zone
+- close, volume: float64, or float32 to halve their size
+- signals: int8 codes (SELL = -1, HOLD = 0, BUY = 1)
+
+Indicator series are computed on the fly and are not stored alongside the bars.
+"""
+
+import numpy as np
+import pandas as pd
+
+SELL = -1
+HOLD = 0
+BUY = 1
+
+SIGNAL_CODES = {'SELL': SELL, 'HOLD': HOLD, 'BUY': BUY}
+
+# Signal names indexed by code + 1
+_SIGNAL_NAMES = np.array(['SELL', 'HOLD', 'BUY'], dtype=object)
+
+
+def encode_signals(signals):
+    """
+    Convert 'BUY'/'HOLD'/'SELL' strings into int8 codes
+
+    Args:
+        signals: Array or Series of signal strings
+
+    Returns:
+        int8 NumPy array of codes
+    """
+    signals = np.asarray(signals, dtype=object)
+    return np.select([signals == 'BUY', signals == 'SELL'], [BUY, SELL], HOLD).astype(np.int8)
+
+
+def decode_signals(codes):
+    """
+    Convert int8 signal codes back into 'BUY'/'HOLD'/'SELL' strings
+
+    Args:
+        codes: Array of signal codes
+
+    Returns:
+        Object array of signal strings
+    """
+    return _SIGNAL_NAMES[np.asarray(codes, dtype=np.intp) + 1]
+
+
+class BarData:
+    def __init__(self, timestamps, close, volume, tz=None, signals=None):
+        """
+        Build a bar container from raw arrays
+
+        Args:
+            timestamps: int64 nanoseconds since the epoch (UTC)
+            close: Closing prices
+            volume: Volumes (same length and dtype family as close)
+            tz: Time zone of the original index (None for naive timestamps)
+            signals: Optional int8 signal codes
+        """
+        self.timestamps = np.ascontiguousarray(timestamps, dtype=np.int64)
+        self.close = np.ascontiguousarray(close)
+        self.volume = np.ascontiguousarray(volume)
+        self.tz = tz
+        self.signals = None if signals is None else np.ascontiguousarray(signals, dtype=np.int8)
+        self._dates = None
+
+    @classmethod
+    def from_frame(cls, price_data, dtype=np.float64):
+        """
+        Project a price DataFrame onto the columns the backtest needs
+
+        Args:
+            price_data: DataFrame with a DatetimeIndex and Close/Volume columns
+                (a Signal column of strings is encoded if present)
+            dtype: Storage dtype for prices and volumes (np.float64 or np.float32)
+
+        Returns:
+            BarData
+        """
+        index = pd.DatetimeIndex(price_data.index)
+        signals = encode_signals(price_data['Signal']) if 'Signal' in price_data.columns else None
+        return cls(
+            index.as_unit('ns').asi8,
+            price_data['Close'].to_numpy(dtype=dtype),
+            price_data['Volume'].to_numpy(dtype=dtype),
+            tz=index.tz,
+            signals=signals,
+        )
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def index(self):
+        """DatetimeIndex of the bars (built on first use)"""
+        if self._dates is None:
+            dates = pd.DatetimeIndex(self.timestamps.view('datetime64[ns]'))
+            self._dates = dates.tz_localize('UTC').tz_convert(self.tz) if self.tz is not None else dates
+        return self._dates
+
+    def set_bar(self, dates, close, volume, signal):
+        """
+        Overwrite a one-bar container with the next bar, reusing its arrays
+
+        Args:
+            dates: DatetimeIndex holding the bar's timestamp (may be shared by several containers)
+            close, volume: The bar's values
+            signal: The bar's signal code
+        """
+        self.timestamps[0] = dates.asi8[0]
+        self.close[0] = close
+        self.volume[0] = volume
+        self.signals[0] = signal
+        self.tz = dates.tz
+        self._dates = dates
+
+    def close_series(self):
+        """Closing prices as a float64 Series (zero-copy for float64 storage)"""
+        return pd.Series(self.close, index=self.index, copy=False).astype(np.float64, copy=False)
+
+    def volume_series(self):
+        """Volumes as a float64 Series (zero-copy for float64 storage)"""
+        return pd.Series(self.volume, index=self.index, copy=False).astype(np.float64, copy=False)
+
+    def slice(self, start_date=None, end_date=None):
+        """
+        Bars between two dates (inclusive) as a zero-copy view
+
+        Returns:
+            BarData sharing memory with this one
+        """
+        start = 0 if start_date is None else self.index.searchsorted(_as_timestamp(start_date, self.tz))
+        end = len(self) if end_date is None else self.index.searchsorted(_as_end_timestamp(end_date, self.tz), side='right')
+        signals = None if self.signals is None else self.signals[start:end]
+        return BarData(self.timestamps[start:end], self.close[start:end], self.volume[start:end],
+                       tz=self.tz, signals=signals)
+
+    @property
+    def nbytes(self):
+        """Memory held by the bar arrays"""
+        total = self.timestamps.nbytes + self.close.nbytes + self.volume.nbytes
+        if self.signals is not None:
+            total += self.signals.nbytes
+        return total
+
+    def to_frame(self):
+        """
+        Expand back into a DataFrame with Close, Volume and (if set) Signal columns
+        """
+        frame = pd.DataFrame({'Close': self.close, 'Volume': self.volume}, index=self.index)
+        if self.signals is not None:
+            frame['Signal'] = decode_signals(self.signals)
+        return frame
+
+
+def _as_timestamp(value, tz):
+    """Parse a date for comparison with an index in time zone tz"""
+    timestamp = pd.Timestamp(value)
+    if tz is not None and timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize(tz)
+    return timestamp
+
+
+def _as_end_timestamp(value, tz):
+    """Like _as_timestamp, but a bare date covers the whole day (as pandas .loc does)"""
+    timestamp = _as_timestamp(value, tz)
+    if isinstance(value, str) and len(value) <= 10:
+        timestamp = timestamp + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return timestamp
+
+
+def frame_nbytes(price_data):
+    """Memory held by a DataFrame including its index and Python string objects"""
+    return int(price_data.memory_usage(index=True, deep=True).sum())
@@ -1,25 +1,244 @@
+import os
+import time
+import pickle
+import threading
 import yfinance as yf
 import pandas as pd
+from config import CACHE_MAX_AGE_HOURS, DEFAULT_INTERVAL, MAX_INTRADAY_PERIOD
 
-def fetch_stock_data(ticker, period="5y"):
+# Directory for the on-disk data cache (None disables caching)
+_cache_dir = None
+
+# In-memory TTLCache shared by long-running processes (None disables it)
+_memory_cache = None
+
+# Stale-while-revalidate refresher (takes the place of the memory cache when set)
+_refresher = None
+
+# Memory-mapped price panel served before any download (None disables it)
+_panel = None
+
+
+def set_cache_dir(path):
+    """
+    Enable (or disable) the on-disk cache used by the fetch functions
+
+    Args:
+        path: Directory to store cached downloads in, or None to disable
+    """
+    global _cache_dir
+    if path:
+        os.makedirs(path, exist_ok=True)
+    _cache_dir = path
+
+
+def get_cache_dir():
+    """Return the active cache directory (None when caching is disabled)"""
+    return _cache_dir
+
+
+def set_memory_cache(cache):
+    """
+    Keep downloads in memory (on top of the on-disk cache)
+
+    Args:
+        cache: data.memory_cache.TTLCache, or None to disable
+    """
+    global _memory_cache
+    _memory_cache = cache
+
+
+def get_memory_cache():
+    """Return the active in-memory cache (None when disabled)"""
+    return _memory_cache
+
+
+def set_refresher(refresher):
+    """
+    Serve downloads stale-while-revalidate
+
+    Args:
+        refresher: data.refresher.BackgroundRefresher, or None to disable
+    """
+    global _refresher
+    _refresher = refresher
+
+
+def get_refresher():
+    """Return the active refresher (None when disabled)"""
+    return _refresher
+
+
+def set_panel(panel):
+    """
+    Serve price histories from a memory-mapped panel
+
+    Tickers and intervals the panel does not hold are still downloaded.
+
+    Args:
+        panel: data.panel_store.PricePanel, a panel directory, or None to disable
+    """
+    global _panel
+    if isinstance(panel, str):
+        from data.panel_store import PricePanel
+        panel = PricePanel(panel)
+    _panel = panel
+
+
+def get_panel():
+    """Return the active price panel (None when disabled)"""
+    return _panel
+
+
+def _from_panel(ticker, period, interval):
+    """Bars from the active panel, or None when it cannot serve the request"""
+    if _panel is None or interval != _panel.interval or ticker not in _panel:
+        return None
+    history = _panel.frame(ticker)
+    days = _period_days(period)
+    if len(history) and days != float("inf"):
+        # Count the period back from the panel's last bar, as if fetched when it was built
+        return history.loc[history.index[-1] - pd.Timedelta(days=days):]
+    return history
+
+
+def _remember(key, download, keep, refresh=None, peek=None):
+    """
+    Serve a download from the refresher or the in-memory cache when one is active
+
+    Callers receive a copy, so modifying the result never changes the cached value.
+
+    Args:
+        key: Cache key (kind, ticker, ...)
+        download: Function() -> value
+        keep: Function(value) -> bool; False for failed downloads
+        refresh: Function() -> value that skips the on-disk cache (for background refreshes)
+        peek: Function() -> (age_seconds, value) or None from the on-disk cache
+    """
+    if _refresher is not None:
+        value = _refresher.get(key, download, keep=keep, refresh=refresh, peek=peek)
+    elif _memory_cache is not None:
+        value = _memory_cache.get_or_compute(key, download, keep=keep)
+    else:
+        return download()
+    if isinstance(value, tuple):
+        return tuple(v.copy() for v in value)
+    return value.copy()
+
+
+def _cache_path(kind, ticker, *parts):
+    """Build the cache file path for one download"""
+    name = "_".join([kind, ticker] + [str(p) for p in parts])
+    name = name.replace("/", "-").replace("\\", "-")
+    return os.path.join(_cache_dir, f"{name}.pkl")
+
+
+def _read_cache(path, max_age_hours=CACHE_MAX_AGE_HOURS):
+    """Load a cached object, or None if it is missing or older than max_age_hours"""
+    if _cache_dir is None or not os.path.exists(path):
+        return None
+    if time.time() - os.path.getmtime(path) > max_age_hours * 3600:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _peek_cache(path):
+    """Load a cached object whatever its age; returns (age_seconds, object) or None"""
+    if _cache_dir is None:
+        return None
+    try:
+        age = time.time() - os.path.getmtime(path)
+        with open(path, "rb") as f:
+            return age, pickle.load(f)
+    except Exception:
+        return None
+
+
+def _peeker(kind, ticker, *parts):
+    """peek function for _remember() reading one download's cache file"""
+    return lambda: _peek_cache(_cache_path(kind, ticker, *parts)) if _cache_dir is not None else None
+
+
+def _write_cache(path, obj):
+    """Store an object in the cache (no-op when caching is disabled)"""
+    if _cache_dir is None:
+        return
+    # Write to a temp file first so concurrent readers never see partial files
+    # (one per thread: a thread pool may download the same ticker twice at once)
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def _period_days(period):
+    """Approximate length in days of a yfinance period string ("7d", "6mo", "5y", "max")"""
+    if period == "max":
+        return float("inf")
+    if period == "ytd":
+        return 366
+    for suffix, days in (("mo", 31), ("d", 1), ("wk", 7), ("y", 366)):
+        if period.endswith(suffix):
+            return int(period[:-len(suffix)]) * days
+    raise ValueError(f"Unrecognized period '{period}'")
+
+
+def fetch_stock_data(ticker, period="5y", interval=DEFAULT_INTERVAL):
     """
     Fetch historical price data from yfinance
     
     Args:
         ticker: Stock symbol (e.g., "AAPL")
         period: How far back ("1y", "5y", etc.)
+        interval: Bar size ("1d", "1h", "5m", "1m", ...). yfinance only serves
+            limited intraday history (see MAX_INTRADAY_PERIOD in config.py);
+            use data.bar_store.BarStore to accumulate longer intraday histories.
     
     Returns:
-        DataFrame with OHLCV data
+        DataFrame with OHLCV data (only the panel's fields, as zero-copy
+        views, when set_panel() is active and holds the ticker)
     """
+    if interval in MAX_INTRADAY_PERIOD:
+        # Requests beyond the intraday limit fail; fetch what is available instead
+        limit = MAX_INTRADAY_PERIOD[interval]
+        if _period_days(period) > _period_days(limit):
+            period = limit
+
+    # Panel slices are read-only views shared by every process, so they skip the in-memory caches
+    history = _from_panel(ticker, period, interval)
+    if history is not None:
+        return history
+
+    return _remember(("prices", ticker, period, interval),
+                     lambda: _download_stock_data(ticker, period, interval),
+                     keep=lambda hist: not hist.empty,
+                     refresh=lambda: _download_stock_data(ticker, period, interval, use_cache=False),
+                     peek=_peeker("prices", ticker, period, interval))
+
+
+def _download_stock_data(ticker, period, interval, use_cache=True):
+    """Download price history (through the on-disk cache when enabled)"""
+    path = _cache_path("prices", ticker, period, interval) if _cache_dir is not None else None
+    if use_cache and path is not None:
+        cached = _read_cache(path)
+        if cached is not None:
+            return cached
+
     try:
         stock = yf.Ticker(ticker)
-        hist = stock.history(period=period)
-        return hist
+        hist = stock.history(period=period, interval=interval)
     except Exception as e:
         print(f"Error fetching data for {ticker}: {e}")
         return pd.DataFrame()
 
+    if path is not None and not hist.empty:
+        _write_cache(path, hist)
+    return hist
+
 
 def fetch_fundamentals(ticker):
     """
@@ -31,12 +250,26 @@ def fetch_fundamentals(ticker):
     Returns:
         Dictionary with key financial metrics
     """
+    return _remember(("fundamentals", ticker), lambda: _download_fundamentals(ticker), keep=bool,
+                     refresh=lambda: _download_fundamentals(ticker, use_cache=False),
+                     peek=_peeker("fundamentals", ticker))
+
+
+def _download_fundamentals(ticker, use_cache=True):
+    """Download fundamentals (through the on-disk cache when enabled)"""
+    path = _cache_path("fundamentals", ticker) if _cache_dir is not None else None
+    if use_cache and path is not None:
+        cached = _read_cache(path)
+        if cached is not None:
+            return cached
+
     try:
         stock = yf.Ticker(ticker)
         info = stock.info
         
         fundamentals = {
             'ticker': ticker,
+            'sector': info.get('sector'),
             'current_price': info.get('currentPrice', 0),
             'pe_ratio': info.get('trailingPE', 0),
             'peg_ratio': info.get('pegRatio', 0),
@@ -47,12 +280,14 @@ def fetch_fundamentals(ticker):
             'debt_to_equity': info.get('debtToEquity', 0),
             'current_ratio': info.get('currentRatio', 0),
         }
-        
-        return fundamentals
     except Exception as e:
         print(f"Error fetching fundamentals for {ticker}: {e}")
         return {}
 
+    if path is not None:
+        _write_cache(path, fundamentals)
+    return fundamentals
+
 
 def fetch_quarterly_financials(ticker):
     """
@@ -64,12 +299,28 @@ def fetch_quarterly_financials(ticker):
     Returns:
         Tuple of (quarterly_financials, cash_flow)
     """
+    return _remember(("quarterly", ticker), lambda: _download_quarterly_financials(ticker),
+                     keep=lambda data: not data[0].empty,
+                     refresh=lambda: _download_quarterly_financials(ticker, use_cache=False),
+                     peek=_peeker("quarterly", ticker))
+
+
+def _download_quarterly_financials(ticker, use_cache=True):
+    """Download quarterly statements (through the on-disk cache when enabled)"""
+    path = _cache_path("quarterly", ticker) if _cache_dir is not None else None
+    if use_cache and path is not None:
+        cached = _read_cache(path)
+        if cached is not None:
+            return cached
+
     try:
         stock = yf.Ticker(ticker)
         quarterly_financials = stock.quarterly_financials
         quarterly_cashflow = stock.quarterly_cashflow
-        
-        return quarterly_financials, quarterly_cashflow
     except Exception as e:
         print(f"Error fetching quarterly data for {ticker}: {e}")
-        return pd.DataFrame(), pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame(), pd.DataFrame()
+
+    if path is not None and not quarterly_financials.empty:
+        _write_cache(path, (quarterly_financials, quarterly_cashflow))
+    return quarterly_financials, quarterly_cashflow
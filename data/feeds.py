@@ -0,0 +1,160 @@
+"""
+Bar feeds for the paper-trading service
+
+A feed is an async iterator of ticks. Each tick is a tuple
+
+    (timestamp, {symbol: (close, volume), ...})
+
+holding the bars of every watchlist symbol that closed at that timestamp.
+
+- ReplayFeed replays stored history (DataFrames, a BarStore or local
+  .csv/.pkl files) in timestamp order, optionally paced on the wall clock.
+  Replays are deterministic, which makes them the feed to test against.
+- YFinanceFeed polls yfinance for the newest intraday bars of the watchlist
+  (optional live source; yfinance data is delayed and rate limited).
+"""
+
+import asyncio
+import os
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from config import DEFAULT_INTERVAL
+
+
+class ReplayFeed:
+    def __init__(self, frames, delay=0.0):
+        """
+        Replay price histories as a bar feed
+
+        Args:
+            frames: Dictionary of symbol -> DataFrame with Close and Volume columns
+            delay: Seconds between ticks on the wall clock (0 replays as fast as the
+                consumer keeps up). Ticks are due at fixed times like a live feed's, so
+                ticks that came due while the consumer was busy are emitted at once.
+        """
+        self.frames = {symbol: frame for symbol, frame in frames.items() if not frame.empty}
+        self.delay = delay
+
+    @classmethod
+    def from_bar_store(cls, bar_store, tickers, interval=DEFAULT_INTERVAL, start_date=None,
+                       end_date=None, delay=0.0):
+        """
+        Replay bars saved in a data.bar_store.BarStore
+
+        Returns:
+            ReplayFeed
+        """
+        frames = {t: bar_store.load(t, interval, start_date, end_date) for t in tickers}
+        return cls(frames, delay)
+
+    @classmethod
+    def from_files(cls, paths, delay=0.0):
+        """
+        Replay local .csv or .pkl files, one per symbol (named after the file)
+
+        CSV files need a date/time index in the first column.
+
+        Returns:
+            ReplayFeed
+        """
+        frames = {}
+        for path in paths:
+            symbol, extension = os.path.splitext(os.path.basename(path))
+            if extension == ".csv":
+                frame = pd.read_csv(path, index_col=0)
+                frame.index = pd.to_datetime(frame.index, utc=True)
+            else:
+                frame = pd.read_pickle(path)
+            frames[symbol.upper()] = frame
+        return cls(frames, delay)
+
+    def __len__(self):
+        """Number of ticks in the replay"""
+        return len(self._timeline())
+
+    def _timeline(self):
+        index = None
+        for frame in self.frames.values():
+            index = frame.index if index is None else index.union(frame.index)
+        return index if index is not None else pd.DatetimeIndex([])
+
+    async def __aiter__(self):
+        timeline = self._timeline()
+
+        # Align every symbol on the shared timeline once, as plain arrays
+        closes = {}
+        volumes = {}
+        for symbol, frame in self.frames.items():
+            aligned = frame[['Close', 'Volume']].reindex(timeline)
+            closes[symbol] = aligned['Close'].to_numpy(dtype=np.float64)
+            volumes[symbol] = aligned['Volume'].to_numpy(dtype=np.float64)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for i, timestamp in enumerate(timeline):
+            if self.delay > 0:
+                # Wait for the tick's due time; a consumer that fell behind finds the
+                # overdue ticks waiting in its queue, as it would on a live feed
+                wait = start + i * self.delay - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            else:
+                # Always give the event loop a chance to run other tasks
+                await asyncio.sleep(0)
+            bars = {
+                symbol: (closes[symbol][i], volumes[symbol][i])
+                for symbol in closes if not np.isnan(closes[symbol][i])
+            }
+            yield timestamp, bars
+
+
+class YFinanceFeed:
+    def __init__(self, tickers, interval="1m", poll_seconds=60):
+        """
+        Poll yfinance for newly closed intraday bars
+
+        Args:
+            tickers: Watchlist symbols
+            interval: Bar size ("1m", "5m", ...)
+            poll_seconds: Seconds between polls
+        """
+        self.tickers = list(tickers)
+        self.interval = interval
+        self.poll_seconds = poll_seconds
+        self.last_timestamp = None
+
+    def _download(self):
+        try:
+            data = yf.download(self.tickers, period="1d", interval=self.interval,
+                               group_by="ticker", progress=False, threads=True)
+        except Exception as e:
+            print(f"Error polling yfinance: {e}")
+            return pd.DataFrame()
+        return data
+
+    async def __aiter__(self):
+        while True:
+            # yfinance is blocking; keep the event loop responsive while it downloads
+            data = await asyncio.to_thread(self._download)
+
+            if not data.empty:
+                # The last row is the bar that is still forming
+                timestamps = data.index[:-1]
+                if self.last_timestamp is not None:
+                    timestamps = timestamps[timestamps > self.last_timestamp]
+
+                for timestamp in timestamps:
+                    bars = {}
+                    for ticker in self.tickers:
+                        if ticker not in data.columns.get_level_values(0):
+                            continue
+                        close = data[ticker]['Close'].loc[timestamp]
+                        if not np.isnan(close):
+                            bars[ticker] = (float(close), float(data[ticker]['Volume'].loc[timestamp]))
+                    self.last_timestamp = timestamp
+                    yield timestamp, bars
+
+            await asyncio.sleep(self.poll_seconds)
@@ -0,0 +1,141 @@
+"""
+In-memory cache with time-to-live eviction
+
+Used by long-running processes (see server/analysis_server.py) to keep price
+histories, fundamentals and the VIX in memory between requests. Entries
+expire after ttl_seconds, and the least recently used entries are dropped once
+max_entries is reached.
+
+get_or_compute() is single-flight: when several threads ask for the same
+missing key at once, one of them downloads it and the others wait for that
+result instead of downloading it again.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, ttl_seconds=900, max_entries=10000, kind_ttls=None):
+        """
+        Create an empty cache
+
+        Args:
+            ttl_seconds: Seconds an entry stays valid
+            max_entries: Entries kept before the least recently used are evicted
+            kind_ttls: Optional dict of per-kind lifetimes for tuple keys whose first
+                item names the kind, e.g. {'fundamentals': 6 * 3600, 'vix': 300}
+        """
+        self.ttl_seconds = ttl_seconds
+        self.kind_ttls = kind_ttls or {}
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._pending = {}             # key -> Event for computations in progress
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key, now):
+        """Return (True, value) for a live entry; caller holds the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < now:
+            del self._entries[key]
+            self.evictions += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def get(self, key):
+        """
+        Look up a key
+
+        Returns:
+            Tuple of (found, value)
+        """
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found, value
+
+    def put(self, key, value, ttl_seconds=None):
+        """Store a value (optionally with its own time-to-live)"""
+        if ttl_seconds is not None:
+            ttl = ttl_seconds
+        elif isinstance(key, tuple) and key and key[0] in self.kind_ttls:
+            ttl = self.kind_ttls[key[0]]
+        else:
+            ttl = self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, keep=None, ttl_seconds=None):
+        """
+        Return the cached value for key, computing (and caching) it if missing
+
+        Args:
+            key: Hashable cache key
+            compute: Function() -> value, called at most once per key at a time
+            keep: Optional function(value) -> bool; values it rejects (e.g. failed
+                downloads) are returned but not cached
+            ttl_seconds: Optional time-to-live for this entry
+
+        Returns:
+            The cached or computed value
+        """
+        while True:
+            with self._lock:
+                found, value = self._lookup(key, time.monotonic())
+                if found:
+                    self.hits += 1
+                    return value
+                event = self._pending.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = self._pending[key] = threading.Event()
+                    break
+            # Another thread is computing this key; wait and look again
+            event.wait()
+
+        try:
+            value = compute()
+            if keep is None or keep(value):
+                self.put(key, value, ttl_seconds)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Cache counters
+
+        Returns:
+            Dictionary with entries, hits, misses, evictions and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
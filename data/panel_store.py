@@ -0,0 +1,278 @@
+"""
+Memory-mapped price panels
+
+Every process that fetches prices unpickles its own DataFrames, so eight
+worker processes hold eight copies of the same history. A panel stores a
+universe once, as one dates x tickers array per field, in a directory:
+
+    <root>/meta.json      tickers, interval, timezone, fields and, per
+                          ticker, its first and last row and whether it has
+                          gaps inside that range
+    <root>/dates.npy      the shared calendar (int64 nanoseconds, UTC)
+    <root>/<field>.npy    float64 array per field (Close, Volume, ...), NaN
+                          where a ticker has no bar
+
+The field arrays are in column-major (Fortran) order, so each ticker's
+history is one contiguous run of the file. PricePanel opens them with
+np.load(mmap_mode='r'): opening reads only the metadata and the calendar, and
+pages of the arrays are loaded when they are first touched. All processes
+that open the same panel share those pages through the OS page cache.
+
+PricePanel.frame() returns a ticker's bars as a DataFrame whose columns are
+views of the mapped arrays (no copy), in the same layout fetch_stock_data()
+returns, so Backtester, the indicator functions and the screening code use it
+unchanged. Tickers with missing bars inside their history are the exception:
+those rows are dropped, which copies. Panels are read-only; pandas copies a
+column before anything writes to it.
+
+Build a panel with build_panel() (or python main.py panel) and turn it on
+for fetch_stock_data() with data.data_fetcher.set_panel().
+"""
+
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_INTERVAL, PANEL_FIELDS
+
+# Bump when the file layout changes
+PANEL_VERSION = 1
+
+
+def _field_file(field):
+    return f"{field.lower()}.npy"
+
+
+def write_panel(root, frames, interval=DEFAULT_INTERVAL, fields=PANEL_FIELDS):
+    """
+    Write price histories to a panel directory (replacing any panel there)
+
+    Args:
+        root: Panel directory
+        frames: Dictionary of ticker -> DataFrame of bars (as fetch_stock_data returns)
+        interval: Bar size of the histories
+        fields: Columns to store
+
+    Returns:
+        Dictionary with the ticker, row and field counts
+    """
+    frames = {ticker: frame for ticker, frame in frames.items() if frame is not None and not frame.empty}
+    if not frames:
+        raise ValueError("No price data to write")
+    fields = list(fields)
+    tickers = sorted(frames)
+
+    indexes = [frames[ticker].index for ticker in tickers]
+    tz = next((str(index.tz) for index in indexes if index.tz is not None), None)
+    calendar = indexes[0]
+    for index in indexes[1:]:
+        calendar = calendar.union(index)
+    if calendar.tz is not None:
+        calendar = calendar.tz_convert('UTC').tz_localize(None)
+    calendar = calendar.sort_values()
+
+    # Build next to the final directory and swap it in, so readers never see a partial panel
+    root = os.path.abspath(root)
+    tmp_root = f"{root}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    os.makedirs(tmp_root)
+    np.save(os.path.join(tmp_root, "dates.npy"), calendar.as_unit("ns").asi8)
+
+    arrays = {
+        field: np.lib.format.open_memmap(os.path.join(tmp_root, _field_file(field)), mode='w+',
+                                         dtype=np.float64, shape=(len(calendar), len(tickers)), fortran_order=True)
+        for field in fields
+    }
+    spans = {}
+    for column, ticker in enumerate(tickers):
+        frame = frames[ticker]
+        index = frame.index
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        rows = calendar.get_indexer(index)
+        for field in fields:
+            values = np.full(len(calendar), np.nan)
+            if field in frame.columns:
+                values[rows] = frame[field].to_numpy(dtype=np.float64)
+            arrays[field][:, column] = values
+        first, last = int(rows.min()), int(rows.max())
+        spans[ticker] = {'first': first, 'last': last, 'gaps': bool(last - first + 1 != len(rows))}
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    meta = {
+        'version': PANEL_VERSION,
+        'interval': interval,
+        'tz': tz,
+        'fields': fields,
+        'tickers': tickers,
+        'spans': spans,
+        'rows': len(calendar),
+        'created_at': time.time(),
+    }
+    with open(os.path.join(tmp_root, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    if os.path.exists(root):
+        old_root = f"{root}.{os.getpid()}.old"
+        os.replace(root, old_root)
+        os.replace(tmp_root, root)
+        shutil.rmtree(old_root, ignore_errors=True)
+    else:
+        os.replace(tmp_root, root)
+    return {'tickers': len(tickers), 'rows': len(calendar), 'fields': fields}
+
+
+def build_panel(root, tickers, period="10y", interval=DEFAULT_INTERVAL, fields=PANEL_FIELDS, workers=8):
+    """
+    Fetch price histories and write them to a panel
+
+    Args:
+        root: Panel directory
+        tickers: List of stock symbols
+        period: History to fetch (yfinance period string)
+        interval: Bar size
+        fields: Columns to store
+        workers: Download threads
+
+    Returns:
+        Dictionary from write_panel(), plus the tickers that had no data
+    """
+    # Imported here: data_fetcher serves panels, so it imports this module
+    from data.data_fetcher import fetch_stock_data
+
+    def load(ticker):
+        return ticker, fetch_stock_data(ticker, period=period, interval=interval)
+
+    frames, missing = {}, []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for ticker, history in executor.map(load, tickers):
+            if history.empty:
+                print(f"Error: No data available for {ticker}")
+                missing.append(ticker)
+            else:
+                frames[ticker] = history
+
+    summary = write_panel(root, frames, interval=interval, fields=fields)
+    summary['missing'] = missing
+    return summary
+
+
+class PricePanel:
+    def __init__(self, root):
+        """
+        Open a panel written by write_panel() (the arrays are mapped, not read)
+
+        Args:
+            root: Panel directory
+        """
+        self.root = root
+        with open(os.path.join(root, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get('version') != PANEL_VERSION:
+            raise ValueError(f"Unsupported panel version {meta.get('version')} in {root}")
+
+        self.interval = meta['interval']
+        self.tz = meta['tz']
+        self.fields = meta['fields']
+        self.tickers = meta['tickers']
+        self._spans = meta['spans']
+        self._columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._arrays = {field: np.load(os.path.join(root, _field_file(field)), mmap_mode='r')
+                        for field in self.fields}
+
+        dates = pd.DatetimeIndex(np.load(os.path.join(root, "dates.npy")).view('datetime64[ns]'))
+        self.dates = dates.tz_localize('UTC').tz_convert(self.tz) if self.tz else dates
+
+    def __contains__(self, ticker):
+        return ticker in self._columns
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def _rows(self, start, end, first=0, last=None):
+        """Row range [lo, hi) of the dates between start and end, within first..last"""
+        last = len(self.dates) - 1 if last is None else last
+        lo, hi = first, last + 1
+        if start is not None:
+            lo = max(lo, int(self.dates.searchsorted(self._timestamp(start), side='left')))
+        if end is not None:
+            hi = min(hi, int(self.dates.searchsorted(self._timestamp(end), side='right')))
+        return lo, max(lo, hi)
+
+    def _timestamp(self, value):
+        value = pd.Timestamp(value)
+        if self.tz and value.tz is None:
+            return value.tz_localize(self.tz)
+        if not self.tz and value.tz is not None:
+            return value.tz_convert('UTC').tz_localize(None)
+        return value
+
+    def frame(self, ticker, start=None, end=None, fields=None):
+        """
+        One ticker's bars as a DataFrame of views into the panel
+
+        Args:
+            ticker: Stock symbol
+            start, end: Optional date bounds (inclusive)
+            fields: Columns to include (default all stored fields)
+
+        Returns:
+            DataFrame indexed by date, only the rows where the ticker has a
+            bar (empty DataFrame if the ticker is not in the panel)
+        """
+        if ticker not in self._columns:
+            return pd.DataFrame()
+        span = self._spans[ticker]
+        column = self._columns[ticker]
+        lo, hi = self._rows(start, end, span['first'], span['last'])
+        fields = self.fields if fields is None else list(fields)
+
+        frame = pd.DataFrame({field: self._arrays[field][lo:hi, column] for field in fields},
+                             index=self.dates[lo:hi], copy=False)
+        if span['gaps'] and 'Close' in self._arrays:
+            frame = frame[~np.isnan(self._arrays['Close'][lo:hi, column])]
+        return frame
+
+    def panel(self, field, start=None, end=None, tickers=None):
+        """
+        Dates x tickers DataFrame of one field
+
+        Args:
+            field: Stored field, e.g. 'Close'
+            start, end: Optional date bounds (inclusive)
+            tickers: Tickers to include (default all); a subset copies the columns
+
+        Returns:
+            DataFrame (NaN where a ticker has no bar); a view of the panel
+            when all tickers are included
+        """
+        lo, hi = self._rows(start, end)
+        array = self._arrays[field]
+        if tickers is None:
+            names, block = self.tickers, array[lo:hi]
+        else:
+            names = [ticker for ticker in tickers if ticker in self._columns]
+            block = array[lo:hi, [self._columns[ticker] for ticker in names]]
+        return pd.DataFrame(block, index=self.dates[lo:hi], columns=names, copy=False)
+
+    def info(self):
+        """
+        Returns:
+            Dictionary describing the panel (tickers, rows, date range, fields)
+        """
+        return {
+            'root': self.root,
+            'tickers': len(self.tickers),
+            'rows': len(self.dates),
+            'start': self.dates[0] if len(self.dates) else None,
+            'end': self.dates[-1] if len(self.dates) else None,
+            'interval': self.interval,
+            'fields': self.fields,
+        }
@@ -0,0 +1,319 @@
+"""
+Stale-while-revalidate refresher for downloads
+
+With only a TTL cache, the first request after an entry expires waits on the
+network. BackgroundRefresher keeps serving the old value instead and
+refreshes it in the background:
+
+- Age up to the kind's fresh time (SERVER_CACHE_TTL): served as is.
+- Age up to the kind's stale bound (REFRESH_MAX_STALE): served right away,
+  and a refresh is queued for a pool of worker threads.
+- Older, or never fetched: downloaded while the caller waits (one download
+  per key even when several threads ask at once). A value in the on-disk
+  cache that is within the stale bound is served (and refreshed) instead.
+
+A key is refreshed at most once at a time: asking again while its refresh is
+queued or running does not queue another one. After a failed refresh the old
+value keeps being served, and the key is not retried for a fresh period.
+Watchlist tickers are refreshed before everything else, and with
+poll_seconds set their stale entries are refreshed before anyone asks.
+
+Keys follow data.data_fetcher: a tuple whose first item is the kind
+('prices', 'fundamentals', 'quarterly', 'vix') and whose second item, when
+present, is the ticker.
+
+Enable it with data.data_fetcher.set_refresher(); stats() reports how fresh
+the served data was and how the refreshes went.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from config import SERVER_CACHE_TTL, REFRESH_MAX_STALE, REFRESH_WORKERS
+
+# Ages of the most recent lookups and durations of the most recent refreshes kept for stats()
+MAX_SAMPLES = 10000
+
+WATCHLIST_PRIORITY = 0
+DEFAULT_PRIORITY = 1
+
+
+class BackgroundRefresher:
+    def __init__(self, workers=REFRESH_WORKERS, fresh_seconds=None, max_stale_seconds=None, watchlist=None,
+                 poll_seconds=None, max_entries=10000):
+        """
+        Create a refresher (its worker threads start on first use, or right away with poll_seconds)
+
+        Args:
+            workers: Threads refreshing entries in the background
+            fresh_seconds: Dict of seconds per kind an entry counts as fresh
+                (default SERVER_CACHE_TTL in config.py)
+            max_stale_seconds: Dict of seconds per kind a stale entry may still
+                be served (default REFRESH_MAX_STALE in config.py)
+            watchlist: Tickers refreshed first
+            poll_seconds: If set, check the watchlist this often and refresh its stale entries
+            max_entries: Entries kept before the least recently used are dropped
+        """
+        self.fresh_seconds = dict(SERVER_CACHE_TTL, **(fresh_seconds or {}))
+        self.max_stale_seconds = dict(REFRESH_MAX_STALE, **(max_stale_seconds or {}))
+        self.watchlist = set(watchlist or ())
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()   # key -> dict(fetched_at, value, refresh, keep)
+        self._lock = threading.Lock()
+        self._pending = {}              # key -> Event for blocking downloads in progress
+        self._in_flight = set()         # keys queued or being refreshed
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._threads = []
+        self._stopped = threading.Event()
+
+        self._ages = deque(maxlen=MAX_SAMPLES)
+        self._refresh_seconds = deque(maxlen=MAX_SAMPLES)
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes_queued = 0
+        self.refreshes_deduplicated = 0
+        self.refreshes_completed = 0
+        self.refresh_failures = 0
+
+        if poll_seconds:
+            # Watchlist polling has to run before anyone asks for a stale entry
+            with self._lock:
+                self._start()
+
+    @staticmethod
+    def _kind(key):
+        return key[0] if isinstance(key, tuple) and key else None
+
+    @staticmethod
+    def _ticker(key):
+        return key[1] if isinstance(key, tuple) and len(key) > 1 else None
+
+    def _limits(self, key):
+        kind = self._kind(key)
+        fresh = self.fresh_seconds.get(kind, self.fresh_seconds['prices'])
+        return fresh, max(fresh, self.max_stale_seconds.get(kind, fresh))
+
+    def watch(self, tickers):
+        """Add tickers to the watchlist"""
+        with self._lock:
+            self.watchlist.update(tickers)
+
+    def get(self, key, download, keep=None, refresh=None, peek=None):
+        """
+        Return the value for key, refreshing it in the background when stale
+
+        Args:
+            key: Tuple key, e.g. ('prices', ticker, period, interval)
+            download: Function() -> value used when the caller has to wait
+            keep: Optional function(value) -> bool; rejected values (failed
+                downloads) are returned but not stored, and a rejected refresh
+                keeps the old value
+            refresh: Function() -> value for background refreshes (default
+                download); it should skip any cache that could return the stale value
+            peek: Optional function() -> (age_seconds, value) or None, reading a
+                slower cache (e.g. on disk) regardless of its age
+
+        Returns:
+            The stored, peeked or downloaded value
+        """
+        keep = keep or (lambda value: True)
+        fresh, max_stale = self._limits(key)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    age = time.time() - entry['fetched_at']
+                    if age <= max_stale:
+                        self._entries.move_to_end(key)
+                        self._ages.append(age)
+                        if age <= fresh:
+                            self.fresh_hits += 1
+                        else:
+                            self.stale_hits += 1
+                            self._schedule(key)
+                        return entry['value']
+                event = self._pending.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = self._pending[key] = threading.Event()
+                    break
+            # Another thread is downloading this key; wait and look again
+            event.wait()
+
+        try:
+            if peek is not None:
+                peeked = peek()
+                if peeked is not None and peeked[0] <= max_stale and keep(peeked[1]):
+                    age, value = peeked
+                    with self._lock:
+                        self._store(key, value, time.time() - age, refresh or download, keep)
+                        self._ages.append(age)
+                        if age > fresh:
+                            self._schedule(key)
+                    return value
+
+            value = download()
+            with self._lock:
+                self._ages.append(0.0)
+                if keep(value):
+                    self._store(key, value, time.time(), refresh or download, keep)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+    def _store(self, key, value, fetched_at, refresh, keep):
+        """Store an entry; caller holds the lock"""
+        self._entries[key] = {'fetched_at': fetched_at, 'value': value, 'refresh': refresh, 'keep': keep}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _schedule(self, key):
+        """
+        Queue a background refresh unless one is already queued or running; caller holds the lock
+
+        Returns:
+            True if a refresh was queued
+        """
+        if key in self._in_flight:
+            self.refreshes_deduplicated += 1
+            return False
+        entry = self._entries.get(key)
+        if entry is not None and time.time() < entry.get('retry_at', 0):
+            # The last refresh failed; wait a fresh period before trying again
+            return False
+        self._in_flight.add(key)
+        priority = WATCHLIST_PRIORITY if self._ticker(key) in self.watchlist else DEFAULT_PRIORITY
+        self._queue.put((priority, next(self._order), key))
+        self.refreshes_queued += 1
+        if not self._threads:
+            self._start()
+        return True
+
+    def _start(self):
+        """Start the worker (and watchlist polling) threads; caller holds the lock"""
+        for i in range(max(1, self.workers)):
+            thread = threading.Thread(target=self._work, name=f"refresher-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.poll_seconds:
+            thread = threading.Thread(target=self._poll, name="refresher-poll", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while not self._stopped.is_set():
+            _, _, key = self._queue.get()
+            if key is None:
+                break
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                with self._lock:
+                    self._in_flight.discard(key)
+                continue
+
+            started = time.monotonic()
+            try:
+                value = entry['refresh']()
+                succeeded = entry['keep'](value)
+            except Exception as e:
+                print(f"Error refreshing {key}: {e}")
+                succeeded = False
+
+            with self._lock:
+                self._in_flight.discard(key)
+                self._refresh_seconds.append(time.monotonic() - started)
+                if succeeded:
+                    self._store(key, value, time.time(), entry['refresh'], entry['keep'])
+                    self.refreshes_completed += 1
+                else:
+                    self.refresh_failures += 1
+                    if key in self._entries:
+                        self._entries[key]['retry_at'] = time.time() + self._limits(key)[0]
+
+    def _poll(self):
+        while not self._stopped.wait(self.poll_seconds):
+            self.refresh_stale(watchlist_only=True)
+
+    def refresh_stale(self, watchlist_only=False):
+        """
+        Queue a refresh of every stored entry that is no longer fresh
+
+        Args:
+            watchlist_only: Only refresh entries of watchlist tickers
+
+        Returns:
+            Number of refreshes queued
+        """
+        now = time.time()
+        queued = 0
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if watchlist_only and self._ticker(key) not in self.watchlist:
+                    continue
+                if now - entry['fetched_at'] > self._limits(key)[0] and key not in self._in_flight:
+                    queued += self._schedule(key)
+        return queued
+
+    def stop(self):
+        """Stop the worker threads (queued refreshes are dropped)"""
+        self._stopped.set()
+        for _ in self._threads:
+            self._queue.put((-1, next(self._order), None))
+        self._threads = []
+
+    def stats(self):
+        """
+        Freshness and refresh counters
+
+        Returns:
+            Dictionary with lookup counts (fresh, stale, miss), refresh counts,
+            the refresh queue depth, percentiles of the age of served data and
+            of refresh durations (seconds), and the oldest stored entry per kind
+        """
+        with self._lock:
+            ages = np.array(self._ages)
+            durations = np.array(self._refresh_seconds)
+            lookups = self.fresh_hits + self.stale_hits + self.misses
+            now = time.time()
+            oldest = {}
+            for key, entry in self._entries.items():
+                kind = self._kind(key)
+                oldest[kind] = max(oldest.get(kind, 0.0), now - entry['fetched_at'])
+
+            return {
+                'entries': len(self._entries),
+                'fresh_hits': self.fresh_hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'served_without_waiting': (self.fresh_hits + self.stale_hits) / lookups if lookups else 0.0,
+                'refreshes_queued': self.refreshes_queued,
+                'refreshes_deduplicated': self.refreshes_deduplicated,
+                'refreshes_completed': self.refreshes_completed,
+                'refresh_failures': self.refresh_failures,
+                'refresh_queue_depth': len(self._in_flight),
+                'watchlist': len(self.watchlist),
+                'served_age_seconds': _percentiles(ages),
+                'refresh_seconds': _percentiles(durations),
+                'oldest_entry_seconds': oldest,
+            }
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return {}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {'p50': float(p50), 'p95': float(p95), 'max': float(values.max())}
@@ -2,14 +2,18 @@ import pandas as pd
 from data.data_fetcher import fetch_quarterly_financials
 
 
-def calculate_revenue_growth(ticker):
+def calculate_revenue_growth(ticker, statements=None):
     """
     Calculate year-over-year revenue growth
+
+    Args:
+        ticker: Stock symbol
+        statements: Already fetched (quarterly_financials, cash_flow) tuple (fetched here if None)
     
     Returns:
         Revenue growth percentage
     """
-    quarterly_financials, _ = fetch_quarterly_financials(ticker)
+    quarterly_financials, _ = statements if statements is not None else fetch_quarterly_financials(ticker)
     
     if quarterly_financials.empty:
         return 0
@@ -27,14 +31,18 @@ def calculate_revenue_growth(ticker):
         return 0
 
 
-def calculate_fcf_growth(ticker):
+def calculate_fcf_growth(ticker, statements=None):
     """
     Calculate year-over-year free cash flow growth
+
+    Args:
+        ticker: Stock symbol
+        statements: Already fetched (quarterly_financials, cash_flow) tuple (fetched here if None)
     
     Returns:
         FCF growth percentage
     """
-    _, cash_flow = fetch_quarterly_financials(ticker)
+    _, cash_flow = statements if statements is not None else fetch_quarterly_financials(ticker)
     
     if cash_flow.empty:
         return 0
@@ -0,0 +1,101 @@
+"""
+Incremental Technical Indicators
+
+The functions in indicators.technical recompute each indicator over a whole
+price series. A live or paper-trading loop sees one bar at a time, so this
+module keeps the rolling windows and updates the same indicators in O(1) per
+bar:
+
+- Moving averages of the close (short and long window)
+- RSI from rolling average gains and losses
+- Volume ratio (current volume / rolling average volume)
+
+Values follow the definitions in indicators.technical, including NaN until a
+window is full.
+"""
+
+import math
+from collections import deque
+
+from config import MA_SHORT_PERIOD, MA_LONG_PERIOD, RSI_PERIOD, VOLUME_PERIOD
+
+
+class RollingMean:
+    """Mean of the last `window` values, updated in O(1) per value"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self._updates = 0
+
+    def update(self, value):
+        """
+        Add a value and return the mean of the window (NaN until it is full)
+        """
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+        # Re-sum now and then so rounding errors from the running total never build up
+        self._updates += 1
+        if self._updates % self.window == 0:
+            self.total = math.fsum(self.values)
+
+        if len(self.values) < self.window:
+            return math.nan
+        return self.total / self.window
+
+
+class IncrementalIndicators:
+    def __init__(self, ma_short_period=MA_SHORT_PERIOD, ma_long_period=MA_LONG_PERIOD,
+                 rsi_period=RSI_PERIOD, volume_period=VOLUME_PERIOD):
+        """
+        Track the strategy's indicators for one symbol, one bar at a time
+
+        Args:
+            ma_short_period, ma_long_period, rsi_period, volume_period: Indicator windows
+        """
+        self.ma_short = RollingMean(ma_short_period)
+        self.ma_long = RollingMean(ma_long_period)
+        self.avg_gain = RollingMean(rsi_period)
+        self.avg_loss = RollingMean(rsi_period)
+        self.avg_volume = RollingMean(volume_period)
+        self.last_close = None
+        self.bars = 0
+
+    def update(self, close, volume):
+        """
+        Add the next bar
+
+        Args:
+            close: Closing price
+            volume: Volume
+
+        Returns:
+            Tuple of (ma_short, ma_long, rsi, volume_ratio); NaN where the window is not full yet
+        """
+        # The first bar has no price change; calculate_rsi counts it as no gain and no loss
+        delta = 0.0 if self.last_close is None else close - self.last_close
+        self.last_close = close
+        self.bars += 1
+
+        ma_short = self.ma_short.update(close)
+        ma_long = self.ma_long.update(close)
+        avg_gain = self.avg_gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self.avg_loss.update(-delta if delta < 0 else 0.0)
+        avg_volume = self.avg_volume.update(volume)
+
+        # Same edge cases as the pandas division in calculate_rsi
+        if avg_loss == 0:
+            rsi = 100.0 if avg_gain > 0 else math.nan
+        else:
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        if avg_volume == 0:
+            volume_ratio = math.inf if volume > 0 else math.nan
+        else:
+            volume_ratio = volume / avg_volume
+
+        return ma_short, ma_long, rsi, volume_ratio
@@ -0,0 +1,315 @@
+"""
+Persistent indicator store
+
+Moving averages, RSI and the volume ratio for a ticker only change when new
+bars arrive, yet analyze_stock() and Backtester recompute them from the full
+price history on every call. IndicatorStore keeps each computed series on
+disk, one file per ticker, interval, indicator and period:
+
+    <root>/<interval>/<ticker>/<indicator>_<period>.pkl
+
+Each file holds one or more segments: runs of consecutive bars with their
+timestamps, the input values (close or volume) they were computed from and
+the indicator values. A lookup compares the requested bars with the segment
+holding its first bar:
+
+- Bars that are already stored are served from disk.
+- Bars appended after the stored ones are computed from a short tail (the
+  indicator window plus the new bars) and added to the segment.
+- Stored bars whose inputs changed are invalidated: a revised last bar is
+  recomputed from there on, and a split or dividend adjustment (which
+  rewrites every past price) recomputes the whole series.
+- A request starting before, or apart from, every stored segment is computed
+  from scratch and kept as a segment of its own. Segments it overlaps with
+  matching bars are merged into it, so an earlier or a disjoint window never
+  discards the history stored for another one.
+
+Results equal the functions in indicators.technical over the same bars, up to
+floating-point rounding (rolling sums depend slightly on where they start).
+
+Enable the store with set_indicator_store(); compute_indicators() then goes
+through it for every caller that passes a ticker.
+"""
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from indicators.technical import calculate_moving_averages, calculate_rsi, calculate_volume_ratio
+from config import MA_SHORT_PERIOD, MA_LONG_PERIOD, RSI_PERIOD, VOLUME_PERIOD, DEFAULT_INTERVAL
+
+# Bump when an indicator formula changes so stored series are recomputed
+INDICATOR_STORE_VERSION = 2
+
+
+def _moving_average(prices, period):
+    # Same computation as calculate_moving_averages, one window at a time
+    return prices.rolling(window=period).mean()
+
+
+# indicator -> function(series, period)
+INDICATORS = {
+    'ma': _moving_average,
+    'rsi': calculate_rsi,
+    'volume_ratio': calculate_volume_ratio,
+}
+
+# Store used by compute_indicators() (None disables it)
+_indicator_store = None
+
+
+def set_indicator_store(store):
+    """
+    Enable (or disable) the indicator store used by compute_indicators()
+
+    Args:
+        store: IndicatorStore, directory path, or None to compute from scratch
+    """
+    global _indicator_store
+    if isinstance(store, str):
+        store = IndicatorStore(store)
+    _indicator_store = store
+
+
+def get_indicator_store():
+    """Return the active IndicatorStore (None when disabled)"""
+    return _indicator_store
+
+
+class IndicatorStore:
+    def __init__(self, root):
+        """
+        Open (or create) an indicator store
+
+        Args:
+            root: Directory holding the indicator files
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._loaded = {}    # path -> stored series, so repeated lookups skip the disk
+        self.hits = 0        # bars served from disk
+        self.computed = 0    # bars computed (appended or recomputed)
+        self.invalidations = 0
+
+    def _path(self, ticker, interval, indicator, period):
+        directory = os.path.join(self.root, interval, ticker.replace("/", "-"))
+        return os.path.join(directory, f"{indicator}_{period}.pkl")
+
+    def _load(self, path):
+        if path in self._loaded:
+            return self._loaded[path]
+        if not os.path.exists(path):
+            return None
+        try:
+            stored = pd.read_pickle(path)
+        except (OSError, EOFError, ValueError):
+            return None
+        if stored.get('version') != INDICATOR_STORE_VERSION:
+            return None
+        self._loaded[path] = stored
+        return stored
+
+    def _save(self, path, segments):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stored = {'version': INDICATOR_STORE_VERSION, 'segments': segments}
+        # Write to a temp file first so concurrent readers never see partial files
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        pd.to_pickle(stored, tmp_path)
+        os.replace(tmp_path, path)
+        self._loaded[path] = stored
+
+    def get(self, ticker, indicator, series, period, interval=DEFAULT_INTERVAL):
+        """
+        Indicator values for a series, reusing and extending the stored ones
+
+        Args:
+            ticker: Stock symbol
+            indicator: 'ma', 'rsi' or 'volume_ratio'
+            series: Input Series (close or volume) with a DatetimeIndex
+            period: Indicator window
+            interval: Bar size of the series
+
+        Returns:
+            Series of indicator values aligned with the input
+        """
+        func = INDICATORS[indicator]
+        path = self._path(ticker, interval, indicator, period)
+        inputs = series.to_numpy(dtype=np.float64)
+        index = series.index
+        stored = self._load(path)
+        segments = stored['segments'] if stored is not None else []
+        if len(index) == 0:
+            return func(series.astype(np.float64), period)
+
+        # The segment holding the input's first bar
+        for number, segment in enumerate(segments):
+            position, matched = self._match(segment, index, inputs)
+            if matched:
+                break
+        else:
+            segment, position, matched = None, 0, 0
+
+        if segment is None:
+            values = func(series.astype(np.float64), period).to_numpy()
+            self.computed += len(values)
+            updated = {'index': index, 'inputs': inputs, 'values': values}
+            others = segments
+        else:
+            stored_index, stored_inputs, stored_values = segment['index'], segment['inputs'], segment['values']
+            keep = position + matched
+            values = stored_values[position:keep]
+            self.hits += matched
+            updated = segment
+            others = segments[:number] + segments[number + 1:]
+
+            if matched < len(index):
+                if keep < len(stored_index):
+                    # The latest stored bars were revised; drop them and recompute from there
+                    self.invalidations += 1
+                new = len(index) - matched
+                all_inputs = np.concatenate([stored_inputs[:keep], inputs[matched:]])
+                # Only the window that feeds the new bars has to be recomputed
+                tail_start = max(0, len(all_inputs) - new - period - 1)
+                new_values = func(pd.Series(all_inputs[tail_start:]), period).to_numpy()[-new:]
+                updated = {'index': stored_index[:keep].append(index[matched:]), 'inputs': all_inputs,
+                           'values': np.concatenate([stored_values[:keep], new_values])}
+                values = np.concatenate([values, new_values])
+                self.computed += new
+
+            if position > 0:
+                # Bars within a window of the input's start see only the input's own
+                # history (NaN, or RSI's partial first window), so take them from the input
+                head = min(len(values), period + 1)
+                values = values.copy()
+                values[:head] = func(series.iloc[:head].astype(np.float64), period).to_numpy()
+
+        if updated is not segment:
+            self._save(path, self._merge(updated, others, func, period))
+        # Copy so callers cannot modify the stored values
+        return pd.Series(values, index=index, copy=True)
+
+    def _merge(self, updated, others, func, period):
+        """
+        Fold the stored segments that overlap an updated segment into it
+
+        Segments whose overlapping bars match are joined (their values after the
+        overlap are kept, except the first window, which now has more history),
+        segments with different bars in the overlap are dropped and the rest are
+        kept as they are.
+
+        Returns:
+            List of segments ordered by their first bar
+        """
+        kept = []
+        for other in sorted(others, key=lambda segment: segment['index'][0]):
+            other_index, other_inputs = other['index'], other['inputs']
+            end = updated['index'][-1]
+            if other_index[-1] < updated['index'][0] or other_index[0] > end:
+                kept.append(other)
+                continue
+
+            position, matched = self._match(updated, other_index, other_inputs)
+            overlap = len(updated['index']) - position
+            if other_index[0] < updated['index'][0] or matched < min(len(other_index), overlap):
+                self.invalidations += 1
+                continue
+            if len(other_index) <= overlap:
+                continue
+
+            length = len(updated['inputs'])
+            all_inputs = np.concatenate([updated['inputs'], other_inputs[overlap:]])
+            all_values = np.concatenate([updated['values'], other['values'][overlap:]])
+            redo = min(len(other_index) - overlap, period + 1)
+            tail_start = max(0, length - period - 1)
+            all_values[length:length + redo] = func(
+                pd.Series(all_inputs[tail_start:length + redo]), period).to_numpy()[-redo:]
+            updated = {'index': updated['index'].append(other_index[overlap:]), 'inputs': all_inputs,
+                       'values': all_values}
+
+        kept.append(updated)
+        return sorted(kept, key=lambda segment: segment['index'][0])
+
+    @staticmethod
+    def _match(segment, index, inputs):
+        """
+        Line the input up with a stored segment
+
+        Returns:
+            Tuple of (position of the input's first bar in the segment,
+            number of leading input bars that match the segment's bars and inputs).
+            0 matching bars means the segment cannot be reused.
+        """
+        if len(index) == 0:
+            return 0, 0
+        stored_index = segment['index']
+        position = stored_index.searchsorted(index[0])
+        if position >= len(stored_index) or stored_index[position] != index[0]:
+            return 0, 0
+
+        overlap = min(len(index), len(stored_index) - position)
+        stored_times = stored_index.asi8[position:position + overlap]
+        stored_inputs = segment['inputs'][position:position + overlap]
+        times, inputs = index.asi8[:overlap], inputs[:overlap]
+        if np.array_equal(stored_times, times) and np.array_equal(stored_inputs, inputs, equal_nan=True):
+            return position, overlap
+
+        same = (stored_times == times) & ((stored_inputs == inputs) | (np.isnan(stored_inputs) & np.isnan(inputs)))
+        return position, int(np.argmin(same))
+
+    def stats(self):
+        """
+        Returns:
+            Dictionary with bars served from disk, bars computed and invalidations
+        """
+        return {'bars_reused': int(self.hits), 'bars_computed': int(self.computed),
+                'invalidations': self.invalidations}
+
+
+def compute_indicator(series, indicator, period, ticker=None, interval=DEFAULT_INTERVAL):
+    """
+    One indicator series, through the indicator store when enabled
+
+    Args:
+        series: Closing prices ('ma', 'rsi') or volumes ('volume_ratio')
+        indicator: Key of INDICATORS
+        period: Indicator window
+        ticker: Stock symbol (the store is only used when one is given)
+        interval: Bar size of the series
+
+    Returns:
+        Series of indicator values
+    """
+    store = _indicator_store
+    if store is None or ticker is None or not isinstance(series.index, pd.DatetimeIndex):
+        return INDICATORS[indicator](series, period)
+    return store.get(ticker, indicator, series, period, interval)
+
+
+def compute_indicators(close, volume, ticker=None, ma_short_period=MA_SHORT_PERIOD, ma_long_period=MA_LONG_PERIOD,
+                       rsi_period=RSI_PERIOD, volume_period=VOLUME_PERIOD, interval=DEFAULT_INTERVAL):
+    """
+    The strategy's technical indicators, through the indicator store when enabled
+
+    Args:
+        close: Series of closing prices
+        volume: Series of volumes
+        ticker: Stock symbol (the store is only used when one is given)
+        ma_short_period, ma_long_period, rsi_period, volume_period: Indicator windows
+        interval: Bar size of the series
+
+    Returns:
+        Tuple of (short_ma, long_ma, rsi, volume_ratio) Series
+    """
+    store = _indicator_store
+    if store is None or ticker is None or not isinstance(close.index, pd.DatetimeIndex):
+        short_ma, long_ma = calculate_moving_averages(close, ma_short_period, ma_long_period)
+        return short_ma, long_ma, calculate_rsi(close, rsi_period), calculate_volume_ratio(volume, volume_period)
+
+    return (
+        store.get(ticker, 'ma', close, ma_short_period, interval),
+        store.get(ticker, 'ma', close, ma_long_period, interval),
+        store.get(ticker, 'rsi', close, rsi_period, interval),
+        store.get(ticker, 'volume_ratio', volume, volume_period, interval),
+    )
@@ -0,0 +1,258 @@
+"""
+Higher-timeframe bars and indicators from daily history
+
+Weekly and monthly confirmation should not need a second download. This
+module resamples the daily bars that were already fetched into weekly
+(Friday-ending) or monthly bars, computes the strategy's indicators on them
+and lines the results up with the daily index.
+
+Look-ahead: a daily bar only sees higher-timeframe bars that closed before
+its own week (or month) began. The current, still-forming week is never used,
+so a backtest sees exactly what a live run would have seen on each day.
+
+Resampled bars are cached per ticker, timeframe and first daily bar (in
+memory, and on disk when set_timeframe_cache() is given a directory), so
+windows that start on different dates (walk-forward slices, warm-up tails,
+chunked runs) keep separate entries. When new daily bars arrive in a window,
+only the last stored period and the periods after it are aggregated again.
+The stored daily bars are fingerprinted, so revised history (splits,
+dividend adjustments) triggers a full resample.
+"""
+
+import math
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from backtest.result_store import hash_price_data
+from indicators.indicator_store import compute_indicators
+from config import HIGHER_TIMEFRAME_PERIODS, PERIODS_PER_YEAR
+
+# Higher timeframe -> pandas period alias
+TIMEFRAME_RULES = {
+    '1wk': 'W-FRI',
+    '1mo': 'M',
+}
+
+_AGGREGATIONS = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+# Bump when the resampling changes so cached bars are rebuilt
+TIMEFRAME_CACHE_VERSION = 2
+
+# Windows kept in memory before the least recently used are dropped
+MAX_CACHED_WINDOWS = 256
+
+
+def period_starts(index, timeframe):
+    """
+    Start of the higher-timeframe period each bar belongs to
+
+    Args:
+        index: DatetimeIndex of the daily bars
+        timeframe: '1wk' or '1mo'
+
+    Returns:
+        DatetimeIndex (timezone-naive) of period start dates
+    """
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.to_period(TIMEFRAME_RULES[timeframe]).to_timestamp()
+
+
+def resample_bars(daily, timeframe):
+    """
+    Aggregate daily bars into weekly or monthly bars
+
+    Args:
+        daily: DataFrame of daily bars (any of Open/High/Low/Close/Volume)
+        timeframe: '1wk' or '1mo'
+
+    Returns:
+        DataFrame indexed by period start; the last bar may still be forming
+    """
+    columns = {c: how for c, how in _AGGREGATIONS.items() if c in daily.columns}
+    return daily[list(columns)].groupby(period_starts(daily.index, timeframe)).agg(columns)
+
+
+class ResampledBarCache:
+    def __init__(self, root=None):
+        """
+        Cache of resampled bars
+
+        Args:
+            root: Optional directory to keep the bars in between runs
+        """
+        self.root = root
+        self._entries = OrderedDict()   # (ticker, timeframe, first bar) -> entry, most recently used last
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        ticker, timeframe, start = key
+        return os.path.join(self.root, timeframe, ticker.replace('/', '-'),
+                            f"{pd.Timestamp(start).strftime('%Y%m%dT%H%M%S')}.pkl")
+
+    def _load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None or not self.root:
+            return entry
+        try:
+            with open(self._path(key), "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry if entry.get('version') == TIMEFRAME_CACHE_VERSION else None
+
+    def _save(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > MAX_CACHED_WINDOWS:
+                self._entries.popitem(last=False)
+        if not self.root:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so concurrent readers never see partial files
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def get(self, ticker, daily, timeframe):
+        """
+        Resampled bars for a ticker, extending the cached ones when possible
+
+        Args:
+            ticker: Stock symbol
+            daily: DataFrame of daily bars with Close and Volume columns
+            timeframe: '1wk' or '1mo'
+
+        Returns:
+            DataFrame from resample_bars()
+        """
+        if len(daily) == 0:
+            return resample_bars(daily, timeframe)
+        key = (ticker, timeframe, daily.index[0])
+        entry = self._load(key)
+        if entry is not None and self._extends(entry, daily):
+            # Re-aggregate the last stored (possibly unfinished) period and everything after it
+            tail = resample_bars(daily.loc[entry['last_period_start']:], timeframe)
+            bars = pd.concat([entry['bars'].iloc[:-1], tail])
+        else:
+            bars = resample_bars(daily, timeframe)
+            if entry is not None and daily.index[-1] < entry['daily_end']:
+                # A shorter window from the same start; keep the longer entry for later calls
+                return bars
+
+        if len(bars):
+            starts = period_starts(daily.index, timeframe)
+            first_of_last = daily.index[starts.searchsorted(bars.index[-1])]
+            self._save(key, {
+                'version': TIMEFRAME_CACHE_VERSION,
+                'bars': bars,
+                'daily_end': daily.index[-1],
+                'daily_hash': hash_price_data(daily),
+                'last_period_start': first_of_last,
+            })
+        return bars
+
+    @staticmethod
+    def _extends(entry, daily):
+        """True when daily starts with exactly the bars the entry was built from"""
+        end = entry['daily_end']
+        if len(daily) == 0 or end not in daily.index:
+            return False
+        return hash_price_data(daily.loc[:end]) == entry['daily_hash']
+
+
+# Cache used by higher_timeframe_indicators()
+_bar_cache = ResampledBarCache()
+
+
+def set_timeframe_cache(root):
+    """
+    Keep resampled bars in a directory between runs (None keeps them in memory only)
+    """
+    global _bar_cache
+    _bar_cache = ResampledBarCache(root)
+
+
+def align_to_daily(table, index, timeframe):
+    """
+    Line higher-timeframe rows up with daily bars without look-ahead
+
+    Each daily bar gets the row of the last period that ended before its own
+    period began (NaN before the first completed period).
+
+    Args:
+        table: DataFrame indexed by period start (from resample_bars)
+        index: Daily DatetimeIndex
+        timeframe: '1wk' or '1mo'
+
+    Returns:
+        DataFrame indexed like the daily bars
+    """
+    positions = table.index.searchsorted(period_starts(index, timeframe)) - 1
+    values = table.to_numpy(dtype=float)[np.maximum(positions, 0)]
+    values[positions < 0] = np.nan
+    return pd.DataFrame(values, index=index, columns=table.columns)
+
+
+def timeframe_indicators(daily, timeframe, ticker=None, periods=None):
+    """
+    Indicators computed on higher-timeframe bars (not yet aligned)
+
+    Args:
+        daily: DataFrame of daily bars with Close and Volume columns
+        timeframe: '1wk' or '1mo'
+        ticker: Stock symbol; enables the resampled-bar cache and the indicator store
+        periods: Optional overrides of HIGHER_TIMEFRAME_PERIODS[timeframe]
+
+    Returns:
+        DataFrame indexed by period start with close, ma_short, ma_long,
+        rsi and volume_ratio columns
+    """
+    periods = dict(HIGHER_TIMEFRAME_PERIODS[timeframe], **(periods or {}))
+    bars = _bar_cache.get(ticker, daily, timeframe) if ticker else resample_bars(daily, timeframe)
+    ma_short, ma_long, rsi, volume_ratio = compute_indicators(
+        bars['Close'], bars['Volume'], ticker, periods['ma_short_period'], periods['ma_long_period'],
+        periods['rsi_period'], periods['volume_period'], interval=timeframe
+    )
+    return pd.DataFrame({
+        'close': bars['Close'], 'ma_short': ma_short, 'ma_long': ma_long,
+        'rsi': rsi, 'volume_ratio': volume_ratio,
+    })
+
+
+def higher_timeframe_indicators(daily, timeframe, ticker=None, periods=None):
+    """
+    Higher-timeframe indicators as they stood on each daily bar
+
+    Returns:
+        DataFrame indexed like daily (see timeframe_indicators and align_to_daily)
+    """
+    return align_to_daily(timeframe_indicators(daily, timeframe, ticker, periods), daily.index, timeframe)
+
+
+def timeframe_warmup_bars(timeframe, interval='1d', periods=None):
+    """
+    Daily (or base-interval) bars needed before a higher-timeframe value is valid
+
+    Covers the longest indicator window on the higher timeframe, one unfinished
+    period at the start of the data and the one-period delay of align_to_daily().
+    """
+    periods = dict(HIGHER_TIMEFRAME_PERIODS[timeframe], **(periods or {}))
+    longest = max(periods['ma_long_period'], periods['ma_short_period'],
+                  periods['rsi_period'] + 1, periods['volume_period'])
+    # Calendar months hold up to 23 trading days, about 10% more than the average
+    bars_per_period = math.ceil(PERIODS_PER_YEAR[interval] / PERIODS_PER_YEAR[timeframe] * 1.1)
+    return (longest + 2) * bars_per_period
@@ -1,72 +1,607 @@
 """
 Main entry point for the algorithmic trading system
 
-This module demonstrates how to use the trading algorithm for:
-1. Single stock analysis
-2. Multiple stock comparison
-3. Backtesting a trading strategy
+Command-line usage:
+    python main.py analyze AAPL MSFT
+    python main.py screen --file tickers.txt --min-recommendation buy
+    cat tickers.txt | python main.py backtest --start 2020-01-01 --end 2024-01-01
+    python main.py paper AAPL MSFT --interval 5m --live
+    python main.py serve    (then: python client.py analyze AAPL)
+    python main.py rotate --file universe.txt --top 20 --rebalance 5
+    python main.py shard init jobs/sweep --file universe.txt --stop-loss 0.05 0.07 0.10
+    python main.py shard work jobs/sweep -w 4    (on every node sharing jobs/)
+    python main.py shard merge jobs/sweep -o sweep.csv
+    python main.py panel build panels/sp500 --file universe.txt
+    python main.py sectors sectors.pkl --file universe.txt    (then: analyze AAPL --relative sectors.pkl)
+    python main.py backtest --file universe.txt --panel panels/sp500
+
+Tickers are read from the positional arguments, from --file (use "-" for
+stdin), or from stdin when neither is given. Each subcommand writes one JSON
+object per ticker to stdout as soon as that ticker finishes, so results can be
+piped into other tools without holding the whole universe in memory. Progress
+messages from the analysis code go to stderr (or nowhere with --quiet).
 """
 
-from analysis.analyzer import analyze_stock
-from utils.helpers import analyze_multiple_stocks, print_summary
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from analysis.analyzer import analyze_stock, screen_stock, ScreeningStats
+from analysis.pipeline import AnalysisPipeline
 from backtest.backtester import Backtester
-from backtest.visualizations import create_performance_summary
+from backtest.checkpoint import run_incremental
+from backtest.result_dataset import ResultDatasetWriter
+from backtest.result_store import ResultStore
+from backtest.rotation import run_rotation
+from backtest.sharding import create_job, run_worker, job_status, merge_results, ShardQueue
+from data.bar_store import BarStore
+from data.data_fetcher import fetch_stock_data, set_cache_dir, set_panel
+from data.feeds import ReplayFeed, YFinanceFeed
+from data.panel_store import PricePanel, build_panel
+from data.refresher import BackgroundRefresher
+from indicators.indicator_store import set_indicator_store
+from scoring.relative import SectorRelativeScorer, fundamentals_snapshot, set_relative_scorer
+from server.analysis_server import AnalysisServer
+from trading.paper_trader import PaperTrader, print_service_metrics
+from utils.helpers import to_serializable
+from config import (
+    RECOMMENDATION_THRESHOLDS, DEFAULT_INTERVAL, PERIODS_PER_YEAR, MAX_INTRADAY_PERIOD, SERVER_HOST, SERVER_PORT,
+    RISK_WINDOW, RELATIVE_MIN_PEERS
+)
 
 
-if __name__ == "__main__":
-    print("="*70)
-    print("ALGORITHMIC TRADING SYSTEM - SHPE Capital Analysts")
-    print("="*70)
-
-    # ========================================================================
-    # Example 1: Analyze a Single Stock
-    # ========================================================================
-    # This performs fundamental + technical analysis on a single stock
-    # and provides a BUY/HOLD/SELL recommendation
-
-    # print("\n\nExample 1: Single Stock Analysis")
-    # result = analyze_stock("AAPL")
-
-    # ========================================================================
-    # Example 2: Analyze Multiple Stocks
-    # ========================================================================
-    # Compare multiple stocks side-by-side to find the best opportunity
-
-    # print("\n\nExample 2: Multiple Stock Analysis")
-    # tickers = ["MSFT", "GOOGL", "TSLA", "NVDA"]
-    # results = analyze_multiple_stocks(tickers)
-    # print_summary(results)
-
-    # ========================================================================
-    # Example 3: Backtest Trading Strategy
-    # ========================================================================
-    # Test the algorithm on historical data to evaluate performance
-
-    print("\n\nExample 3: Backtesting")
-
-    # Initialize backtester with risk management parameters
-    backtester = Backtester(
-        ticker="WMT",              # Stock to test
-        start_date="2020-01-01",   # Backtest start
-        end_date="2024-01-01",     # Backtest end
-        initial_capital=10000,     # Starting capital ($10,000)
-        stop_loss_pct=0.07,        # 7% stop-loss
-        max_position_pct=1.0,      # 100% max position size
-        daily_loss_limit_pct=0.10  # 10% daily loss circuit breaker
+def read_tickers(args):
+    """
+    Yield ticker symbols from the command line, a file or stdin
+
+    Lines may hold one or more symbols separated by whitespace or commas;
+    anything after a '#' is treated as a comment.
+    """
+    if args.tickers:
+        for ticker in args.tickers:
+            yield ticker.strip().upper()
+        return
+
+    if args.file and args.file != "-":
+        source = open(args.file)
+    else:
+        source = sys.stdin
+
+    with source:
+        for line in source:
+            line = line.split("#", 1)[0]
+            for ticker in line.replace(",", " ").split():
+                yield ticker.upper()
+
+
+def stream_results(func, tickers, workers):
+    """
+    Run func over tickers with a thread pool, yielding results as they finish
+
+    At most 2 * workers tickers are in flight at once, so the ticker source is
+    consumed lazily and memory use does not grow with the universe size.
+
+    Args:
+        func: Function taking a ticker and returning a JSON-ready dict
+        tickers: Iterable of ticker symbols
+        workers: Number of worker threads
+
+    Yields:
+        Result dicts in completion order
+    """
+    tickers = iter(tickers)
+    max_in_flight = max(1, workers) * 2
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        pending = {}
+
+        while True:
+            # Top up the window of in-flight tickers
+            while len(pending) < max_in_flight:
+                ticker = next(tickers, None)
+                if ticker is None:
+                    break
+                pending[executor.submit(func, ticker)] = ticker
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker = pending.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield {'ticker': ticker, 'error': str(e)}
+
+
+def make_analyze_runner():
+    """
+    Build the per-ticker function for the analyze/screen subcommands
+
+    The tickers share one AnalysisPipeline, so market-wide inputs such as the
+    VIX are fetched once per run; each ticker's own values are dropped once
+    it is scored.
+    """
+    pipeline = AnalysisPipeline()
+
+    def run_analyze(ticker):
+        try:
+            result = analyze_stock(ticker, pipeline=pipeline)
+        finally:
+            pipeline.forget(ticker)
+        if result is None:
+            return {'ticker': ticker, 'error': 'no price data'}
+        return result
+    return run_analyze
+
+
+def make_backtest_runner(args):
+    """Build the per-ticker function for the backtest subcommand"""
+    result_store = ResultStore(args.store) if args.store else None
+
+    def run_backtest(ticker):
+        backtester = Backtester(
+            ticker=ticker,
+            start_date=args.start,
+            end_date=args.end,
+            initial_capital=args.capital,
+            stop_loss_pct=args.stop_loss,
+            max_position_pct=args.max_position,
+            daily_loss_limit_pct=args.daily_loss_limit,
+            result_store=result_store,
+            confirm_timeframes=args.confirm
+        )
+        if args.checkpoint_dir:
+            checkpoint_path = os.path.join(args.checkpoint_dir, f"{ticker.replace('/', '-')}.pkl")
+            result = run_incremental(backtester, checkpoint_path, verbose=not args.quiet)
+        else:
+            result = backtester.run(verbose=not args.quiet)
+        if result is None:
+            return {'ticker': ticker, 'error': 'no trades executed'}
+        return result
+    return run_backtest
+
+
+def emit(result, out):
+    """Write one result as a JSON line and flush so downstream tools see it immediately"""
+    out.write(json.dumps(to_serializable(result)) + "\n")
+    out.flush()
+
+
+def command_analyze(args, out):
+    for result in stream_results(make_analyze_runner(), read_tickers(args), args.workers):
+        emit(result, out)
+
+
+def command_screen(args, out):
+    if args.min_score is not None:
+        threshold = args.min_score
+    else:
+        threshold = RECOMMENDATION_THRESHOLDS[args.min_recommendation]
+
+    if args.full:
+        for result in stream_results(make_analyze_runner(), read_tickers(args), args.workers):
+            if 'error' in result or result['total_score'] >= threshold:
+                emit(result, out)
+        return
+
+    # Staged mode: technical scores first, fundamentals only for tickers that can still qualify
+    stats = ScreeningStats()
+    pipeline = AnalysisPipeline()
+
+    def run_screen(ticker):
+        try:
+            result = screen_stock(ticker, threshold, stats=stats, pipeline=pipeline)
+        finally:
+            pipeline.forget(ticker)
+        return result or {'ticker': ticker, 'skipped': True}
+
+    for result in stream_results(run_screen, read_tickers(args), args.workers):
+        if 'error' in result or result.get('total_score', -1) >= threshold:
+            emit(result, out)
+
+    summary = stats.as_dict()
+    print(f"Screened {summary['screened']} tickers, pruned {summary['pruned']} "
+          f"before fundamentals ({summary['fetches_avoided']} fetches avoided)")
+
+
+def command_backtest(args, out):
+    report = None
+    if args.charts or args.report:
+        # Charts are written from the main thread; pyplot is not thread-safe
+        import matplotlib
+        matplotlib.use("Agg")
+        from backtest.visualizations import create_performance_summary
+        from backtest.universe_report import UniverseReport
+        if args.report:
+            report = UniverseReport(drill_down=args.drill_down)
+
+    writer = None
+    if args.export:
+        try:
+            writer = ResultDatasetWriter(args.export, run_id=args.run_id)
+        except ImportError as e:
+            print(f"Error: {e}")
+            return
+
+    runner = make_backtest_runner(args)
+    with writer if writer is not None else contextlib.nullcontext():
+        for result in stream_results(runner, read_tickers(args), args.workers):
+            if args.charts and 'error' not in result:
+                create_performance_summary(result, save_dir=args.charts)
+            if report is not None:
+                report.add(result)
+            if writer is not None and 'error' not in result:
+                result['result_id'] = writer.write(result)
+            if not args.equity_curve:
+                result.pop('equity_curve', None)
+            emit(result, out)
+
+    if report is not None:
+        report.render(args.report)
+
+
+def command_paper(args, out):
+    tickers = list(read_tickers(args))
+    trader = PaperTrader(
+        tickers,
+        initial_capital=args.capital,
+        stop_loss_pct=args.stop_loss,
+        max_position_pct=args.max_position,
+        daily_loss_limit_pct=args.daily_loss_limit,
+        interval=args.interval,
+        queue_size=args.queue_size,
+        verbose=not args.quiet,
+    )
+
+    if args.live:
+        # Warm up the indicators on recent history, then trade only newer bars
+        feed = YFinanceFeed(tickers, args.interval, args.poll_seconds)
+        for ticker in tickers:
+            history = fetch_stock_data(ticker, period=MAX_INTRADAY_PERIOD.get(args.interval, "2y"),
+                                       interval=args.interval)
+            if not history.empty:
+                trader.prime(ticker, history)
+                if feed.last_timestamp is None or history.index[-1] > feed.last_timestamp:
+                    feed.last_timestamp = history.index[-1]
+    elif args.replay:
+        feed = ReplayFeed.from_bar_store(BarStore(args.replay), tickers, args.interval, args.start, args.end,
+                                         delay=args.replay_delay)
+    else:
+        frames = {}
+        for ticker in tickers:
+            history = fetch_stock_data(ticker, period="10y", interval=args.interval)
+            frames[ticker] = history.loc[args.start:args.end]
+        feed = ReplayFeed(frames, delay=args.replay_delay)
+
+    try:
+        metrics = asyncio.run(trader.run(feed, max_ticks=args.max_ticks))
+    except KeyboardInterrupt:
+        # Stopping a live session still reports the accounts
+        metrics = trader.metrics.as_dict()
+
+    for result in trader.close_all():
+        result.pop('equity_curve', None)
+        emit(result, out)
+    print_service_metrics(metrics)
+
+
+def command_rotate(args, out):
+    result = run_rotation(list(read_tickers(args)), args.start, args.end, top_k=args.top,
+                          rebalance_every=args.rebalance, cost_bps=args.cost_bps,
+                          initial_capital=args.capital, workers=args.workers,
+                          max_correlation=args.max_correlation, max_volatility=args.max_vol,
+                          risk_window=args.risk_window)
+    if result is None:
+        emit({'error': 'no price data'}, out)
+        return
+
+    if args.holdings:
+        for date, row in result['holdings'].iterrows():
+            emit({'date': date, 'holdings': list(row.index[row.to_numpy()])}, out)
+    emit(result['metrics'], out)
+
+
+def command_serve(args, out):
+    refresher = None
+    if args.refresh_workers:
+        refresher = BackgroundRefresher(workers=args.refresh_workers, watchlist=args.watchlist,
+                                        poll_seconds=args.poll_seconds)
+    server = AnalysisServer(args.host, args.port, workers=args.workers, refresher=refresher)
+    host, port = server.address[:2]
+    print(f"Analysis server listening on http://{host}:{port} (query it with client.py)")
+    server.serve_forever()
+
+
+def command_shard(args, out):
+    if args.action == "init":
+        job = create_job(
+            args.job_dir, list(read_tickers(args)), kind=args.kind,
+            start_date=args.start, end_date=args.end, initial_capital=args.capital, interval=args.interval,
+            param_grid={'stop_loss_pct': args.stop_loss, 'max_position_pct': args.max_position,
+                        'daily_loss_limit_pct': args.daily_loss_limit},
+            shard_size=args.shard_size, param_chunk=args.param_chunk, max_attempts=args.max_attempts,
+        )
+        print(f"Job {args.job_dir}: {len(job['shards'])} shards queued")
+        emit(job_status(args.job_dir), out)
+
+    elif args.action == "work":
+        if args.workers <= 1:
+            emit(run_worker(args.job_dir, args.worker_id, args.lease, args.max_shards), out)
+            return
+        # One process per worker; each claims shards from the queue on its own
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                 initargs=(args.cache_dir, args.panel)) as executor:
+            futures = [executor.submit(run_worker, args.job_dir, None, args.lease, args.max_shards)
+                       for _ in range(args.workers)]
+            for future in futures:
+                emit(future.result(), out)
+
+    elif args.action == "status":
+        if args.retry_failed:
+            requeued = ShardQueue(os.path.join(args.job_dir, "queue.sqlite")).retry_failed()
+            print(f"Requeued {requeued} failed shards")
+        emit(job_status(args.job_dir), out)
+
+    elif args.action == "merge":
+        merged = merge_results(args.job_dir)
+        if args.output:
+            merged.to_csv(args.output, index=False)
+            print(f"Wrote {len(merged)} rows to {args.output}")
+        else:
+            for row in merged.to_dict(orient="records"):
+                emit(row, out)
+
+
+def command_panel(args, out):
+    if args.action == "build":
+        summary = build_panel(args.panel_dir, list(read_tickers(args)), period=args.period,
+                              interval=args.interval, workers=args.workers)
+        print(f"Panel {args.panel_dir}: {summary['tickers']} tickers x {summary['rows']} bars")
+        emit(summary, out)
+    elif args.action == "info":
+        emit(PricePanel(args.panel_dir).info(), out)
+
+
+def command_sectors(args, out):
+    snapshot = fundamentals_snapshot(list(read_tickers(args)), workers=args.workers)
+    if snapshot.empty:
+        print("Error: No fundamentals to rank")
+        return
+    scorer = SectorRelativeScorer(snapshot, min_peers=args.min_peers)
+    scorer.save(args.output)
+    print(f"Ranked {len(snapshot)} tickers in {len(scorer.medians)} sectors; saved to {args.output}")
+    for row in scorer.sector_table().reset_index(names='sector').to_dict(orient='records'):
+        emit(row, out)
+
+
+def init_worker(cache_dir, panel):
+    """Set up the data sources of a worker process (each process maps the panel itself)"""
+    set_cache_dir(cache_dir)
+    if panel:
+        set_panel(panel)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="ALGORITHMIC TRADING SYSTEM - SHPE Capital Analysts"
     )
 
-    # Run the backtest
-    results = backtester.run()
-
-    # Generate performance charts
-    if results:
-        print("\n" + "="*70)
-        print("GENERATING PERFORMANCE CHARTS")
-        print("="*70)
-        create_performance_summary(results, save_dir='charts')
-        print("\nCharts saved to 'charts/' directory")
-        print("These charts are ready for your presentation!")
-
-    print("\n" + "="*70)
-    print("ANALYSIS COMPLETE")
-    print("="*70)
\ No newline at end of file
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("tickers", nargs="*", help="Ticker symbols (default: read from --file or stdin)")
+    common.add_argument("-f", "--file", help="File with ticker symbols ('-' for stdin)")
+    common.add_argument("-w", "--workers", type=int, default=4, help="Number of worker threads (default 4)")
+    common.add_argument("--cache-dir", help="Directory for cached market data downloads")
+    common.add_argument("--panel", metavar="DIR",
+                        help="Read price histories from a memory-mapped panel (see the panel subcommand)")
+    common.add_argument("--indicator-store", metavar="DIR",
+                        help="Keep computed indicators in DIR and only compute them for new bars")
+    common.add_argument("-q", "--quiet", action="store_true", help="Suppress progress output on stderr")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    analyze = subparsers.add_parser("analyze", parents=[common],
+                                    help="Score each ticker and print the full analysis")
+    analyze.set_defaults(handler=command_analyze)
+
+    screen = subparsers.add_parser("screen", parents=[common],
+                                   help="Only print tickers that reach a recommendation level")
+    screen.add_argument("--min-recommendation", default="buy", choices=list(RECOMMENDATION_THRESHOLDS),
+                        help="Lowest recommendation to keep (default buy)")
+    screen.add_argument("--min-score", type=float, help="Explicit total score cutoff (overrides --min-recommendation)")
+    screen.add_argument("--full", action="store_true",
+                        help="Fetch fundamentals for every ticker instead of pruning on technical scores first")
+    screen.set_defaults(handler=command_screen)
+
+    for command in (analyze, screen):
+        command.add_argument("--relative", metavar="FILE",
+                             help="Score PEG, operating margin and debt-to-equity against sector peers "
+                                  "(FILE from the sectors subcommand)")
+
+    # Account and risk settings shared by backtest and paper
+    risk = argparse.ArgumentParser(add_help=False)
+    risk.add_argument("--start", default="2020-01-01", help="Start date (default 2020-01-01)")
+    risk.add_argument("--end", default="2024-01-01", help="End date (default 2024-01-01)")
+    risk.add_argument("--capital", type=float, default=10000, help="Initial capital (default 10000)")
+    risk.add_argument("--stop-loss", type=float, default=0.07, help="Stop-loss fraction (default 0.07)")
+    risk.add_argument("--max-position", type=float, default=1.0, help="Max position fraction (default 1.0)")
+    risk.add_argument("--daily-loss-limit", type=float, default=0.10,
+                      help="Daily loss circuit breaker fraction (default 0.10)")
+
+    backtest = subparsers.add_parser("backtest", parents=[common, risk],
+                                     help="Backtest the strategy on each ticker")
+    backtest.add_argument("--store", metavar="DB", help="SQLite result store; unchanged runs are loaded from it")
+    backtest.add_argument("--checkpoint-dir", metavar="DIR",
+                          help="Save each ticker's state to DIR and only simulate bars added since the last run")
+    backtest.add_argument("--confirm", nargs="+", choices=["1wk", "1mo"], metavar="TIMEFRAME",
+                          help="Only buy when these higher timeframes (1wk, 1mo) do not signal SELL")
+    backtest.add_argument("--equity-curve", action="store_true", help="Include the equity curve in the output")
+    backtest.add_argument("--charts", metavar="DIR", help="Write performance charts to DIR")
+    backtest.add_argument("--report", metavar="DIR",
+                          help="Write a universe report (four figures for all tickers) to DIR")
+    backtest.add_argument("--drill-down", nargs="+", type=str.upper, metavar="TICKER",
+                          help="With --report, also write the per-ticker charts of these tickers")
+    backtest.add_argument("--export", metavar="DIR",
+                          help="Append trades, equity curves and metrics to Parquet datasets in DIR (needs pyarrow)")
+    backtest.add_argument("--run-id", help="Run partition for --export (default: the current date and time)")
+    backtest.set_defaults(handler=command_backtest)
+
+    paper = subparsers.add_parser("paper", parents=[common, risk],
+                                  help="Paper-trade the tickers on a replayed or live bar feed")
+    paper.add_argument("--interval", default=DEFAULT_INTERVAL, choices=list(PERIODS_PER_YEAR),
+                       help=f"Bar size (default {DEFAULT_INTERVAL})")
+    paper.add_argument("--replay", metavar="DIR",
+                       help="Replay bars from a BarStore in DIR (default: replay downloaded history)")
+    paper.add_argument("--replay-delay", type=float, default=0.0, metavar="SECONDS",
+                       help="Replay one tick every SECONDS of wall-clock time, like a live feed "
+                            "(default 0: as fast as the trader keeps up)")
+    paper.add_argument("--live", action="store_true", help="Trade new bars polled from yfinance until interrupted")
+    paper.add_argument("--poll-seconds", type=float, default=60, help="Seconds between live polls (default 60)")
+    paper.add_argument("--queue-size", type=int, default=64,
+                       help="Ticks the feed may run ahead before it has to wait (default 64)")
+    paper.add_argument("--max-ticks", type=int, help="Stop after this many ticks")
+    paper.set_defaults(handler=command_paper)
+
+    rotate = subparsers.add_parser("rotate", parents=[common],
+                                   help="Backtest holding the universe's top-K technical scores")
+    rotate.add_argument("--start", default="2020-01-01", help="Start date (default 2020-01-01)")
+    rotate.add_argument("--end", default="2024-01-01", help="End date (default 2024-01-01)")
+    rotate.add_argument("--capital", type=float, default=10000, help="Initial capital (default 10000)")
+    rotate.add_argument("--top", type=int, default=20, help="Names held at a time (default 20)")
+    rotate.add_argument("--rebalance", type=int, default=5, help="Bars between rebalances (default 5)")
+    rotate.add_argument("--cost-bps", type=float, default=10, help="Trading cost in basis points (default 10)")
+    rotate.add_argument("--max-correlation", type=float,
+                        help="Skip names correlated above this with a higher-ranked holding (e.g. 0.8)")
+    rotate.add_argument("--max-vol", type=float,
+                        help="Scale into cash above this annualized portfolio volatility (e.g. 0.15)")
+    rotate.add_argument("--risk-window", type=int, default=RISK_WINDOW,
+                        help=f"Bars in the rolling covariance window (default {RISK_WINDOW})")
+    rotate.add_argument("--holdings", action="store_true", help="Also print the holdings of every rebalance")
+    rotate.set_defaults(handler=command_rotate)
+
+    serve = subparsers.add_parser("serve", help="Run a warm local analysis server for client.py")
+    serve.add_argument("--host", default=SERVER_HOST, help=f"Interface to listen on (default {SERVER_HOST})")
+    serve.add_argument("--port", type=int, default=SERVER_PORT, help=f"TCP port (default {SERVER_PORT})")
+    serve.add_argument("-w", "--workers", type=int, default=8, help="Worker threads shared by requests (default 8)")
+    serve.add_argument("--cache-dir", help="Directory for cached market data downloads")
+    serve.add_argument("--refresh-workers", type=int, default=0, metavar="N",
+                       help="Serve expired data while N threads refresh it in the background (default off)")
+    serve.add_argument("--watchlist", nargs="+", type=str.upper, metavar="TICKER",
+                       help="Tickers refreshed before all others")
+    serve.add_argument("--poll-seconds", type=float,
+                       help="Refresh stale watchlist data this often, before anyone asks for it")
+    serve.add_argument("-q", "--quiet", action="store_true", help="Suppress the request log on stderr")
+    serve.set_defaults(handler=command_serve)
+
+    shard_common = argparse.ArgumentParser(add_help=False)
+    shard_common.add_argument("job_dir", help="Job directory shared by all workers")
+    shard_common.add_argument("--cache-dir", help="Directory for cached market data downloads")
+    shard_common.add_argument("--panel", metavar="DIR", help="Read price histories from a memory-mapped panel")
+    shard_common.add_argument("-q", "--quiet", action="store_true", help="Suppress progress output on stderr")
+
+    shard = subparsers.add_parser("shard", help="Split a universe into shards that workers on several machines run")
+    shard.set_defaults(handler=command_shard)
+    shard_actions = shard.add_subparsers(dest="action", required=True)
+
+    shard_init = shard_actions.add_parser("init", parents=[shard_common], help="Define a job and queue its shards")
+    shard_init.add_argument("tickers", nargs="*", help="Ticker symbols (default: read from --file or stdin)")
+    shard_init.add_argument("-f", "--file", help="File with ticker symbols ('-' for stdin)")
+    shard_init.add_argument("--kind", default="backtest", choices=["backtest", "analyze"],
+                            help="Risk-parameter sweep per ticker, or score each ticker (default backtest)")
+    shard_init.add_argument("--start", default="2020-01-01", help="Start date (default 2020-01-01)")
+    shard_init.add_argument("--end", default="2024-01-01", help="End date (default 2024-01-01)")
+    shard_init.add_argument("--capital", type=float, default=10000, help="Initial capital (default 10000)")
+    shard_init.add_argument("--interval", default=DEFAULT_INTERVAL, choices=list(PERIODS_PER_YEAR),
+                            help=f"Bar size (default {DEFAULT_INTERVAL})")
+    shard_init.add_argument("--stop-loss", type=float, nargs="+", default=[0.07], help="Stop-loss fractions to sweep")
+    shard_init.add_argument("--max-position", type=float, nargs="+", default=[1.0],
+                            help="Max position fractions to sweep")
+    shard_init.add_argument("--daily-loss-limit", type=float, nargs="+", default=[0.10],
+                            help="Daily loss limits to sweep")
+    shard_init.add_argument("--shard-size", type=int, default=50, help="Tickers per shard (default 50)")
+    shard_init.add_argument("--param-chunk", type=int, help="Parameter sets per shard (default: the whole grid)")
+    shard_init.add_argument("--max-attempts", type=int, default=3, help="Tries per shard before it fails (default 3)")
+
+    shard_work = shard_actions.add_parser("work", parents=[shard_common], help="Run shards until the queue is empty")
+    shard_work.add_argument("-w", "--workers", type=int, default=1, help="Worker processes on this machine (default 1)")
+    shard_work.add_argument("--worker-id", help="Name recorded in the queue (single worker only)")
+    shard_work.add_argument("--lease", type=float, default=300,
+                            help="Seconds before a crashed worker's shard is retried (default 300)")
+    shard_work.add_argument("--max-shards", type=int, help="Stop each worker after this many shards")
+
+    shard_status = shard_actions.add_parser("status", parents=[shard_common], help="Show shard counts and failures")
+    shard_status.add_argument("--retry-failed", action="store_true", help="Requeue shards that ran out of attempts")
+
+    shard_merge = shard_actions.add_parser("merge", parents=[shard_common],
+                                           help="Combine the finished shards into one result set")
+    shard_merge.add_argument("-o", "--output", metavar="CSV", help="Write a CSV file instead of JSON lines")
+
+    sectors = subparsers.add_parser("sectors", help="Rank a universe's fundamentals within each sector")
+    sectors.add_argument("output", help="File to save the sector-relative scorer to (used with --relative)")
+    sectors.add_argument("tickers", nargs="*", help="Ticker symbols (default: read from --file or stdin)")
+    sectors.add_argument("-f", "--file", help="File with ticker symbols ('-' for stdin)")
+    sectors.add_argument("-w", "--workers", type=int, default=8, help="Download threads (default 8)")
+    sectors.add_argument("--cache-dir", help="Directory for cached market data downloads")
+    sectors.add_argument("--min-peers", type=int, default=RELATIVE_MIN_PEERS,
+                         help=f"Peers a sector needs to be ranked on its own (default {RELATIVE_MIN_PEERS})")
+    sectors.add_argument("-q", "--quiet", action="store_true", help="Suppress progress output on stderr")
+    sectors.set_defaults(handler=command_sectors)
+
+    panel = subparsers.add_parser("panel", help="Store a universe's price histories as a memory-mapped panel")
+    panel.set_defaults(handler=command_panel)
+    panel_actions = panel.add_subparsers(dest="action", required=True)
+
+    panel_build = panel_actions.add_parser("build", help="Fetch the tickers and write (or replace) the panel")
+    panel_build.add_argument("panel_dir", help="Panel directory")
+    panel_build.add_argument("tickers", nargs="*", help="Ticker symbols (default: read from --file or stdin)")
+    panel_build.add_argument("-f", "--file", help="File with ticker symbols ('-' for stdin)")
+    panel_build.add_argument("-w", "--workers", type=int, default=8, help="Download threads (default 8)")
+    panel_build.add_argument("--cache-dir", help="Directory for cached market data downloads")
+    panel_build.add_argument("--period", default="10y", help="History to store (default 10y)")
+    panel_build.add_argument("--interval", default=DEFAULT_INTERVAL, choices=list(PERIODS_PER_YEAR),
+                             help=f"Bar size (default {DEFAULT_INTERVAL})")
+    panel_build.add_argument("-q", "--quiet", action="store_true", help="Suppress progress output on stderr")
+
+    panel_info = panel_actions.add_parser("info", help="Show what a panel holds")
+    panel_info.add_argument("panel_dir", help="Panel directory")
+    panel_info.add_argument("-q", "--quiet", action="store_true", help="Suppress progress output on stderr")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if getattr(args, "cache_dir", None):
+        set_cache_dir(args.cache_dir)
+    if getattr(args, "panel", None):
+        set_panel(args.panel)
+    if getattr(args, "relative", None):
+        set_relative_scorer(args.relative)
+    if getattr(args, "indicator_store", None):
+        set_indicator_store(args.indicator_store)
+
+    # Keep stdout clean for JSON lines; the analysis code prints its progress
+    out = sys.stdout
+    log = open(os.devnull, "w") if args.quiet else sys.stderr
+
+    try:
+        with contextlib.redirect_stdout(log):
+            args.handler(args, out)
+    except BrokenPipeError:
+        # Downstream consumer (e.g. `head`) closed the pipe early; point stdout
+        # at devnull so the interpreter does not complain again on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
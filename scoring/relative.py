@@ -0,0 +1,249 @@
+"""
+Sector-relative fundamental scoring
+
+score_peg_ratio, score_operating_margin and score_debt_to_equity compare a
+ticker with the fixed cutoffs in SCORE_RANGES, which misjudges whole sectors:
+utilities carry more debt than software companies, and retailers run thinner
+margins. SectorRelativeScorer scores those three metrics against a ticker's
+sector peers instead.
+
+It is built from a fundamentals snapshot of a universe (one row per ticker,
+see fundamentals_snapshot). One groupby pass ranks every metric within each
+sector as a percentile, and the percentile bands in
+RELATIVE_SCORE_PERCENTILES map onto the usual 1-5 points (top 20% of the
+sector gets 5). Sectors with fewer than RELATIVE_MIN_PEERS valid values are
+ranked against the whole universe instead.
+
+The scorer keeps each sector's sorted metric values and medians, so scoring
+one ticker at analyze_stock() time is a binary search, not a universe
+recompute. Enable it with set_relative_scorer(); missing or invalid values
+(no PEG, negative debt-to-equity) keep their absolute score.
+"""
+
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data.data_fetcher import fetch_fundamentals
+from config import RELATIVE_SCORE_PERCENTILES, RELATIVE_MIN_PEERS
+
+# Metric -> (indicator in the scores dictionary, higher is better)
+RELATIVE_METRICS = {
+    'peg_ratio': ('1. PEG Ratio', False),
+    'operating_margin': ('2. Operating Margin', True),
+    'debt_to_equity': ('6. Debt-to-Equity', False),
+}
+
+# Sector of tickers yfinance has no sector for
+UNKNOWN_SECTOR = 'Unknown'
+
+_relative_scorer = None
+
+
+def set_relative_scorer(scorer):
+    """
+    Score PEG, operating margin and debt-to-equity against sector peers
+
+    Args:
+        scorer: SectorRelativeScorer, path of a saved one, or None for the absolute cutoffs
+    """
+    global _relative_scorer
+    if isinstance(scorer, str):
+        scorer = SectorRelativeScorer.load(scorer)
+    _relative_scorer = scorer
+
+
+def get_relative_scorer():
+    """Return the active SectorRelativeScorer (None when disabled)"""
+    return _relative_scorer
+
+
+def _valid_values(frame):
+    """Metric columns as floats, NaN where a value cannot be ranked"""
+    values = frame.reindex(columns=list(RELATIVE_METRICS)).apply(pd.to_numeric, errors='coerce')
+    # Same rules as the absolute scorers: PEG needs to be positive, debt-to-equity not negative
+    values['peg_ratio'] = values['peg_ratio'].where(values['peg_ratio'] > 0)
+    values['debt_to_equity'] = values['debt_to_equity'].where(values['debt_to_equity'] >= 0)
+    return values
+
+
+def _valid_value(metric, value):
+    """One value as a float, None where it cannot be ranked (the rules of _valid_values)"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if np.isnan(value) or (metric == 'peg_ratio' and value <= 0) or (metric == 'debt_to_equity' and value < 0):
+        return None
+    return value
+
+
+def _sectors(frame):
+    if 'sector' not in frame.columns:
+        return pd.Series(UNKNOWN_SECTOR, index=frame.index)
+    return frame['sector'].fillna(UNKNOWN_SECTOR).replace('', UNKNOWN_SECTOR)
+
+
+def percentile_points(percentiles):
+    """
+    Map percentiles (0-1, higher is better) onto 1-5 points
+
+    Returns:
+        Array of points (NaN where the percentile is NaN)
+    """
+    percentiles = np.asarray(percentiles, dtype=float)
+    points = np.searchsorted(RELATIVE_SCORE_PERCENTILES, percentiles, side='left') + 1.0
+    return np.where(np.isnan(percentiles), np.nan, points)
+
+
+class SectorRelativeScorer:
+    def __init__(self, snapshot, min_peers=RELATIVE_MIN_PEERS):
+        """
+        Rank a universe's fundamentals within each sector
+
+        Args:
+            snapshot: DataFrame indexed by ticker with a 'sector' column and
+                the RELATIVE_METRICS columns (from fundamentals_snapshot)
+            min_peers: Valid values a sector needs to be ranked on its own
+        """
+        self.min_peers = min_peers
+        self.created_at = time.time()
+        values = _valid_values(snapshot)
+        sectors = _sectors(snapshot)
+
+        # One groupby pass: ascending percentile ranks and valid counts within each sector
+        grouped = values.groupby(sectors)
+        sector_ranks = grouped.rank(pct=True)
+        sector_counts = grouped.transform('count')
+        universe_ranks = values.rank(pct=True)
+        universe_counts = values.count()
+
+        use_sector = sector_counts >= min_peers
+        counts = sector_counts.where(use_sector, universe_counts, axis=1)
+        ranks = sector_ranks.where(use_sector, universe_ranks)
+        for metric, (_, higher_is_better) in RELATIVE_METRICS.items():
+            if not higher_is_better:
+                # Average rank counted from the other end: pct' = (n + 1) / n - pct
+                ranks[metric] = (counts[metric] + 1) / counts[metric] - ranks[metric]
+
+        self.percentiles = ranks
+        self.points = pd.DataFrame(percentile_points(ranks), index=ranks.index, columns=ranks.columns)
+        self.values = values
+        self.medians = grouped.median()
+        self.counts = grouped.count()
+
+        # Sorted values per sector (and for the universe) for single-ticker lookups
+        self._sorted = {
+            sector: {metric: np.sort(group[metric].dropna().to_numpy()) for metric in RELATIVE_METRICS}
+            for sector, group in grouped
+        }
+        self._universe = {metric: np.sort(values[metric].dropna().to_numpy()) for metric in RELATIVE_METRICS}
+
+    def _peers(self, sector, metric):
+        peers = self._sorted.get(sector, {}).get(metric)
+        if peers is None or len(peers) < self.min_peers:
+            return self._universe[metric]
+        return peers
+
+    def percentile(self, metric, value, sector=None, in_snapshot=False):
+        """
+        Percentile (0-1, higher is better) of a value among its sector peers
+
+        Args:
+            metric: Key of RELATIVE_METRICS
+            value: The ticker's value
+            sector: The ticker's sector (None ranks against the universe)
+            in_snapshot: True when the value is one of the peers already;
+                otherwise it is ranked as if added to them
+
+        Returns:
+            Average-rank percentile as in DataFrame.rank(pct=True), NaN if
+            there are no peers
+        """
+        peers = self._peers(sector if isinstance(sector, str) and sector else UNKNOWN_SECTOR, metric)
+        extra = 0 if in_snapshot else 1
+        count = len(peers) + extra
+        if count == 0:
+            return float('nan')
+        left = np.searchsorted(peers, value, side='left')
+        right = np.searchsorted(peers, value, side='right') + extra
+        rank = (left + 1 + right) / 2
+        if not RELATIVE_METRICS[metric][1]:
+            rank = count + 1 - rank
+        return rank / count
+
+    def score(self, fundamentals):
+        """
+        Relative scores of one ticker
+
+        Args:
+            fundamentals: Dictionary from fetch_fundamentals()
+
+        Returns:
+            Dictionary of indicator name -> points for the metrics that have a
+            valid value (the others keep their absolute score)
+        """
+        ticker = fundamentals.get('ticker')
+        sector = fundamentals.get('sector')
+        scores = {}
+        for metric, (indicator, _) in RELATIVE_METRICS.items():
+            value = _valid_value(metric, fundamentals.get(metric))
+            if value is None:
+                continue
+            if ticker in self.points.index and self.values.at[ticker, metric] == value:
+                scores[indicator] = int(self.points.at[ticker, metric])
+                continue
+            percentile = self.percentile(metric, value, sector)
+            if not np.isnan(percentile):
+                scores[indicator] = int(percentile_points(percentile))
+        return scores
+
+    def sector_table(self):
+        """
+        Returns:
+            DataFrame, one row per sector, with the peer count and median of each metric
+        """
+        table = self.medians.add_suffix('_median').join(self.counts.add_suffix('_count'))
+        return table.sort_index()
+
+    def save(self, path):
+        """Write the scorer to a file (atomically)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        """Read a scorer written by save()"""
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def fundamentals_snapshot(tickers, workers=8):
+    """
+    Fetch the fundamentals of a universe into one table
+
+    Args:
+        tickers: List of stock symbols
+        workers: Download threads
+
+    Returns:
+        DataFrame indexed by ticker, one column per fundamentals field
+        (tickers without fundamentals are left out)
+    """
+    rows = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for ticker, fundamentals in zip(tickers, executor.map(fetch_fundamentals, tickers)):
+            if not fundamentals:
+                print(f"Error: No fundamentals available for {ticker}")
+                continue
+            rows[ticker] = fundamentals
+    return pd.DataFrame.from_dict(rows, orient='index')
+
@@ -0,0 +1,318 @@
+"""
+Warm local analysis server
+
+Every run of main.py pays for interpreter startup, importing pandas, yfinance
+and matplotlib, and cold downloads. AnalysisServer is a long-running process
+that loads everything once and keeps price histories, fundamentals, quarterly
+statements and the VIX in an in-memory TTL cache (data.memory_cache), so an
+ad-hoc query only pays for the work that is actually new.
+
+With a data.refresher.BackgroundRefresher, expired data is served
+stale-while-revalidate instead: a request gets the stored value right away
+and the refresh runs in the background, so request latency does not jump
+each time a TTL runs out.
+
+It listens on localhost only and speaks JSON over HTTP:
+
+    GET  /health     uptime and cache counters
+    GET  /stats      per-endpoint latency percentiles, cache and refresher counters
+    POST /analyze    {"tickers": [...]}
+    POST /screen     {"tickers": [...], "min_recommendation": "buy" | "min_score": 30, "full": false}
+    POST /backtest   {"tickers": [...], "start": "2020-01-01", "end": "2024-01-01", ...}
+
+Requests are served concurrently (one thread per connection). Within a request
+the tickers are processed by a shared worker pool, which also bounds the total
+load across requests. Every response carries its server-side latency_ms.
+Malformed bodies and invalid parameters are answered with 400, anything that
+fails while serving a valid request with 500.
+client.py is a dependency-free command-line client.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from analysis.analyzer import analyze_stock, screen_stock, ScreeningStats
+from backtest.backtester import Backtester
+from data.data_fetcher import set_memory_cache, set_refresher
+from data.memory_cache import TTLCache
+from indicators.technical import calculate_vix
+from utils.helpers import to_serializable
+from config import RECOMMENDATION_THRESHOLDS, SERVER_HOST, SERVER_PORT, SERVER_CACHE_TTL
+
+# Latency samples kept per endpoint for percentiles
+MAX_LATENCY_SAMPLES = 10000
+
+
+class BadRequest(ValueError):
+    """A request the client has to fix (answered with 400; anything else raised is a 500)"""
+
+
+class LatencyStats:
+    """Thread-safe per-endpoint request latencies"""
+
+    def __init__(self, max_samples=MAX_LATENCY_SAMPLES):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self._samples = {}
+        self._counts = {}
+        self._errors = {}
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            if endpoint not in self._samples:
+                self._samples[endpoint] = deque(maxlen=self._max_samples)
+                self._counts[endpoint] = 0
+                self._errors[endpoint] = 0
+            self._samples[endpoint].append(seconds * 1000)
+            self._counts[endpoint] += 1
+            if error:
+                self._errors[endpoint] += 1
+
+    def as_dict(self):
+        """
+        Returns:
+            Dictionary of endpoint -> request count, errors and latency percentiles (ms)
+        """
+        with self._lock:
+            report = {}
+            for endpoint, samples in self._samples.items():
+                values = np.array(samples)
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                report[endpoint] = {
+                    'requests': self._counts[endpoint],
+                    'errors': self._errors[endpoint],
+                    'p50_ms': float(p50),
+                    'p95_ms': float(p95),
+                    'p99_ms': float(p99),
+                    'max_ms': float(values.max()),
+                }
+            return report
+
+
+class AnalysisServer:
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, workers=8, cache_ttl=None, max_entries=10000,
+                 refresher=None):
+        """
+        Set up the server (call serve_forever() to start it)
+
+        Args:
+            host: Interface to listen on (keep it on localhost; there is no authentication)
+            port: TCP port
+            workers: Threads shared by all requests for per-ticker work
+            cache_ttl: Dict of lifetimes in seconds per kind of download
+                (default SERVER_CACHE_TTL in config.py)
+            max_entries: In-memory cache size
+            refresher: Optional data.refresher.BackgroundRefresher serving
+                downloads stale-while-revalidate (in place of the TTL cache)
+        """
+        cache_ttl = dict(SERVER_CACHE_TTL, **(cache_ttl or {}))
+        self.cache = TTLCache(ttl_seconds=cache_ttl['prices'], max_entries=max_entries, kind_ttls=cache_ttl)
+        set_memory_cache(self.cache)
+        self.refresher = refresher
+        set_refresher(refresher)
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.latency = LatencyStats()
+        self.started = time.time()
+
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/stats'): self.stats,
+            ('POST', '/analyze'): self.analyze,
+            ('POST', '/screen'): self.screen,
+            ('POST', '/backtest'): self.backtest,
+        }
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self):
+        """(host, port) the server is bound to"""
+        return self.httpd.server_address
+
+    def serve_forever(self):
+        """Handle requests until shutdown() is called (or the process is interrupted)"""
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+            self.executor.shutdown(wait=False)
+            set_memory_cache(None)
+            if self.refresher is not None:
+                set_refresher(None)
+                self.refresher.stop()
+
+    def shutdown(self):
+        """Stop serve_forever() (call from another thread)"""
+        self.httpd.shutdown()
+
+    def vix(self):
+        """Current VIX from the cache (refreshed after its TTL)"""
+        if self.refresher is not None:
+            return self.refresher.get(('vix',), calculate_vix)
+        return self.cache.get_or_compute(('vix',), calculate_vix)
+
+    def health(self, payload):
+        return {'status': 'ok', 'uptime_seconds': time.time() - self.started, 'cache': self.cache.stats()}
+
+    def stats(self, payload):
+        report = {
+            'uptime_seconds': time.time() - self.started,
+            'endpoints': self.latency.as_dict(),
+            'cache': self.cache.stats(),
+        }
+        if self.refresher is not None:
+            report['refresher'] = self.refresher.stats()
+        return report
+
+    def analyze(self, payload):
+        tickers = _tickers(payload)
+        vix = self.vix()
+
+        def run(ticker):
+            return analyze_stock(ticker, vix=vix) or {'ticker': ticker, 'error': 'no price data'}
+
+        return {'results': list(self.executor.map(run, tickers))}
+
+    def screen(self, payload):
+        tickers = _tickers(payload)
+        if payload.get('min_score') is not None:
+            threshold = _number(payload, 'min_score', None)
+        else:
+            level = payload.get('min_recommendation', 'buy')
+            if not isinstance(level, str) or level not in RECOMMENDATION_THRESHOLDS:
+                raise BadRequest(f"min_recommendation must be one of {', '.join(RECOMMENDATION_THRESHOLDS)}")
+            threshold = RECOMMENDATION_THRESHOLDS[level]
+        vix = self.vix()
+        stats = ScreeningStats()
+
+        def run(ticker):
+            if payload.get('full'):
+                return analyze_stock(ticker, vix=vix) or {'ticker': ticker, 'error': 'no price data'}
+            return screen_stock(ticker, threshold, vix=vix, stats=stats)
+
+        results = [r for r in self.executor.map(run, tickers)
+                   if r is not None and ('error' in r or r['total_score'] >= threshold)]
+        return {'results': results, 'screening': stats.as_dict()}
+
+    def backtest(self, payload):
+        tickers = _tickers(payload)
+        params = {
+            'start_date': _date(payload, 'start', '2020-01-01'),
+            'end_date': _date(payload, 'end', '2024-01-01'),
+            'initial_capital': _number(payload, 'capital', 10000),
+            'stop_loss_pct': _number(payload, 'stop_loss', 0.07),
+            'max_position_pct': _number(payload, 'max_position', 1.0),
+            'daily_loss_limit_pct': _number(payload, 'daily_loss_limit', 0.10),
+        }
+
+        def run(ticker):
+            backtester = Backtester(ticker=ticker, **params)
+            result = backtester.run(verbose=False)
+            if result is None:
+                return {'ticker': ticker, 'error': 'no trades executed'}
+            if not payload.get('equity_curve'):
+                result.pop('equity_curve', None)
+            return result
+
+        return {'results': list(self.executor.map(run, tickers))}
+
+
+def _tickers(payload):
+    """Ticker list of a request, upper-cased"""
+    tickers = payload.get('tickers') or []
+    if isinstance(tickers, str):
+        tickers = tickers.replace(",", " ").split()
+    if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+        raise BadRequest("tickers must be a list of symbols or a comma-separated string")
+    return [t.strip().upper() for t in tickers]
+
+
+def _number(payload, name, default):
+    """Numeric request parameter"""
+    value = payload.get(name, default)
+    if isinstance(value, bool):
+        raise BadRequest(f"{name} must be a number")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"{name} must be a number") from None
+
+
+def _date(payload, name, default):
+    """Date request parameter (kept as given once it parses)"""
+    value = payload.get(name, default)
+    try:
+        valid = isinstance(value, str) and pd.Timestamp(value) is not pd.NaT
+    except ValueError:
+        valid = False
+    if not valid:
+        raise BadRequest(f"{name} must be a date such as 2020-01-01")
+    return value
+
+
+def _make_handler(server):
+    """Request handler class bound to an AnalysisServer"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self, status, body):
+            data = json.dumps(to_serializable(body)).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _payload(self):
+            try:
+                length = max(0, int(self.headers.get("Content-Length") or 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                raise BadRequest(f"body is not JSON ({e})") from None
+            if not isinstance(payload, dict):
+                raise BadRequest("body must be a JSON object")
+            return payload
+
+        def _dispatch(self, method):
+            started = time.perf_counter()
+            path = self.path.split("?", 1)[0].rstrip("/") or "/"
+            route = server.routes.get((method, path))
+            if route is None:
+                self._respond(404, {'error': f"unknown endpoint {method} {path}"})
+                return
+
+            error = False
+            try:
+                payload = self._payload() if method == 'POST' else {}
+                body, status = route(payload), 200
+            except BadRequest as e:
+                body, status, error = {'error': f"bad request: {e}"}, 400, True
+            except Exception as e:
+                # Failures inside the analysis code are the server's, not the request's
+                body, status, error = {'error': f"internal error: {e}"}, 500, True
+
+            elapsed = time.perf_counter() - started
+            server.latency.record(path, elapsed, error)
+            body['latency_ms'] = elapsed * 1000
+            self._respond(status, body)
+
+        def do_GET(self):
+            self._dispatch('GET')
+
+        def do_POST(self):
+            self._dispatch('POST')
+
+        def log_message(self, format, *args):
+            # Request log goes wherever progress output goes (stderr, or nowhere with --quiet)
+            print(f"{self.address_string()} - {format % args}")
+
+    return Handler
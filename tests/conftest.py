@@ -0,0 +1,50 @@
+"""
+Shared fixtures: synthetic price histories served through the download cache
+
+The tests never touch the network. Price histories are random walks with
+alternating up and down trends (so the strategy trades), and price_cache
+writes them where fetch_stock_data() looks for cached downloads.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data import data_fetcher
+
+
+def synthetic_prices(bars=1500, seed=0, start="2015-01-01", freq="B", tz=None):
+    """
+    Random-walk OHLCV history with trending stretches
+
+    Returns:
+        DataFrame with Open, High, Low, Close and Volume columns
+    """
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.choice([-0.002, 0.0015], size=bars // 100 + 1), 100)[:bars]
+    close = 50 * np.exp(np.cumsum(drift + rng.normal(0, 0.015, bars)))
+    volume = rng.lognormal(14, 0.4, bars).round()
+    index = pd.date_range(start, periods=bars, freq=freq, tz=tz)
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+                         'Close': close, 'Volume': volume}, index=index)
+
+
+@pytest.fixture
+def price_cache(tmp_path):
+    """
+    Serve synthetic histories to fetch_stock_data() from a temporary cache
+
+    Returns:
+        Function(ticker, frame=None, period="10y", interval="1d") that caches
+        frame (a synthetic history seeded from the ticker when None) and returns it
+    """
+    data_fetcher.set_cache_dir(str(tmp_path / "cache"))
+
+    def add(ticker, frame=None, period="10y", interval="1d"):
+        if frame is None:
+            frame = synthetic_prices(seed=sum(map(ord, ticker)))
+        data_fetcher._write_cache(data_fetcher._cache_path("prices", ticker, period, interval), frame)
+        return frame
+
+    yield add
+    data_fetcher.set_cache_dir(None)
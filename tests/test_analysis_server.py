@@ -0,0 +1,73 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from server import analysis_server
+from server.analysis_server import AnalysisServer
+
+
+@pytest.fixture
+def server(price_cache):
+    price_cache("AAA")
+    server = AnalysisServer(port=0, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join(5)
+
+
+def _post(server, path, body):
+    host, port = server.address
+    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+    request = urllib.request.Request(f"http://{host}:{port}{path}", data=data, method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_backtest_endpoint(server):
+    status, body = _post(server, "/backtest", {'tickers': ["aaa"], 'start': "2016-01-01", 'end': "2020-12-31"})
+
+    assert status == 200
+    assert body['results'][0]['ticker'] == "AAA"
+    assert body['results'][0]['metrics']['num_trades'] > 0
+    assert 'equity_curve' not in body['results'][0]
+
+
+@pytest.mark.parametrize("body", [
+    b"not json",
+    b"[1, 2]",
+    {'tickers': 5},
+    {'tickers': ["AAA"], 'stop_loss': "tight"},
+    {'tickers': ["AAA"], 'start': "someday"},
+])
+def test_invalid_requests_are_400(server, body):
+    status, response = _post(server, "/backtest", body)
+
+    assert status == 400
+    assert response['error'].startswith("bad request")
+
+
+def test_invalid_recommendation_is_400(server):
+    status, _ = _post(server, "/screen", {'tickers': ["AAA"], 'min_recommendation': "moon"})
+
+    assert status == 400
+
+
+def test_errors_inside_handlers_are_500(server, monkeypatch):
+    def broken(self, verbose=True):
+        raise KeyError('Close')
+    monkeypatch.setattr(analysis_server.Backtester, "run", broken)
+
+    status, response = _post(server, "/backtest", {'tickers': ["AAA"]})
+
+    assert status == 500
+    assert response['error'].startswith("internal error")
+    assert server.latency.as_dict()['/backtest']['errors'] == 1
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from backtest.backtester import Backtester
+from data.bars import BarData, BUY, HOLD, SELL, encode_signals, decode_signals
+from conftest import synthetic_prices
+
+
+def test_signal_codes_round_trip():
+    signals = np.array(['BUY', 'HOLD', 'SELL', 'HOLD', 'BUY'], dtype=object)
+
+    codes = encode_signals(signals)
+
+    assert codes.dtype == np.int8
+    assert codes.tolist() == [BUY, HOLD, SELL, HOLD, BUY]
+    assert decode_signals(codes).tolist() == signals.tolist()
+
+
+def test_from_frame_keeps_index_and_time_zone():
+    frame = synthetic_prices(bars=300, tz="America/New_York")
+
+    bars = BarData.from_frame(frame)
+
+    assert bars.timestamps.dtype == np.int64
+    pd.testing.assert_index_equal(bars.index, frame.index.as_unit('ns'), check_names=False)
+    np.testing.assert_array_equal(bars.close, frame['Close'].to_numpy())
+
+
+def test_float32_storage_halves_price_memory():
+    frame = synthetic_prices(bars=300)
+
+    wide = BarData.from_frame(frame)
+    narrow = BarData.from_frame(frame, dtype=np.float32)
+
+    assert narrow.close.nbytes * 2 == wide.close.nbytes
+    assert narrow.volume.nbytes * 2 == wide.volume.nbytes
+
+
+def test_slice_is_a_view_including_the_end_date():
+    bars = BarData.from_frame(synthetic_prices(bars=300))
+
+    part = bars.slice("2015-02-02", "2015-03-02")
+
+    assert part.index[0] == pd.Timestamp("2015-02-02")
+    assert part.index[-1] == pd.Timestamp("2015-03-02")
+    assert np.shares_memory(part.close, bars.close)
+
+
+def test_signal_codes_match_string_signals():
+    frame = synthetic_prices()
+    backtester = Backtester("AAA", "2015-01-01", "2020-12-31")
+
+    codes = backtester.generate_signal_codes(BarData.from_frame(frame))
+    strings = backtester.generate_signals(frame[['Close', 'Volume']].copy())['Signal']
+
+    assert codes.dtype == np.int8
+    np.testing.assert_array_equal(codes, encode_signals(strings))
+
+
+def test_simulation_on_bars_matches_dataframe():
+    frame = synthetic_prices()
+    from_frame = Backtester("AAA", "2015-01-01", "2020-12-31")
+    from_bars = Backtester("AAA", "2015-01-01", "2020-12-31")
+    signals = from_frame.generate_signals(frame[['Close', 'Volume']].copy())
+    bars = BarData.from_frame(frame)
+    bars.signals = from_bars.generate_signal_codes(bars)
+
+    final_frame = from_frame.simulate_trades(signals, verbose=False)
+    final_bars = from_bars.simulate_trades(bars, verbose=False)
+
+    assert final_bars == final_frame
+    assert len(from_bars.trades) > 0
+    assert from_bars.trades == from_frame.trades
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from backtest.backtester import Backtester
+from backtest.batch_simulator import make_param_grid, simulate_batch, run_parameter_sweep
+from data.bars import BarData
+from conftest import synthetic_prices
+
+GRID = make_param_grid([0.03, 0.07, 0.5], [0.5, 1.0], [0.02, 0.10])
+
+def _bars():
+    bars = BarData.from_frame(synthetic_prices())
+    bars.signals = Backtester("AAA", "2015-01-01", "2020-12-31").generate_signal_codes(bars)
+    return bars
+
+
+def _single_run(bars, stop_loss, max_position, daily_limit):
+    backtester = Backtester("AAA", "2015-01-01", "2020-12-31", stop_loss_pct=stop_loss,
+                            max_position_pct=max_position, daily_loss_limit_pct=daily_limit)
+    backtester.simulate_trades(bars, verbose=False)
+    return backtester.calculate_metrics()
+
+
+@pytest.mark.parametrize("backend", ['numpy', 'numba'])
+def test_batch_matches_single_runs(backend):
+    if backend == 'numba':
+        pytest.importorskip("numba")
+    bars = _bars()
+
+    result = simulate_batch(bars, *GRID, backend=backend)
+
+    assert len(result['final_value']) == len(GRID[0])
+    for i, params in enumerate(zip(*GRID)):
+        metrics = _single_run(bars, *params)
+        assert result['final_value'][i] == metrics['final_value']
+        assert result['total_profit'][i] == pytest.approx(metrics['total_profit'])
+        assert result['num_trades'][i] == metrics['num_trades']
+        assert result['stop_loss_count'][i] == metrics['stop_loss_count']
+        assert result['win_rate'][i] == pytest.approx(metrics['win_rate'])
+        assert result['max_drawdown'][i] == pytest.approx(metrics['max_drawdown'])
+        assert result['sharpe_ratio'][i] == pytest.approx(metrics['sharpe_ratio'])
+
+
+def test_grid_covers_every_combination():
+    stop_loss, max_position, daily_limit = GRID
+
+    combos = set(zip(stop_loss, max_position, daily_limit))
+
+    assert len(combos) == len(stop_loss) == 3 * 2 * 2
+
+
+def test_sweep_sorts_by_the_requested_column(price_cache):
+    price_cache("AAA")
+
+    table = run_parameter_sweep(Backtester("AAA", "2016-01-01", "2020-12-31"),
+                                [0.05, 0.1], [1.0], [0.1], backend='numpy', sort_by='final_value')
+
+    assert len(table) == 2
+    assert np.all(np.diff(table['final_value'].to_numpy()) <= 0)
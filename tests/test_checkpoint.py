@@ -0,0 +1,67 @@
+import os
+
+from backtest.backtester import Backtester
+from backtest.checkpoint import run_incremental, load_checkpoint
+
+END_DATES = ["2018-01-01", "2018-01-10", "2019-06-01", "2020-09-30"]
+
+
+def _full_run(end_date, **params):
+    return Backtester("AAA", "2016-01-01", end_date, **params).run(verbose=False)
+
+
+def _assert_same(result, full):
+    assert result['metrics'] == full['metrics']
+    assert result['trades'] == full['trades']
+    assert result['equity_curve'] == full['equity_curve']
+
+
+def test_resumed_runs_match_full_runs(price_cache, tmp_path, capsys):
+    price_cache("AAA")
+    path = str(tmp_path / "AAA.pkl")
+
+    for end_date in END_DATES:
+        result = run_incremental(Backtester("AAA", "2016-01-01", end_date), path, verbose=False)
+        _assert_same(result, _full_run(end_date))
+
+    assert "re-running" not in capsys.readouterr().out
+    assert load_checkpoint(path)['bars_processed'] == len(Backtester("AAA", "2016-01-01", END_DATES[-1]).load_price_data())
+
+
+def test_changed_parameters_start_over(price_cache, tmp_path, capsys):
+    price_cache("AAA")
+    path = str(tmp_path / "AAA.pkl")
+    run_incremental(Backtester("AAA", "2016-01-01", "2018-01-01"), path, verbose=False)
+
+    result = run_incremental(Backtester("AAA", "2016-01-01", "2019-01-01", stop_loss_pct=0.03), path, verbose=False)
+
+    assert "different parameters" in capsys.readouterr().out
+    _assert_same(result, _full_run("2019-01-01", stop_loss_pct=0.03))
+
+
+def test_adjusted_history_starts_over(price_cache, tmp_path, capsys):
+    frame = price_cache("AAA")
+    path = str(tmp_path / "AAA.pkl")
+    run_incremental(Backtester("AAA", "2016-01-01", "2018-01-01"), path, verbose=False)
+
+    # A dividend adjustment scales every bar before the ex-date
+    adjusted = frame.copy()
+    adjusted.loc[:"2017-12-15", 'Close'] *= 0.98
+    price_cache("AAA", adjusted)
+    result = run_incremental(Backtester("AAA", "2016-01-01", "2019-01-01"), path, verbose=False)
+
+    assert "changed since the checkpoint" in capsys.readouterr().out
+    _assert_same(result, _full_run("2019-01-01"))
+
+
+def test_truncated_journal_starts_over(price_cache, tmp_path, capsys):
+    price_cache("AAA")
+    path = str(tmp_path / "AAA.pkl")
+    run_incremental(Backtester("AAA", "2016-01-01", "2018-01-01"), path, verbose=False)
+    with open(f"{path}.journal", "r+b") as f:
+        f.truncate(os.path.getsize(f"{path}.journal") // 2)
+
+    result = run_incremental(Backtester("AAA", "2016-01-01", "2019-01-01"), path, verbose=False)
+
+    assert "re-running from start" in capsys.readouterr().out
+    _assert_same(result, _full_run("2019-01-01"))
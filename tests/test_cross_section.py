@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from analysis.cross_section import top_k_mask, top_k_table
+
+
+def _scores(days=50, tickers=30, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(days, tickers))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    return pd.DataFrame(values, index=pd.date_range("2020-01-01", periods=days),
+                        columns=[f"T{i:02d}" for i in range(tickers)])
+
+
+def test_top_k_matches_sorting_each_day():
+    scores = _scores()
+
+    table = top_k_table(scores, 5)
+    mask = top_k_mask(scores, 5)
+
+    for date, row in scores.iterrows():
+        expected = list(row.dropna().sort_values(ascending=False).index[:5])
+        assert list(table.loc[date]) == expected
+        assert sorted(mask.columns[mask.loc[date].to_numpy()]) == sorted(expected)
+
+
+def test_missing_places_are_none():
+    scores = pd.DataFrame({'A': [1.0, np.nan], 'B': [2.0, np.nan], 'C': [np.nan, 3.0]},
+                          index=pd.date_range("2020-01-01", periods=2))
+
+    table = top_k_table(scores, 2)
+
+    assert table.loc["2020-01-01"].tolist() == ['B', 'A']
+    assert table.loc["2020-01-02"].tolist() == ['C', None]
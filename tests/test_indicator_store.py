@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from indicators.indicator_store import IndicatorStore, INDICATORS, compute_indicators, set_indicator_store
+from conftest import synthetic_prices
+
+CASES = [('ma', 50, 'Close'), ('ma', 200, 'Close'), ('rsi', 14, 'Close'), ('volume_ratio', 20, 'Volume')]
+
+
+def _assert_matches_recompute(store, series, indicator, period):
+    values = store.get("AAA", indicator, series, period)
+    expected = INDICATORS[indicator](series, period)
+    np.testing.assert_allclose(values.to_numpy(), expected.to_numpy(), rtol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("indicator, period, column", CASES)
+def test_appended_bars_match_full_recompute(tmp_path, indicator, period, column):
+    series = synthetic_prices()[column]
+    store = IndicatorStore(str(tmp_path))
+
+    for end in (600, 601, 750, 1500):
+        _assert_matches_recompute(store, series.iloc[:end], indicator, period)
+
+    assert store.stats()['bars_computed'] == 1500
+
+
+@pytest.mark.parametrize("indicator, period, column", CASES)
+def test_windows_in_any_order_match_full_recompute(tmp_path, indicator, period, column):
+    series = synthetic_prices()[column]
+    store = IndicatorStore(str(tmp_path))
+
+    for start, end in [(700, 1100), (200, 500), (1300, 1450), (400, 900), (50, 1500)]:
+        _assert_matches_recompute(store, series.iloc[start:end], indicator, period)
+    computed = store.stats()['bars_computed']
+    for start, end in [(700, 1100), (200, 500), (250, 1400)]:
+        _assert_matches_recompute(store, series.iloc[start:end], indicator, period)
+
+    # Earlier windows were merged, not overwritten, so the repeats came from disk
+    assert store.stats()['bars_computed'] == computed
+    assert store.stats()['invalidations'] == 0
+
+
+def test_disjoint_window_keeps_the_stored_one(tmp_path):
+    close = synthetic_prices()['Close']
+    store = IndicatorStore(str(tmp_path))
+    store.get("AAA", 'ma', close.iloc[:500], 50)
+
+    store.get("AAA", 'ma', close.iloc[900:1200], 50)
+    computed = store.stats()['bars_computed']
+    store.get("AAA", 'ma', close.iloc[:500], 50)
+
+    assert store.stats()['bars_computed'] == computed
+
+
+def test_revised_bars_are_recomputed(tmp_path):
+    close = synthetic_prices()['Close']
+    store = IndicatorStore(str(tmp_path))
+    store.get("AAA", 'rsi', close.iloc[:1000], 14)
+
+    # A split adjustment rewrites every earlier bar
+    adjusted = close.copy()
+    adjusted.iloc[:1200] /= 2
+    _assert_matches_recompute(store, adjusted.iloc[:1300], 'rsi', 14)
+    # A revised last bar
+    revised = adjusted.iloc[:1300].copy()
+    revised.iloc[-1] *= 1.01
+    _assert_matches_recompute(store, revised, 'rsi', 14)
+
+    assert store.stats()['invalidations'] == 2
+
+
+def test_store_survives_a_new_process(tmp_path):
+    close = synthetic_prices()['Close']
+    IndicatorStore(str(tmp_path)).get("AAA", 'ma', close.iloc[:1000], 50)
+
+    reopened = IndicatorStore(str(tmp_path))
+    _assert_matches_recompute(reopened, close.iloc[:1100], 'ma', 50)
+
+    assert reopened.stats()['bars_reused'] == 1000
+    assert reopened.stats()['bars_computed'] == 100
+
+
+def test_compute_indicators_uses_the_active_store(tmp_path):
+    prices = synthetic_prices()
+    set_indicator_store(str(tmp_path))
+    try:
+        stored = compute_indicators(prices['Close'], prices['Volume'], "AAA")
+        stored = compute_indicators(prices['Close'], prices['Volume'], "AAA")
+    finally:
+        set_indicator_store(None)
+    fresh = compute_indicators(prices['Close'], prices['Volume'])
+
+    for values, expected in zip(stored, fresh):
+        np.testing.assert_allclose(values.to_numpy(), expected.to_numpy(), rtol=1e-9, equal_nan=True)
@@ -0,0 +1,73 @@
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+import main
+from data import data_fetcher
+
+
+def test_stream_results_yields_every_ticker_once():
+    tickers = [f"T{i}" for i in range(25)]
+
+    def func(ticker):
+        if ticker == "T7":
+            raise ValueError("boom")
+        return {'ticker': ticker}
+
+    results = list(main.stream_results(func, tickers, workers=4))
+
+    assert sorted(r['ticker'] for r in results) == sorted(tickers)
+    assert [r for r in results if 'error' in r] == [{'ticker': "T7", 'error': "boom"}]
+
+
+def test_stream_results_consumes_tickers_lazily():
+    pulled = []
+
+    def tickers():
+        for i in range(100):
+            pulled.append(i)
+            yield f"T{i}"
+
+    stream = main.stream_results(lambda ticker: {'ticker': ticker}, tickers(), workers=2)
+    next(stream)
+    # Only the in-flight window (2 * workers) has been read
+    assert len(pulled) == 4
+    stream.close()
+
+
+def test_backtest_command_writes_json_lines(price_cache, capsys):
+    price_cache("AAA")
+    price_cache("BBB")
+
+    assert main.main(["backtest", "AAA", "BBB", "--start", "2016-01-01", "--end", "2020-12-31", "-q"]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    results = {r['ticker']: r for r in map(json.loads, lines)}
+    assert set(results) == {"AAA", "BBB"}
+    assert all(r['metrics']['num_trades'] > 0 for r in results.values())
+
+
+def test_concurrent_cache_writes_never_fail(tmp_path):
+    data_fetcher.set_cache_dir(str(tmp_path))
+    path = data_fetcher._cache_path("prices", "AAA", "10y", "1d")
+    frame = pd.DataFrame({'Close': np.arange(1000.0)})
+    errors = []
+
+    def write():
+        try:
+            for _ in range(20):
+                data_fetcher._write_cache(path, frame)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    pd.testing.assert_frame_equal(data_fetcher._read_cache(path), frame)
+    data_fetcher.set_cache_dir(None)
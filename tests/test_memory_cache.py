@@ -0,0 +1,91 @@
+import threading
+import time
+
+from data.memory_cache import TTLCache
+
+
+def test_concurrent_misses_compute_once():
+    cache = TTLCache()
+    calls = []
+    start = threading.Barrier(16)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    def worker(results):
+        start.wait()
+        results.append(cache.get_or_compute(('prices', "AAA"), compute))
+
+    results = []
+    threads = [threading.Thread(target=worker, args=(results,)) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["value"] * 16
+    assert cache.stats()['misses'] == 1
+
+
+def test_failed_compute_is_retried_by_waiters():
+    cache = TTLCache()
+    attempts = []
+
+    def compute():
+        attempts.append(1)
+        if len(attempts) == 1:
+            time.sleep(0.05)
+            raise RuntimeError("download failed")
+        return "value"
+
+    errors = []
+
+    def first():
+        try:
+            cache.get_or_compute("key", compute)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    time.sleep(0.01)
+    assert cache.get_or_compute("key", compute) == "value"
+    thread.join()
+
+    assert len(errors) == 1
+    assert len(attempts) == 2
+
+
+def test_rejected_values_are_not_cached():
+    cache = TTLCache()
+
+    cache.get_or_compute("key", lambda: None, keep=lambda value: value is not None)
+
+    assert cache.get("key") == (False, None)
+
+
+def test_entries_expire_per_kind():
+    cache = TTLCache(ttl_seconds=60, kind_ttls={'vix': 0.05})
+    cache.put(('vix',), 20.0)
+    cache.put(('prices', "AAA"), "history")
+
+    time.sleep(0.1)
+
+    assert cache.get(('vix',)) == (False, None)
+    assert cache.get(('prices', "AAA")) == (True, "history")
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+
+    cache.put("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from analysis.analyzer import analyze_stock, screen_stock, ScreeningStats
+from analysis.pipeline import AnalysisPipeline
+
+FUNDAMENTALS = {'peg_ratio': 1.2, 'operating_margin': 0.2, 'free_cash_flow': 1e9,
+                'revenue': 1e10, 'debt_to_equity': 50}
+
+
+@pytest.fixture
+def pipeline(price_cache):
+    """Pipeline over a cached synthetic history, with the downloads it cannot make offline filled in"""
+    price_cache("AAA", period="5y")
+    pipeline = AnalysisPipeline(vix=18.0)
+    pipeline.put("AAA", 'fundamentals', FUNDAMENTALS)
+    pipeline.put("AAA", 'revenue_growth', 12.0)
+    pipeline.put("AAA", 'fcf_growth', 8.0)
+    return pipeline
+
+
+def test_only_requested_nodes_run(pipeline):
+    assert pipeline.plan('rsi', "AAA") == ['prices', 'rsi']
+
+    pipeline.get("AAA", 'rsi')
+
+    assert set(pipeline.stats()) == {'prices', 'rsi'}
+
+
+def test_concurrent_requests_compute_each_node_once(pipeline):
+    start = threading.Barrier(8)
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(pipeline.get("AAA", 'technical_scores'))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(result == results[0] for result in results)
+    assert all(pipeline.runs[name] == 1 for name in pipeline.plan('technical_scores'))
+    assert pipeline.runs['prices'] == 1
+
+
+def test_report_is_printed_on_every_call(pipeline, capsys):
+    first = analyze_stock("AAA", pipeline=pipeline)
+    first_output = capsys.readouterr().out
+    second = analyze_stock("AAA", pipeline=pipeline)
+    second_output = capsys.readouterr().out
+
+    assert second == first
+    assert pipeline.runs['analysis'] == 1
+    assert "TOTAL SCORE" in first_output
+    assert second_output == first_output
+    assert first_output.index("Analyzing: AAA") < first_output.index("Current Price")
+
+
+def test_screen_prunes_before_the_fundamental_downloads(price_cache, capsys):
+    price_cache("AAA", period="5y")
+    pipeline = AnalysisPipeline(vix=18.0)
+    stats = ScreeningStats()
+
+    assert screen_stock("AAA", min_score=51, stats=stats, pipeline=pipeline) is None
+
+    assert "Skipping AAA" in capsys.readouterr().out
+    assert pipeline.runs['fundamentals'] == pipeline.runs['statements'] == 0
+    assert stats.as_dict() == {'screened': 1, 'pruned': 1, 'fetches_avoided': 2}
+
+
+def test_screen_survivors_match_analyze(pipeline, capsys):
+    analysis = analyze_stock("AAA", pipeline=pipeline)
+    capsys.readouterr()
+
+    assert screen_stock("AAA", min_score=0, pipeline=pipeline) == analysis
+    assert "TOTAL SCORE" in capsys.readouterr().out
+
+
+def test_forget_drops_only_the_ticker(pipeline):
+    pipeline.get("AAA", 'regime')
+    pipeline.get("AAA", 'rsi')
+
+    pipeline.forget("AAA")
+
+    assert pipeline.plan('rsi', "AAA") == ['prices', 'rsi']
+    assert pipeline.plan('regime', "AAA") == []
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from data.refresher import BackgroundRefresher
+
+KEY = ('prices', "AAA", "10y", "1d")
+
+# Seconds an entry stays fresh in these tests
+FRESH = 0.2
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def refresher():
+    refresher = BackgroundRefresher(workers=2, fresh_seconds={'prices': FRESH}, max_stale_seconds={'prices': 60})
+    yield refresher
+    refresher.stop()
+
+
+def test_concurrent_misses_download_once(refresher):
+    calls = []
+    start = threading.Barrier(12)
+
+    def download():
+        calls.append(1)
+        time.sleep(0.05)
+        return "v1"
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(refresher.get(KEY, download))
+
+    threads = [threading.Thread(target=worker) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["v1"] * 12
+
+
+def test_stale_values_are_served_while_one_refresh_runs(refresher):
+    refresher.get(KEY, lambda: "v1")
+    release = threading.Event()
+    refreshes = []
+
+    def refresh():
+        refreshes.append(1)
+        release.wait(5)
+        return "v2"
+
+    refresher._entries[KEY]['refresh'] = refresh
+    time.sleep(FRESH + 0.01)
+
+    started = time.monotonic()
+    served = [refresher.get(KEY, lambda: "blocking") for _ in range(5)]
+    assert time.monotonic() - started < 1
+    assert served == ["v1"] * 5
+
+    release.set()
+    _wait_for(lambda: refresher.stats()['refreshes_completed'] == 1)
+    assert refresher.get(KEY, lambda: "blocking") == "v2"
+    assert len(refreshes) == 1
+    assert refresher.stats()['refreshes_deduplicated'] == 4
+
+
+def test_failed_refresh_keeps_the_old_value(refresher):
+    refresher.get(KEY, lambda: "v1")
+    refresher._entries[KEY]['refresh'] = lambda: None
+    refresher._entries[KEY]['keep'] = lambda value: value is not None
+    time.sleep(FRESH + 0.01)
+
+    assert refresher.get(KEY, lambda: "blocking") == "v1"
+    _wait_for(lambda: refresher.stats()['refresh_failures'] == 1)
+    assert refresher.get(KEY, lambda: "blocking") == "v1"
+    # Not retried until a fresh period has passed
+    assert refresher.stats()['refreshes_queued'] == 1
+
+
+def test_values_past_the_stale_bound_are_downloaded():
+    refresher = BackgroundRefresher(fresh_seconds={'prices': 0.01}, max_stale_seconds={'prices': 0.02})
+    refresher.get(KEY, lambda: "v1")
+    time.sleep(0.05)
+
+    assert refresher.get(KEY, lambda: "v2") == "v2"
+    assert refresher.stats()['misses'] == 2
+    refresher.stop()
+
+
+def test_peeked_disk_value_is_served_and_refreshed(refresher):
+    refreshed = threading.Event()
+
+    def refresh():
+        refreshed.set()
+        return "v2"
+
+    value = refresher.get(KEY, lambda: "blocking", refresh=refresh, peek=lambda: (30.0, "on disk"))
+
+    assert value == "on disk"
+    assert refreshed.wait(5)
+    _wait_for(lambda: refresher.get(KEY, lambda: "blocking") == "v2")
+
+
+def test_refresh_stale_can_be_limited_to_the_watchlist(refresher):
+    refresher.watch(["AAA"])
+    refresher.get(KEY, lambda: "a")
+    refresher.get(('prices', "BBB", "10y", "1d"), lambda: "b")
+    time.sleep(FRESH + 0.01)
+
+    assert refresher.refresh_stale(watchlist_only=True) == 1
+    _wait_for(lambda: refresher.stats()['refreshes_completed'] == 1)
+    assert refresher.refresh_stale() == 1
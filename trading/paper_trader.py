@@ -0,0 +1,327 @@
+"""
+Asyncio paper-trading service
+
+PaperTrader runs the backtest strategy on a live (or replayed) bar feed for a
+whole watchlist:
+
+- A producer task reads ticks from the feed into a bounded asyncio.Queue. When
+  the trader falls behind, the queue fills up and the producer waits, so the
+  lag is visible instead of growing without limit.
+- For every tick, each symbol's indicators are updated incrementally
+  (indicators.incremental) and the signals for all symbols in the tick are
+  scored in one vectorized call to compute_signal_codes().
+- Every symbol trades its own paper account. The account is a Backtester fed
+  one bar at a time through simulate_trades(), so stop-loss, position sizing
+  and the circuit breaker are exactly the backtest rules. Each account reuses
+  one preallocated one-bar BarData, and all symbols of a tick share its index.
+- Memory does not grow with the length of the session: every
+  EQUITY_FOLD_BARS bars an account's equity points are folded into
+  RunningEquityStats (as in chunked backtests), and only the last
+  MAX_EQUITY_POINTS are kept for the returned equity curve.
+
+ServiceMetrics records decision latency (from the tick arriving to all of its
+decisions being made), processing time per bar and backpressure (queue depth
+and time the producer spent blocked), to show whether the service keeps up.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from backtest.backtester import Backtester, compute_signal_codes
+from backtest.streaming import RunningEquityStats
+from data.bars import BarData
+from indicators.incremental import IncrementalIndicators
+from config import MA_SHORT_PERIOD, MA_LONG_PERIOD, RSI_PERIOD, VOLUME_PERIOD, DEFAULT_INTERVAL
+
+# Latency samples kept for percentiles (older samples are dropped)
+MAX_LATENCY_SAMPLES = 100000
+
+# Equity points per symbol collected before they are folded into the running statistics
+EQUITY_FOLD_BARS = 256
+
+# Most recent equity points kept per symbol for close_all()
+MAX_EQUITY_POINTS = 10000
+
+
+class ServiceMetrics:
+    """Latency and backpressure statistics of a PaperTrader run"""
+
+    def __init__(self, max_samples=MAX_LATENCY_SAMPLES):
+        self.ticks = 0
+        self.bars = 0
+        self.decision_latency = deque(maxlen=max_samples)  # Seconds, tick arrival -> decisions done
+        self.queue_wait = deque(maxlen=max_samples)        # Seconds a tick sat in the queue
+        self.bar_time = deque(maxlen=max_samples)          # Seconds of processing per bar
+        self.queue_depth = deque(maxlen=max_samples)       # Ticks still queued when a tick was dequeued
+        self.max_queue_depth = 0
+        self.producer_blocked = 0.0                        # Seconds the feed waited on a full queue
+        self.started = None
+        self.finished = None
+
+    def record_arrival(self, blocked):
+        self.producer_blocked += blocked
+
+    def record_tick(self, bars, depth, arrived, dequeued, done):
+        self.ticks += 1
+        self.bars += bars
+        self.queue_depth.append(depth)
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.queue_wait.append(dequeued - arrived)
+        self.decision_latency.append(done - arrived)
+        if bars:
+            self.bar_time.append((done - dequeued) / bars)
+
+    @staticmethod
+    def _percentiles(samples, scale=1000):
+        if not samples:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+        values = np.fromiter(samples, dtype=float) * scale
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(values.max())}
+
+    def as_dict(self):
+        """
+        Summary statistics (latencies in milliseconds, per-bar time in microseconds)
+
+        Returns:
+            Dictionary of metrics
+        """
+        elapsed = (self.finished or time.perf_counter()) - self.started if self.started else 0.0
+        return {
+            'ticks': self.ticks,
+            'bars': self.bars,
+            'elapsed_seconds': elapsed,
+            'ticks_per_second': self.ticks / elapsed if elapsed > 0 else 0.0,
+            'bars_per_second': self.bars / elapsed if elapsed > 0 else 0.0,
+            'decision_latency_ms': self._percentiles(self.decision_latency),
+            'queue_wait_ms': self._percentiles(self.queue_wait),
+            'bar_time_us': self._percentiles(self.bar_time, scale=1e6),
+            'mean_queue_depth': float(np.mean(self.queue_depth)) if self.queue_depth else 0.0,
+            'max_queue_depth': self.max_queue_depth,
+            'producer_blocked_seconds': self.producer_blocked,
+        }
+
+
+class PaperTrader:
+    def __init__(self, tickers, initial_capital=10000, stop_loss_pct=0.07, max_position_pct=1.0,
+                 daily_loss_limit_pct=0.10, ma_short_period=MA_SHORT_PERIOD, ma_long_period=MA_LONG_PERIOD,
+                 rsi_period=RSI_PERIOD, volume_period=VOLUME_PERIOD, interval=DEFAULT_INTERVAL,
+                 queue_size=64, max_equity_points=MAX_EQUITY_POINTS, verbose=True):
+        """
+        Set up one paper account and indicator state per watchlist symbol
+
+        Args:
+            tickers: Watchlist symbols
+            initial_capital: Starting cash of each symbol's account
+            stop_loss_pct, max_position_pct, daily_loss_limit_pct: Risk rules (as in Backtester)
+            ma_short_period, ma_long_period, rsi_period, volume_period: Indicator windows
+            interval: Bar size of the feed (sets how Sharpe/Sortino are annualized)
+            queue_size: Ticks the feed may run ahead of the trader before it has to wait
+            max_equity_points: Most recent equity points kept per symbol
+            verbose: Print trades as they happen
+        """
+        self.queue_size = queue_size
+        self.verbose = verbose
+        self.metrics = ServiceMetrics()
+
+        self.accounts = {}
+        self.indicators = {}
+        self.equity_stats = {}
+        self.recent_equity = {}
+        self._bars = {}
+        for ticker in tickers:
+            # The backtest window is set from the first and last bars traded
+            self.accounts[ticker] = Backtester(
+                ticker, None, None, initial_capital=initial_capital, stop_loss_pct=stop_loss_pct,
+                max_position_pct=max_position_pct, daily_loss_limit_pct=daily_loss_limit_pct,
+                ma_short_period=ma_short_period, ma_long_period=ma_long_period,
+                rsi_period=rsi_period, volume_period=volume_period, interval=interval,
+            )
+            self.indicators[ticker] = IncrementalIndicators(ma_short_period, ma_long_period,
+                                                            rsi_period, volume_period)
+            self.equity_stats[ticker] = RunningEquityStats()
+            self.recent_equity[ticker] = deque(maxlen=max_equity_points)
+            self._bars[ticker] = BarData(np.zeros(1, dtype=np.int64), np.zeros(1), np.zeros(1),
+                                         signals=np.zeros(1, dtype=np.int8))
+        self.last_prices = {}
+
+    def prime(self, ticker, price_data):
+        """
+        Warm up a symbol's indicators on past bars without trading them
+
+        Args:
+            ticker: Watchlist symbol
+            price_data: DataFrame with Close and Volume columns
+        """
+        indicators = self.indicators[ticker]
+        for close, volume in zip(price_data['Close'].to_numpy(dtype=float),
+                                 price_data['Volume'].to_numpy(dtype=float)):
+            indicators.update(close, volume)
+
+    def process_tick(self, timestamp, bars):
+        """
+        Update indicators, score signals and apply the risk rules for one tick
+
+        Args:
+            timestamp: Bar close time (pandas Timestamp)
+            bars: Dictionary of symbol -> (close, volume)
+
+        Returns:
+            Dictionary of symbol -> signal code for the symbols in the tick
+        """
+        symbols = [s for s in bars if s in self.accounts]
+        if not symbols:
+            return {}
+
+        values = np.array([self.indicators[s].update(*bars[s]) for s in symbols])
+        closes = np.array([bars[s][0] for s in symbols])
+        codes = compute_signal_codes(closes, values[:, 0], values[:, 1], values[:, 2], values[:, 3])
+
+        timestamp = pd.Timestamp(timestamp)
+        dates = pd.DatetimeIndex([timestamp])    # One index for every symbol of the tick
+        for symbol, close, volume, code in zip(symbols, closes, (bars[s][1] for s in symbols), codes):
+            account = self.accounts[symbol]
+            if account.start_date is None:
+                account.start_date = timestamp
+            account.end_date = timestamp
+            bar = self._bars[symbol]
+            bar.set_bar(dates, close, volume, code)
+            account.simulate_trades(bar, verbose=self.verbose, close_at_end=False)
+            if len(account.equity_curve) >= EQUITY_FOLD_BARS:
+                self._fold_equity(symbol)
+            self.last_prices[symbol] = (timestamp, close)
+
+        return dict(zip(symbols, codes))
+
+    def _fold_equity(self, symbol):
+        """Move an account's collected equity points into its running statistics"""
+        account = self.accounts[symbol]
+        self.equity_stats[symbol].update([e['equity'] for e in account.equity_curve])
+        self.recent_equity[symbol].extend(account.equity_curve)
+        account.equity_curve = []
+
+    async def _produce(self, feed, queue):
+        """Move ticks from the feed into the queue, measuring how long the queue makes it wait"""
+        try:
+            async for timestamp, bars in feed:
+                arrived = time.perf_counter()
+                await queue.put((timestamp, bars, arrived))
+                self.metrics.record_arrival(time.perf_counter() - arrived)
+        finally:
+            await queue.put(None)
+
+    async def run(self, feed, max_ticks=None):
+        """
+        Trade the feed until it ends (or max_ticks ticks were processed)
+
+        Args:
+            feed: Async iterator of (timestamp, {symbol: (close, volume)}) ticks
+            max_ticks: Optional limit on the number of ticks
+
+        Returns:
+            ServiceMetrics dictionary
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        producer = asyncio.create_task(self._produce(feed, queue))
+        self.metrics.started = time.perf_counter()
+
+        try:
+            while max_ticks is None or self.metrics.ticks < max_ticks:
+                item = await queue.get()
+                if item is None:
+                    break
+                timestamp, bars, arrived = item
+                # The backlog is measured here: the producer only runs while this loop waits
+                depth = queue.qsize()
+                dequeued = time.perf_counter()
+                self.process_tick(timestamp, bars)
+                self.metrics.record_tick(len(bars), depth, arrived, dequeued, time.perf_counter())
+                # get() does not yield while ticks are queued; let the feed catch up
+                await asyncio.sleep(0)
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+            self.metrics.finished = time.perf_counter()
+
+        return self.metrics.as_dict()
+
+    def account_summary(self, ticker):
+        """
+        Current state of one symbol's paper account
+
+        Returns:
+            Dictionary with cash, shares held, equity, trade count and realized profit
+        """
+        account = self.accounts[ticker]
+        last = self.last_prices.get(ticker)
+        shares = account.position or 0
+        price = last[1] if last else 0.0
+        return {
+            'ticker': ticker,
+            'cash': account.cash,
+            'shares': shares,
+            'entry_price': account.entry_price if account.position is not None else None,
+            'last_price': price,
+            'equity': account.cash + shares * price,
+            'trading_halted': account.trading_halted,
+            'num_trades': len(account.trades),
+            'realized_profit': sum(t['profit'] for t in account.trades),
+            'bars': account.bars_processed,
+        }
+
+    def close_all(self):
+        """
+        Sell every open position at its last price and return per-symbol results
+
+        Returns:
+            List of dictionaries like Backtester.run() results (metrics is None
+            for symbols that never traded; equity_curve holds the most recent
+            max_equity_points points, the metrics cover the whole session)
+        """
+        results = []
+        for ticker, account in self.accounts.items():
+            if ticker in self.last_prices:
+                account.close_position(*self.last_prices[ticker], verbose=self.verbose)
+            self._fold_equity(ticker)
+            metrics = None
+            if account.trades:
+                stats = self.equity_stats[ticker].as_dict(account.periods_per_year)
+                metrics = account.calculate_metrics(equity_stats=stats)
+            results.append({
+                'ticker': ticker,
+                'metrics': metrics,
+                'trades': account.trades,
+                'equity_curve': list(self.recent_equity[ticker]),
+            })
+        return results
+
+
+def print_service_metrics(metrics):
+    """
+    Print the latency and backpressure report from PaperTrader.run()
+
+    Args:
+        metrics: Dictionary from ServiceMetrics.as_dict()
+    """
+    print("\n" + "="*70)
+    print("PAPER TRADING SERVICE METRICS")
+    print("="*70)
+    print(f"Ticks processed:         {metrics['ticks']:,}")
+    print(f"Bars processed:          {metrics['bars']:,}")
+    print(f"Throughput:              {metrics['bars_per_second']:,.0f} bars/s ({metrics['ticks_per_second']:,.1f} ticks/s)")
+    for label, name, unit in [("Decision latency", 'decision_latency_ms', "ms"),
+                              ("Queue wait", 'queue_wait_ms', "ms"),
+                              ("Time per bar", 'bar_time_us', "us")]:
+        p = metrics[name]
+        print(f"{label + ':':<25}p50 {p['p50']:.3f}{unit}  p95 {p['p95']:.3f}{unit}  "
+              f"p99 {p['p99']:.3f}{unit}  max {p['max']:.3f}{unit}")
+    print(f"Queue depth:             mean {metrics['mean_queue_depth']:.1f}, max {metrics['max_queue_depth']}")
+    print(f"Producer blocked:        {metrics['producer_blocked_seconds']:.3f}s")
+    print("="*70 + "\n")
@@ -1,3 +1,7 @@
+import math
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
 from config import RECOMMENDATION_THRESHOLDS
 
 
@@ -44,6 +48,32 @@ def analyze_multiple_stocks(tickers):
     return results
 
 
+def screen_stocks(tickers, min_score=RECOMMENDATION_THRESHOLDS['buy']):
+    """
+    Screen multiple stocks, skipping fundamentals for hopeless tickers
+
+    Args:
+        tickers: List of stock symbols
+        min_score: Total score a ticker needs (default: the BUY threshold)
+
+    Returns:
+        Tuple of (results that reach min_score, screening stats dict)
+    """
+    from analysis.analyzer import screen_stock, ScreeningStats
+    from indicators.technical import calculate_vix
+
+    stats = ScreeningStats()
+    vix = calculate_vix()
+
+    results = []
+    for ticker in tickers:
+        result = screen_stock(ticker, min_score, vix=vix, stats=stats)
+        if result and result['total_score'] >= min_score:
+            results.append(result)
+
+    return results, stats.as_dict()
+
+
 def print_summary(results):
     """
     Print summary table of multiple analyses
@@ -61,4 +91,30 @@ def print_summary(results):
         print(f"{result['ticker']:<10} ${result['current_price']:<11.2f} "
               f"{result['total_score']:<9.1f} {result['percentage']:<7.1f}% {result['recommendation']:<20}")
     
-    print("="*70 + "\n")
\ No newline at end of file
+    print("="*70 + "\n")
+
+
+def to_serializable(obj):
+    """
+    Convert analysis/backtest results into plain JSON-compatible types
+
+    Handles nested dicts and lists, pandas Timestamps, datetimes and numpy
+    scalars. NaN and infinity become None since JSON cannot represent them.
+
+    Args:
+        obj: Result object (dict, list, scalar, ...)
+
+    Returns:
+        Object built only from dict, list, str, int, float, bool and None
+    """
+    if isinstance(obj, dict):
+        return {str(k): to_serializable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_serializable(v) for v in obj]
+    if isinstance(obj, (pd.Timestamp, datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and (math.isnan(obj) or math.isinf(obj)):
+        return None
+    return obj